@@ -100,7 +100,20 @@ function page_load(jfile) {
 	}).send();
 }
 
+function run_source() {
+	var jsondir=JSROOT.GetUrlOption("jsondir");
+	return (jsondir!=null) ? jsondir : JSROOT.GetUrlOption("rootfile");
+}
+
 function page_initialize(name="") {
+	var jsondir=JSROOT.GetUrlOption("jsondir");
+	if ((name=="") && (jsondir!=null)) {
+		// histograms exported by script/exportjson.py: one <dir>/<name>.json.gz per histogram, fetched when drawn
+		root_file = { ReadObject: function(fullname, callback) {
+			JSROOT.NewHttpRequest(jsondir+'/'+fullname+'.json.gz','object',callback).send();
+		} };
+		return;
+	}
 	var rootfile=name;
 	if (rootfile=="")
 		rootfile=JSROOT.GetUrlOption("rootfile");
@@ -119,7 +132,7 @@ function build_menu(index_json="") {
 		//parse_json(obj);
 		items = obj.items;
 		menu = document.getElementById('menu');
-		filename=JSROOT.GetUrlOption("rootfile");
+		filename=run_source();
 		runno = filename.replace('#','').split('/').reverse()[0].split('.')[0].split('r')[1];
 		while (runno[0]=='0') {
 			runno = runno.substring(1,runno.length);
@@ -0,0 +1,188 @@
+# Purpose:
+#   Export the histograms of the merged klmHists-e#r#.root file of every run into one gzip-compressed JSROOT
+#   JSON file per histogram, so show_plot.htm?jsondir=... only downloads the plots on the page being viewed
+#   instead of the whole ROOT file (show_plot.htm?rootfile=...). Every directory of the ROOT file (RawKLM,
+#   SectorOccupancy, ZHit, PhiHit, BKLMXYOccupancy, EKLMXYOccupancy, ...) becomes a directory of
+#   json-e#r#/ next to the ROOT file, e.g. e0010/r01914/json-e0010r01914/ZHit/PlaneZStripBB0.json.gz, and
+#   json-e#r#/index.json lists the exported histograms (class, title, entries, file).
+#
+#   The runs are exported in parallel, one worker process per run. A run whose index.json is newer than its
+#   ROOT file is skipped; a histogram whose JSON is unchanged is not rewritten, so the web server (and the
+#   browser cache) keep serving the same file.
+#
+#   The web server has to send the *.json.gz files with "Content-Encoding: gzip" so the browser inflates them;
+#   for Apache the .htaccess written into every json-e#r# directory does that.
+#
+# Prerequisite (on kekcc): type
+#   source /cvmfs/belle.cern.ch/tools/b2setup release-04-00-00   (ROOT 6.14 or newer, for TBufferJSON)
+#
+# Usage:
+#   python3 exportjson.py -e # [-r #[,#...]] [-d dir] [-j #] [-f]
+#   Arguments:
+#      -e #        experiment number (default is 10)
+#      -r list     comma-separated run numbers (default is every r##### directory of the experiment)
+#      -d dir      directory that holds the e####/r#####/klmHists-e####r#####.root files (default is .)
+#      -j #        number of worker processes (default is the number of CPUs)
+#      -f          export the runs even if their index.json is up to date
+
+import os
+import sys
+import glob
+import gzip
+import json
+import concurrent.futures
+from optparse import OptionParser
+
+#: TBufferJSON compact level: no spaces and newlines (3), runs of equal array values compressed (20), read by JSROOT 5
+COMPACT = 23
+#: Apache configuration of a json-e#r# directory: serve foo.json.gz as application/json with gzip encoding
+HTACCESS = 'AddType application/json .json\nAddEncoding gzip .gz\n'
+
+
+def writeAtomic(fileName, data, mode='wb'):
+    """Write a file via a temporary file, so the web server never serves a half-written file
+
+    Arguments:
+        fileName (str): path name of the file
+        data (bytes or str): contents
+        mode (str): open mode of the file ['wb']
+    """
+    tmpName = os.path.join(os.path.dirname(fileName), '.' + os.path.basename(fileName) + '.tmp')
+    with open(tmpName, mode) as f:
+        f.write(data)
+    os.replace(tmpName, fileName)
+
+
+def walkKeys(directory, prefix=''):
+    """Yield (path, object) of every object below a TDirectory, in the order of their names
+
+    Arguments:
+        directory (ROOT.TDirectory): directory of the ROOT file
+        prefix (str): path of the directory in the ROOT file
+    """
+    import ROOT
+    names = []
+    for key in directory.GetListOfKeys():
+        if key.GetName() not in names:
+            names.append(key.GetName())
+    for name in sorted(names):
+        thisObject = directory.Get(name)
+        path = prefix + name
+        if isinstance(thisObject, ROOT.TDirectory):
+            for item in walkKeys(thisObject, path + '/'):
+                yield item
+        elif thisObject:
+            yield path, thisObject
+
+
+def exportRun(job):
+    """Export the histograms of one run in a worker process; return (run, # written, # histograms, message)
+
+    Arguments:
+        job (tuple): (rootName, jsonDir, force) = merged ROOT file, output directory, ignore the index date
+    """
+    rootName, jsonDir, force = job
+    indexName = os.path.join(jsonDir, 'index.json')
+    if not force and os.path.exists(indexName) and os.path.getmtime(indexName) >= os.path.getmtime(rootName):
+        return rootName, 0, 0, 'up to date'
+    import ROOT
+    ROOT.gROOT.SetBatch(True)
+    ROOT.gErrorIgnoreLevel = ROOT.kError
+    rootFile = ROOT.TFile.Open(rootName)
+    if not rootFile or rootFile.IsZombie():
+        return rootName, 0, 0, 'cannot be opened'
+    try:
+        with open(indexName) as f:
+            oldIndex = json.load(f).get('histos', {})
+    except (OSError, ValueError):
+        oldIndex = {}
+    histos = {}
+    written = 0
+    for path, thisObject in walkKeys(rootFile):
+        data = str(ROOT.TBufferJSON.ConvertToJSON(thisObject, COMPACT).Data()).encode()
+        fileName = path + '.json.gz'
+        fullName = os.path.join(jsonDir, fileName)
+        os.makedirs(os.path.dirname(fullName), exist_ok=True)
+        # mtime=0 makes the gzip stream depend on the JSON only, so an unchanged histogram is not rewritten
+        compressed = gzip.compress(data, mtime=0)
+        if os.path.exists(fullName) and os.path.getsize(fullName) == len(compressed):
+            with open(fullName, 'rb') as f:
+                unchanged = f.read() == compressed
+        else:
+            unchanged = False
+        if not unchanged:
+            writeAtomic(fullName, compressed)
+            written += 1
+        histos[path] = {'class': thisObject.ClassName(), 'title': thisObject.GetTitle(), 'file': fileName,
+                        'entries': thisObject.GetEntries() if isinstance(thisObject, ROOT.TH1) else None}
+    rootFile.Close()
+    # the JSON of histograms that are no longer in the ROOT file
+    for path, entry in oldIndex.items():
+        if path not in histos and os.path.exists(os.path.join(jsonDir, entry['file'])):
+            os.remove(os.path.join(jsonDir, entry['file']))
+    writeAtomic(os.path.join(jsonDir, '.htaccess'), HTACCESS, 'w')
+    writeAtomic(indexName, json.dumps({'rootfile': os.path.basename(rootName), 'histos': histos},
+                                      indent=1, sort_keys=True), 'w')
+    return rootName, written, len(histos), ''
+
+
+def findJobs(exp, runs, location, force):
+    """Return the export jobs (rootName, jsonDir, force) of the runs that have a merged ROOT file
+
+    Arguments:
+        exp (str): formatted experiment number
+        runs (list): run numbers (all r##### directories of the experiment if empty)
+        location (str): directory that holds the e####/r##### directories
+        force (bool): ignore the index date
+    """
+    if len(runs) == 0:
+        runs = [int(os.path.basename(runDir)[1:]) for runDir in sorted(glob.glob(os.path.join(location, 'e' + exp, 'r*')))
+                if os.path.basename(runDir)[1:].isdecimal()]
+    jobs = []
+    for run in runs:
+        r = '{0:05d}'.format(int(run))
+        rootName = os.path.join(location, 'e' + exp, 'r' + r, 'klmHists-e{0}r{1}.root'.format(exp, r))
+        if not os.path.exists(rootName):
+            print('exportjson: {0} does not exist'.format(rootName))
+            continue
+        jobs.append((rootName, os.path.join(os.path.dirname(rootName), 'json-e{0}r{1}'.format(exp, r)), force))
+    return jobs
+
+#=========================================================================
+#
+#   Main routine
+#
+#=========================================================================
+
+parser = OptionParser()
+parser.add_option('-e', '--experiment', dest='eNumber',
+                  default='10',
+                  help='Experiment number [default=10]')
+parser.add_option('-r', '--run', dest='rNumber',
+                  default='',
+                  help='Comma-separated run numbers [every run of the experiment]')
+parser.add_option('-d', '--directory', dest='location', default='.',
+                  help='Directory with the e####/r##### directories [default=.]')
+parser.add_option('-j', '--jobs', dest='jobs', default='0',
+                  help='Number of worker processes [number of CPUs]')
+parser.add_option('-f', '--force', dest='force', action='store_true', default=False,
+                  help='Export the runs even if their index.json is up to date')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    exp = '{0:04d}'.format(int(options.eNumber))
+    runs = [int(r.lstrip('r')) for r in options.rNumber.split(',') if r != '']
+    jobs = findJobs(exp, runs, options.location, options.force)
+    if len(jobs) == 0:
+        print("No klmHists files found for experiment {0} in {1}".format(exp, options.location))
+        sys.exit(1)
+    nWorkers = int(options.jobs)
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=nWorkers if nWorkers > 0 else None) as pool:
+        for rootName, written, total, message in pool.map(exportRun, jobs):
+            if message == '':
+                print('exportjson: {0}: {1} of {2} histograms written'.format(rootName, written, total))
+            else:
+                print('exportjson: {0} {1}'.format(rootName, message))
+                failed += message != 'up to date'
+    sys.exit(1 if failed > 0 else 0)
@@ -22,6 +22,15 @@ def findrun(Location):
     return Run 
 
 
+def plotsource(i):
+    # the per-histogram JSON of exportjson.py if the run was exported, else the whole ROOT file
+    # (both relative to show_plot.htm in the parent directory)
+    jsondir = 'e0008/r0'+i+'/json-e0008r0'+i
+    if os.path.exists(os.path.join('..', jsondir, 'index.json')):
+        return 'jsondir='+jsondir
+    return 'rootfile=e0008/r0'+i+'/klmHists-e0008r0'+i+'.root'
+
+
 def writehtml(Location):
     Main = ''
     run = findrun(RunLocation)
@@ -59,7 +68,7 @@ def writehtml(Location):
     
     for i in run:
         #Main +=r'''<h4>run'''+i+''':  <a href="./r0'''+i+'''/png-e0008r0'''+i+'''/index.html"> BKLM Plots for run'''+i+''' </a> : <a href="./r0'''+i+'''/hitmap-e0008r0'''+i+'''/index.html"> Hit map plots for run'''+i+'''</a> : <a href="./r0'''+i+'''/Short-listed/Slides_e0008_r0'''+i+'''.pdf"> Short-listed plots for run'''+i+'''</a> </h4> \n'''
-        Main +=r'''<div class="example"><a href="../show_plot.htm?rootfile=e0008/r0'''+i+'''/klmHists-e0008r0'''+i+'''.root"><b>Run '''+i+'''</b></a></div> \n
+        Main +=r'''<div class="example"><a href="../show_plot.htm?'''+plotsource(i)+'''"><b>Run '''+i+'''</b></a></div> \n
 '''
     
     footer = r'''</body> </html>
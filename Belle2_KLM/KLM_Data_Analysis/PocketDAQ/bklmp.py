@@ -18,12 +18,17 @@ from basf2 import *
 import simulation
 import reconstruction
 import rawdata
-import math
+import os
+import sys
 import ctypes
 import ROOT
 from ROOT import Belle2, TH1F, TH2F, TCanvas, THistPainter, TPad, TFile
 from optparse import Option, OptionValueError, OptionParser
 
+# the BKLM geometry tables are shared with the basf2 scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'basf2_script'))
+import bklmGeometry
+
 #=========================================================================
 #
 #   EventInspectorBKLM class (must be defined before use)
@@ -90,137 +95,7 @@ class EventInspectorBKLM:
         self.hist_ZY = ROOT.TH2F('ZY', ' ;z;y', 10, -345.0, 345.0, 10, -345.0, 345.0)
         self.hist_ZY.SetStats(False)
         ROOT.gStyle.SetOptStat(1110)
-        self.bklmXY = []
-        r0 = 201.9 + 0.5 * 4.4 ## cm
-        dr = 9.1 ## cm
-        tan0 = math.tan(math.pi / 8.0)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -200.0, 0.0)
-        g.SetPoint(1, +200.0, 0.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmXY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, 0.0, -200.0)
-        g.SetPoint(1, 0.0, +200.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmXY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -5.0,  0.0)
-        g.SetPoint(1, +5.0,  0.0)
-        g.SetPoint(2,  0.0,  0.0)
-        g.SetPoint(3,  0.0, +5.0)
-        g.SetPoint(4,  0.0, -5.0)
-        g.SetLineColor(1)
-        g.SetLineWidth(1)
-        self.bklmXY.append(g)
-        for layer in range(0, 15):
-            r = r0 + layer * dr
-            x = r * tan0
-            g = ROOT.TGraph()
-            g.SetPoint(0, +r, -x)
-            g.SetPoint(1, +r, +x)
-            g.SetPoint(2, +x, +r)
-            g.SetPoint(3, -x, +r)
-            g.SetPoint(4, -r, +x)
-            g.SetPoint(5, -r, -x)
-            g.SetPoint(6, -x, -r)
-            g.SetPoint(7, +x, -r)
-            g.SetPoint(8, +r, -x)
-            if layer < 2:
-                g.SetLineColor(18)
-            else:
-                g.SetLineColor(17)
-                if (layer % 5) == 0:
-                    g.SetLineStyle(3)
-            g.SetLineWidth(1)
-            self.bklmXY.append(g)
-        self.bklmZY = []
-        rF = r0 + 14 * dr
-        x0 = r0 * tan0
-        z0 = 47.0 ## cm
-        zL = 220.0 ## cm
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0 - 140.0, 0.0)
-        g.SetPoint(1, +zL + z0 +  70.0, 0.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, 0.0, -315.0)
-        g.SetPoint(1, 0.0, +340.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -5.0,  0.0)
-        g.SetPoint(1, +5.0,  0.0)
-        g.SetPoint(2,  0.0,  0.0)
-        g.SetPoint(3,  0.0, +5.0)
-        g.SetPoint(4,  0.0, -5.0)
-        g.SetLineColor(1)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, +x0)
-        g.SetPoint(1, -zL + z0, +r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, -x0)
-        g.SetPoint(1, -zL + z0, -r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, +zL + z0, +x0)
-        g.SetPoint(1, +zL + z0, +r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, +zL + z0, -x0)
-        g.SetPoint(1, +zL + z0, -r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, r0)
-        g.SetPoint(1, +zL + z0, r0)
-        g.SetPoint(2, +zL + z0, rF)
-        g.SetPoint(3, -zL + z0, rF)
-        g.SetPoint(4, -zL + z0, r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, -r0)
-        g.SetPoint(1, +zL + z0, -r0)
-        g.SetPoint(2, +zL + z0, -rF)
-        g.SetPoint(3, -zL + z0, -rF)
-        g.SetPoint(4, -zL + z0, -r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, -x0)
-        g.SetPoint(1, +zL + z0, -x0)
-        g.SetPoint(2, +zL + z0, +x0)
-        g.SetPoint(3, -zL + z0, +x0)
-        g.SetPoint(4, -zL + z0, -x0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
+        self.bklmXY, self.bklmZY = bklmGeometry.outlineGraphs()
         # fill the readout <-> detector map from the information retrieved from the conditions database
         self.histogramFile = ROOT.TFile.Open(histName, "RECREATE")
         # create the rawKLM histograms
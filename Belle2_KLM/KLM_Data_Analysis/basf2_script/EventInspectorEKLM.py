@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   basf module to histogram useful values in RawKLM, EKLMDigit and EKLMHit2d data-objects in a DST ROOT file.
+#   Stand-alone (eklm.py) it writes its own histogram file; given the BKLM EventInspector of the same
+#   path as parent (bklm-dst.py -k 1) it writes into the EKLM directory of the BKLM histogram file,
+#   so that one job reads and unpacks the RawKLMs for both subsystems.
+#
+
+import basf2
+import histFiller
+import ROOT
+from ROOT import Belle2
+
+
+class EventInspectorEKLM(basf2.Module):
+    """Fill EKLM histograms of values from RawKLMs, EKLMDigits and EKLMHit2ds"""
+
+    BKLM_ID = 0x07000000
+    EKLM_ID = 0x08000000
+
+    BKLM_STRIP_BIT = 0
+    BKLM_PLANE_BIT = 6
+    BKLM_LAYER_BIT = 7
+    BKLM_SECTOR_BIT = 11
+    BKLM_END_BIT = 14
+    BKLM_MAXSTRIP_BIT = 15
+    BKLM_OUTOFTIME_BIT = 24
+    BKLM_ONTRACK_BIT = 27
+    BKLM_ONSTATRACK_BIT = 29
+
+    BKLM_STRIP_MASK = 0x3f
+    BKLM_PLANE_MASK = (1 << BKLM_PLANE_BIT)
+    BKLM_LAYER_MASK = (15 << BKLM_LAYER_BIT)
+    BKLM_SECTOR_MASK = (7 << BKLM_SECTOR_BIT)
+    BKLM_END_MASK = (1 << BKLM_END_BIT)
+    BKLM_MAXSTRIP_MASK = (63 << BKLM_MAXSTRIP_BIT)
+    BKLM_ONTRACK_MASK = (1 << BKLM_ONTRACK_BIT)
+    BKLM_ONSTATRACK_MASK = (1 << BKLM_ONSTATRACK_BIT)
+    BKLM_MODULEID_MASK = (BKLM_END_MASK | BKLM_SECTOR_MASK | BKLM_LAYER_MASK)
+
+    #: directory of the shared output file that holds the EKLM histograms
+    EKLM_DIRECTORY = 'EKLM'
+
+    def __init__(self, exp, run, histName, parent=None, checkpointer=None):
+        """Constructor
+
+        Arguments:
+            exp (str): formatted experiment number
+            run (str): formatted run number
+            histName (str): path name of the output histogram ROOT file (ignored if parent is given)
+            parent (EventInspector): BKLM inspector of the same path whose output file and histogram filler are
+                shared; the EKLM histograms then go to the EKLM directory of the parent's file
+            checkpointer (checkpoint.Checkpointer): writes (and resumes from) periodic checkpoints of a stand-alone
+                job; None for none (with a parent, the parent's checkpoints include the EKLM histograms)
+        """
+        super(EventInspectorEKLM, self).__init__()
+        #: internal copy of experiment number
+        self.exp = exp
+        #: internal copy of run number
+        self.run = run
+        #: internal copy of the pathname of the output histogram ROOT file
+        self.histName = histName
+        #: BKLM inspector that owns the shared output file (None for a stand-alone EKLM job)
+        self.parent = parent
+        #: periodic checkpoints of the histograms and counters (None if the job is not checkpointed)
+        self.checkpointer = checkpointer if parent is None else None
+        #: event counter (also the number of input entries consumed)
+        self.eventCounter = 0
+
+    def initialize(self):
+        """Handle job initialization: fill the mapping database, create histograms, open the event-display file"""
+        self.eventDisplayCounter = 0
+        print('initialize(): exp=', self.exp, 'run=', self.run)
+        expRun = 'e{0:02d}r{1}: '.format(int(self.exp), int(self.run))
+        
+        ROOT.gStyle.SetOptStat(10)
+
+        if self.parent is None:
+            #: Output ROOT TFile that will contain the histograms/scatterplots
+            self.histogramFile = ROOT.TFile.Open(self.histName, "RECREATE")
+        else:
+            # book the histograms in the EKLM directory of the BKLM inspector's output file
+            self.histogramFile = None
+            self.parent.histogramFile.mkdir(self.EKLM_DIRECTORY).cd()
+        # All histograms/scatterplots in the output file will show '# of events' only
+        ROOT.gStyle.SetOptStat(10)
+        ROOT.gStyle.SetOptFit(111)
+
+        # create the rawKLM histograms
+
+        #: histogram of the number of BKLMDigits in the event
+        self.hist_nDigit = ROOT.TH1F('NDigitEKLM', expRun + '# of EKLMDigits', 50, -0.5, 199.5)
+        self.hist_nHit2d = ROOT.TH1F('NHit2dEKLM', expRun+'# of EKLMHit2ds', 25, -0.5, 49.5)
+        self.hist_rawKLMnodeID = ROOT.TH2F('RawKLMnodeID',
+                                           expRun + 'RawKLM NodeID;' +
+                                           'NodeID (bklm: 1..4, eklm:5..8);' +
+                                           'Copper index',
+                                           14, -0.5, 13.5, 10, -0.5, 9.5)
+        self.hist_BackwardSectorOccupancy = ROOT.TH1F('EKLMBackwardSectorOccupancy', expRun+'Backward Endcap Sector occupancy of channels', 4, 0.5, 4.5)
+        self.hist_ForwardSectorOccupancy = ROOT.TH1F('EKLMForwardSectorOccupancy', expRun+'Forward Endcap Sector occupancy of channels', 4, 0.5, 4.5)
+        
+        self.hist_BackwardSectorbyctime = ROOT.TH2F('EKLMBackwardSectorbyctime', expRun+'Backward Endcap Sector occupancy of channels', 4, 0.5, 4.5, 256, -0.5, 1023.5)
+        self.hist_ForwardSectorbyctime = ROOT.TH2F('EKLMForwardSectorbyctime', expRun+'Forward Endcap Sector occupancy of channels', 4, 0.5, 4.5, 256, -0.5, 1023.5)
+        
+        self.hist_time = ROOT.TH1F('EKLMtime', expRun+'Time distribution;t - trigger time', 50, -5000, -4000)
+        self.hist_ctime = ROOT.TH1F('EKLMctime', expRun+'CTime time', 256, -0.5, 1023.5)
+        self.hist_tdc = ROOT.TH1F('EKLMtdc', expRun+'TDC time', 256, -0.5, 1023.5)
+        
+        self.hist_EndcapOccupancy = ROOT.TH1F('EndcapOccupancy', expRun+'Endcap occupancy of channels; sector # (0 = backword, 1 = Forward)', 10, -1.0, 9.0)
+        
+        self.hist_occupancyForwardXY  = ROOT.TH2F('EKLMoccupancyForwardXY', expRun+'Forward Endcap XY Occupancy for total hits', 800, -400, 400, 800, -400, 400) 
+        self.hist_occupancyBackwardXY = ROOT.TH2F('EKLMoccupancyBackwardXY', expRun+'Backward Endcap XY Occupancy for total hits', 800, -400, 400, 800, -400, 400)
+        
+        
+        self.hist_LayeroccupancyForwardRZ  = ROOT.TH2F('EKLMLayeroccupancyForwardRZ', expRun+'Forward Endcap RZ Occupancy for total hits', 16, -0.5, 15.5, 800, 0, 800) 
+        self.hist_LayeroccupancyBackwardRZ = ROOT.TH2F('EKLMLayeroccupancyBackwardRZ', expRun+'Backward Endcap RZ Occupancy for total hits', 16, -0.5, 15.5, 800, 0, 800)
+        
+        self.hist_LayeroccupancyForward = ROOT.TH1F('EKLMLayeroccupancyForward', expRun+'Forward Endcap Layer Occupancy', 16, -0.5, 15.5)
+        self.hist_LayeroccupancyBackward = ROOT.TH1F('EKLMLayeroccupancyBackward', expRun+'Backward Endcap Layer Occupancy', 16, -0.5, 15.5)
+        
+        self.hist_occupancyForwardXYPerLayer = []
+        self.hist_occupancyBackwardXYPerLayer = []
+        for layer in range(0, 14):
+            labelForward = 'occupancyForwardXY_L{0:02d}'.format(layer+1)
+            titleForward = '{0}:Forward Endcap XY Occupancy for layer {1} hits;x(cm);y(cm)'.format(expRun, layer+1)
+            self.hist_occupancyForwardXYPerLayer.append(ROOT.TH2F(labelForward, titleForward, 800, -400, 400, 800, -400, 400))
+          
+       
+        for layer in range(0, 12):
+            labelBackward = 'occupancyBackwardXY_L{0:02d}'.format(layer+1)
+            titleBackward = '{0}:Backward Endcap XY Occupancy for layer {1} hits;x(cm);y(cm)'.format(expRun, layer+1)
+            self.hist_occupancyBackwardXYPerLayer.append(ROOT.TH2F(labelBackward, titleBackward, 800, -400, 400, 800, -400, 400))
+
+        # buffer the Fill() calls of all hist_* histograms and hand them to ROOT in bulk with FillN;
+        # with a parent, its filler flushes them and its terminate() writes them together with the BKLM histograms
+        if self.parent is None:
+            self.histFiller = histFiller.HistogramFiller()
+        else:
+            self.histFiller = self.parent.histFiller
+            self.parent.histogramFile.cd()
+        self.histFiller.adopt(self)
+
+    def terminate(self):
+        if self.parent is not None:
+            return
+        self.histFiller.flush()
+
+        self.histogramFile.Write()
+        self.histogramFile.Close()
+        if self.checkpointer is not None:
+            self.checkpointer.remove()
+        print('Goodbye')
+
+    def beginRun(self):
+        EventMetaData = Belle2.PyStoreObj('EventMetaData')
+        print('beginRun', EventMetaData.getRun())
+        if self.checkpointer is not None:
+            state = self.checkpointer.restore(self.histFiller)
+            if state is not None:
+                self.eventCounter = state['eventCounter']
+
+    def endRun(self):
+        EventMetaData = Belle2.PyStoreObj('EventMetaData')
+        print('endRun', EventMetaData.getRun())
+
+
+    def event(self):
+        """ Return True if event is fine, False otherwise """
+        someOK = False
+        self.eventCounter += 1
+
+        EventMetaData = Belle2.PyStoreObj('EventMetaData')
+        event = EventMetaData.getEvent()
+        rawklms = Belle2.PyStoreArray('RawKLMs')
+        digits = Belle2.PyStoreArray('EKLMDigits')
+        hit2ds = Belle2.PyStoreArray('EKLMHit2ds')
+        #klmdigi = Belle2.PyStoreArray('KLMDigitEventInfo')
+        #eklmids = Belle2.PyStoreArray('EKLMHitBases')
+        self.hist_nDigit.Fill(len(digits))
+        self.hist_nHit2d.Fill(len(hit2ds))
+        for copper in range(0, len(rawklms)):
+            rawklm = rawklms[copper]
+            if rawklm.GetNumEntries() != 1:
+                print('##0 Event', event, 'copper', copper, ' getNumEntries=', rawklm.GetNumEntries())
+                continue
+            nodeID = rawklm.GetNodeID(0) - self.BKLM_ID
+            if nodeID >= self.EKLM_ID - self.BKLM_ID:
+                nodeID = nodeID - (self.EKLM_ID - self.BKLM_ID) + 4
+            self.hist_rawKLMnodeID.Fill(nodeID, copper)
+            if (nodeID < 0) or (nodeID > 4):  # skip EKLM nodes
+                continue
+        
+        
+        for digit in digits:
+            sector = digit.getSector()
+            endcap = digit.getEndcap()
+            time = digit.getTime()
+            ctime = digit.getCTime()
+            tdc   = digit.getTDC()
+            #klmdigi = digit.getRelatedTo('KLMDigitEventInfo')
+            #triggtime = digit.getRelativeCTime()
+            #print (ctime, tdc)#, triggtime)
+            #print(time)
+            self.hist_time.Fill(time)
+            self.hist_ctime.Fill(ctime)
+            self.hist_tdc.Fill(tdc)
+            if (endcap == 1):
+                self.hist_BackwardSectorOccupancy.Fill(sector)
+                self.hist_BackwardSectorbyctime.Fill(sector, ctime)
+            else:
+                self.hist_ForwardSectorOccupancy.Fill(sector)
+                self.hist_ForwardSectorbyctime.Fill(sector, ctime)
+            
+            self.hist_EndcapOccupancy.Fill(endcap)
+            
+            
+      
+        for hit2d in hit2ds:
+            sector = hit2d.getSector()
+            endcap = hit2d.getEndcap()
+            layer  = hit2d.getLayer()
+            gx     = hit2d.getPositionX()
+            gy     = hit2d.getPositionY()
+            gz     = hit2d.getPositionZ()
+            
+            if (endcap == 1):
+                self.hist_occupancyBackwardXY.Fill(gx, gy)
+                self.hist_LayeroccupancyBackwardRZ.Fill(layer, gz)
+                self.hist_LayeroccupancyBackward.Fill(layer)
+                self.hist_occupancyBackwardXYPerLayer[layer-1].Fill(gx, gy)
+            else:
+                self.hist_occupancyForwardXY.Fill(gx, gy)
+                self.hist_LayeroccupancyForwardRZ.Fill(layer, gz)
+                self.hist_LayeroccupancyForward.Fill(layer)
+                self.hist_occupancyForwardXYPerLayer[layer-1].Fill(gx, gy)
+            
+            
+
+        if self.parent is None:
+            self.histFiller.endEvent()
+        if (self.checkpointer is not None) and self.checkpointer.due(self.eventCounter):
+            self.checkpointer.write(self.histFiller, {'entries': self.eventCounter, 'eventCounter': self.eventCounter})
+        super(EventInspectorEKLM, self).return_value(someOK)
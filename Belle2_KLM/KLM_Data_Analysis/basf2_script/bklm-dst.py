@@ -10,7 +10,9 @@
 #     source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00 <or higher release>
 #   then verify that the corresponding proper global tag is used near the end of this script.
 #   (Global tags are tabulated at https://confluence.desy.de/display/BI/Global+Tag+%28GT%29+page)
-#   The external python script bklmDB.py must be in the same folder as this script.
+#   The external python scripts bklmDB.py, bklmLookup.py and rawKLMDecoder.py must be in the same folder as this script.
+#   To avoid compiling bklmDB.py at every job start, run 'python3 makeBklmMap.py' once to write the memory-mapped
+#   mapping file bklmDB.map next to bklmLookup.py.
 #
 # Usage:
 #   basf2 bklm-dst.py -- -e # -r # -i infilename -n # -d # -m # -t tagname
@@ -27,6 +29,13 @@
 #      -m #   to specify the minimum number of RPC BKLMHit2ds in any one sector (default is 4)
 #      -t tagName   to specify the name of conditions-database global tag (no default)
 #      -l #   to specify whether to use legacy time calculations (1) or not (0) (default is 0)
+#      -k #   to histogram BKLM only (0) or BKLM and EKLM in a single pass (1) (default is 0)
+#      -c #   to write (1) or not (0) the columnar RawKLM hit-cache file (default is 0)
+#      -p #   to write a checkpoint every # events (default is 0 = no checkpoints); a job started again
+#             with the same options resumes after the last checkpoint (ROOT input only, not with -c 1)
+#      -T #   to also write a checkpoint every # seconds when -p is positive (default is 600)
+#      -j #   to split the input events into # ranges analyzed in parallel by # basf2 processes whose
+#             histograms and event displays are then merged (default is 1; ROOT input only, not with -c 1 or -p)
 #
 # Input:
 #   ROOT DST file written by basf2 (may include multiple folios for one expt/run). For example,
@@ -35,8 +44,15 @@
 #   /ghi/fs01/belle2/bdata/Data/Raw/e0007/r01650/sub00/cosmic.0007.r01650.HLT1.f*.root
 #
 # Output:
-#   ROOT histogram file named bklmHists-e#r#.root, using the experiment number and run number
+#   ROOT histogram file named bklmHists-e#r#.root, using the experiment number and run number, or
+#     klmHists-e#r#_merged.root with -k 1, whose EKLM directory holds the EventInspectorEKLM histograms
+#     (python3 combineDirectory.py -e # -r # -m 1 arranges it for the web pages)
 #   PDF file named bklmHists-e#r#.pdf, using the experiment number and run number
+#   Event-display side file named bklmEvents#D-e#r#.npz if -d # is positive; draw it with
+#     python3 renderEvents.py -i bklmEvents#D-e#r#.npz
+#   Hit-cache file named bklmHits-e#r#.npz if -c 1 (with the -singleEntry/-multipleEntries suffix of the
+#   histogram file if -s # is positive); rebuild the RawKLM hit histograms from it with
+#     python3 rehistogram.py -i bklmHits-e#r#.npz [--t0RPC ... --workingdc ...]
 #
 
 import basf2
@@ -44,10 +60,15 @@ from basf2 import *
 import sys
 import EventInspector
 from EventInspector import *
+import EventInspectorEKLM
+from EventInspectorEKLM import *
+import checkpoint
+import eventShards
+import os
 import simulation
 import reconstruction
 import rawdata
-from optparse import Option, OptionValueError, OptionParser
+from optparse import Option, OptionValueError, OptionParser, SUPPRESS_HELP
 import glob
 
 parser = OptionParser()
@@ -78,6 +99,23 @@ parser.add_option('-m', '--minRPCHits',
 parser.add_option('-l', '--legacyTimes',
                   dest='legacyTimes', default='0',
                   help='Perform legacy time calculations (1) or not (0) for BKLMHit1ds,2ds [0]')
+parser.add_option('-k', '--klm',
+                  dest='klm', default='0',
+                  help='Histogram BKLM only (0) or BKLM and EKLM in a single pass (1) [0]')
+parser.add_option('-c', '--cache',
+                  dest='cache', default='0',
+                  help='Write (1) or not (0) the columnar RawKLM hit-cache file [0]')
+parser.add_option('-p', '--checkpoint',
+                  dest='checkpoint', default='0',
+                  help='Write a checkpoint every # events (0 = never) and resume from it [0]')
+parser.add_option('-T', '--checkpointTime',
+                  dest='checkpointTime', default='600',
+                  help='Also write a checkpoint every # seconds [600]')
+parser.add_option('-j', '--jobs',
+                  dest='jobs', default='1',
+                  help='Analyze the input in # event ranges in parallel [1]')
+parser.add_option('--shard', dest='shard', default='-1', help=SUPPRESS_HELP)
+parser.add_option('--entries', dest='entries', default='', help=SUPPRESS_HELP)
 parser.add_option('-t', '--tagName',
                   dest='tagName', default='data_reprocessing_prompt',
                   help='Conditions-database global-tag name [data_reprocessing_prompt]')
@@ -102,6 +140,17 @@ minRPCHits = int(options.minRPCHits)
 
 legacyTimes = int(options.legacyTimes)
 
+klm = int(options.klm)
+
+cache = int(options.cache)
+
+checkpointEvents = int(options.checkpoint)
+
+jobs = int(options.jobs)
+
+# set by the parent of an event-range shard (-j #): shard index and 'first:last' input entries
+shard = int(options.shard)
+
 tagName = options.tagName
 
 inputName = ''
@@ -154,9 +203,60 @@ if len(inputName) == 0:
 
 suffix = '' if singleEntry == 0 else '-singleEntry' if singleEntry == 1 else '-multipleEntries'
 histName = './bklmHists-e{0}r{1}{2}_corrected.root'.format(exp, run, suffix)
+if klm == 1:
+    histName = './klmHists-e{0}r{1}{2}_merged.root'.format(exp, run, suffix)
 #histName = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/bklmHists-e{0}r{1}{2}_corrected.root'.format(exp, run, suffix)
 #pdfName = 'bklmPlots-e{0}r{1}{2}.pdf'.format(exp, run, suffix)
 #eventPdfName = 'bklmEvents{3}D-e{0}r{1}{2}.pdf'.format(exp, run, suffix, view)
+displayName = 'bklmEvents{3}D-e{0}r{1}{2}.npz'.format(exp, run, suffix, view) if maxDisplays > 0 else ''
+cacheName = 'bklmHits-e{0}r{1}{2}.npz'.format(exp, run, suffix) if cache == 1 else ''
+
+if jobs > 1:
+    if (cache == 1) or (checkpointEvents > 0) or (inputName.find(".sroot") >= 0):
+        print("-j # needs ROOT input and cannot be combined with -c 1 or -p #")
+        sys.exit()
+    total = eventShards.totalEntries(inputName)
+    if maxCount >= 0:
+        total = min(total, maxCount)
+    ranges = eventShards.splitEntries(total, jobs)
+    print('bklm-dst: analyze', total, 'events of', inputName, 'in', len(ranges), 'parallel event ranges')
+    codes = eventShards.runShards(os.path.abspath(sys.argv[0]), sys.argv[1:], ranges, histName[:-5] + '.log')
+    if any(code != 0 for code in codes):
+        print('bklm-dst: shards', [i for i, code in enumerate(codes) if code != 0], 'failed; see',
+              histName[:-5] + '_shard##.log')
+        sys.exit(1)
+    eventShards.mergeHistograms(histName, [eventShards.shardName(histName, i) for i in range(0, len(ranges))])
+    if displayName != '':
+        count = eventShards.mergeDisplays(displayName,
+                                          [eventShards.shardName(displayName, i) for i in range(0, len(ranges))],
+                                          exp, run, minRPCHits, maxDisplays)
+        print('Wrote', count, 'event displays to', displayName)
+    for i in range(0, len(ranges)):
+        for name in (histName, displayName):
+            if name != '' and os.path.exists(eventShards.shardName(name, i)):
+                os.remove(eventShards.shardName(name, i))
+    print('bklm-dst: wrote', histName)
+    sys.exit()
+
+firstEvent = 0
+if shard >= 0:
+    histName = eventShards.shardName(histName, shard)
+    if displayName != '':
+        displayName = eventShards.shardName(displayName, shard)
+    firstEvent = int(options.entries.split(':')[0])
+
+checkpointer = None
+state = None
+if checkpointEvents > 0:
+    if cache == 1:
+        print("The hit-cache file cannot be resumed from a checkpoint; use -c 0 with -p #")
+        sys.exit()
+    if inputName.find(".sroot") >= 0:
+        print("Checkpoints need ROOT input; cannot resume {0}".format(inputName))
+        sys.exit()
+    checkpointer = checkpoint.Checkpointer(checkpoint.checkpointName(histName), checkpointEvents,
+                                           float(options.checkpointTime))
+    state = checkpoint.readState(checkpointer.fileName)
 
 if maxCount >= 0:
     print('bklm-dst: exp=' + exp + ' run=' + run + ' input=' + inputName + '. Analyze', maxCount, 'events using ' + tagName)
@@ -170,14 +270,34 @@ use_central_database(tagName)
 main = create_path()
 if inputName.find(".sroot") >= 0:
     main.add_module('SeqRootInput', inputFileNames=inputName)
+elif shard >= 0:
+    # read only this shard's event range
+    first, last = (int(entry) for entry in options.entries.split(':'))
+    inputFileNames, entrySequences = checkpoint.entryRange(inputName, first, last)
+    main.add_module('RootInput', inputFileNames=inputFileNames, entrySequences=entrySequences)
+elif state is not None:
+    # resume after the input entries that the checkpoint already contains
+    inputFileNames, entrySequences = checkpoint.resumeInput(inputName, state['entries'])
+    main.add_module('RootInput', inputFileNames=inputFileNames, entrySequences=entrySequences)
+    if maxCount >= 0:
+        maxCount = max(maxCount - state['entries'], 1)
 else:
     main.add_module('RootInput', inputFileName=inputName)
 main.add_module('ProgressBar')
 
-eventInspector = EventInspector(exp, run, histName, maxDisplays, minRPCHits, legacyTimes, singleEntry, view)
-rawdata.add_unpackers(main, components=['BKLM'])
-main.add_module('BKLMReconstructor')
-main.add_module(eventInspector)
+eventInspector = EventInspector(exp, run, histName, maxDisplays, minRPCHits, legacyTimes, singleEntry, view, displayName,
+                                cacheName, checkpointer, firstEvent=firstEvent, normalize=(shard < 0))
+if klm == 1:
+    # read and unpack the RawKLMs once for both subsystems; the EKLM histograms share the BKLM output file
+    rawdata.add_unpackers(main, components=['BKLM', 'EKLM'])
+    main.add_module('BKLMReconstructor')
+    main.add_module('EKLMReconstructor')
+    main.add_module(eventInspector)
+    main.add_module(EventInspectorEKLM(exp, run, '', parent=eventInspector))
+else:
+    rawdata.add_unpackers(main, components=['BKLM'])
+    main.add_module('BKLMReconstructor')
+    main.add_module(eventInspector)
 
 process(main, max_event=maxCount)
 print(statistics)
@@ -4,7 +4,8 @@
 # Prerequisite (on kekcc): type
 # source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
 #
-# This uses the external python scrypt bklmDB.py, which should be in the same folder.
+# This uses the external python scripts bklmLookup.py and bklmDB.py (or the binary mapping file
+# bklmDB.map written by makeBklmMap.py), which should be in the same folder.
 # 
 # basf2 bklm.py -- -e # -r #
 # Optional arguments:
@@ -19,7 +20,9 @@
 # (This script cannot analyze MDST files because they don't contain RawKLMs.)
 
 from basf2 import *
-import bklmDB
+import bklmGeometry
+import bklmLookup
+import histFiller
 import simulation
 import reconstruction
 import rawdata
@@ -89,139 +92,10 @@ class EventInspectorBKLM(Module):
         self.hist_ZY = ROOT.TH2F('ZY', ' ;z;y', 10, -345.0, 345.0, 10, -345.0, 345.0)
         self.hist_ZY.SetStats(False)
         ROOT.gStyle.SetOptStat(10)
-        self.bklmXY = []
-        r0 = 201.9 + 0.5 * 4.4 ## cm
-        dr = 9.1 ## cm
-        tan0 = math.tan(math.pi / 8.0)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -200.0, 0.0)
-        g.SetPoint(1, +200.0, 0.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmXY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, 0.0, -200.0)
-        g.SetPoint(1, 0.0, +200.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmXY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -5.0,  0.0)
-        g.SetPoint(1, +5.0,  0.0)
-        g.SetPoint(2,  0.0,  0.0)
-        g.SetPoint(3,  0.0, +5.0)
-        g.SetPoint(4,  0.0, -5.0)
-        g.SetLineColor(1)
-        g.SetLineWidth(1)
-        self.bklmXY.append(g)
-        for layer in range(0, 15):
-            r = r0 + layer * dr
-            x = r * tan0
-            g = ROOT.TGraph()
-            g.SetPoint(0, +r, -x)
-            g.SetPoint(1, +r, +x)
-            g.SetPoint(2, +x, +r)
-            g.SetPoint(3, -x, +r)
-            g.SetPoint(4, -r, +x)
-            g.SetPoint(5, -r, -x)
-            g.SetPoint(6, -x, -r)
-            g.SetPoint(7, +x, -r)
-            g.SetPoint(8, +r, -x)
-            if layer < 2:
-                g.SetLineColor(18)
-            else:
-                g.SetLineColor(17)
-                if (layer % 5) == 0:
-                    g.SetLineStyle(3)
-            g.SetLineWidth(1)
-            self.bklmXY.append(g)
-        self.bklmZY = []
-        rF = r0 + 14 * dr
-        x0 = r0 * tan0
-        z0 = 47.0 ## cm
-        zL = 220.0 ## cm
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0 - 140.0, 0.0)
-        g.SetPoint(1, +zL + z0 +  70.0, 0.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, 0.0, -315.0)
-        g.SetPoint(1, 0.0, +340.0)
-        g.SetLineColor(19)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -5.0,  0.0)
-        g.SetPoint(1, +5.0,  0.0)
-        g.SetPoint(2,  0.0,  0.0)
-        g.SetPoint(3,  0.0, +5.0)
-        g.SetPoint(4,  0.0, -5.0)
-        g.SetLineColor(1)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, +x0)
-        g.SetPoint(1, -zL + z0, +r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, -x0)
-        g.SetPoint(1, -zL + z0, -r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, +zL + z0, +x0)
-        g.SetPoint(1, +zL + z0, +r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, +zL + z0, -x0)
-        g.SetPoint(1, +zL + z0, -r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        g.SetLineStyle(3)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, r0)
-        g.SetPoint(1, +zL + z0, r0)
-        g.SetPoint(2, +zL + z0, rF)
-        g.SetPoint(3, -zL + z0, rF)
-        g.SetPoint(4, -zL + z0, r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, -r0)
-        g.SetPoint(1, +zL + z0, -r0)
-        g.SetPoint(2, +zL + z0, -rF)
-        g.SetPoint(3, -zL + z0, -rF)
-        g.SetPoint(4, -zL + z0, -r0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
-        g = ROOT.TGraph()
-        g.SetPoint(0, -zL + z0, -x0)
-        g.SetPoint(1, +zL + z0, -x0)
-        g.SetPoint(2, +zL + z0, +x0)
-        g.SetPoint(3, -zL + z0, +x0)
-        g.SetPoint(4, -zL + z0, -x0)
-        g.SetLineColor(18)
-        g.SetLineWidth(1)
-        self.bklmZY.append(g)
+        self.bklmXY, self.bklmZY = bklmGeometry.outlineGraphs()
         # fill the readout <-> detector map from the information retrieved from the conditions database
-        self.electIdToModuleId = bklmDB.fillDB()
+        # (dense table indexed by electId; one row holds moduleId, fb, sector, layer, plane, strip or all -1)
+        self.electIdLookup = bklmLookup.getLookup(exp, run)
         # maps for sectorFB <-> data concentrator
         self.sectorFBToDC = [ 11, 15, 2, 6, 10, 14, 3, 7, 9, 13, 0, 4, 8, 12, 1, 5 ]
         self.dcToSectorFB = [ 10, 14, 2, 6, 11, 15, 3, 7, 12, 8, 4, 0, 13, 9, 5, 1 ]
@@ -396,8 +270,12 @@ class EventInspectorBKLM(Module):
         self.hist_tRPCCal2dBySector = ROOT.TH2F('tRPCCal2dBySector', expRun+'RPC BKLMHit2d time distribution;sector # (0-7 = backward, 8-15 = forward);t - ct(trigger) - dt(sector) (ns)', 16, -0.5, 15.5, 256, -0.5, 1023.5)
         self.hist_ctScintCal2d = ROOT.TH1F('ctScintCal2d', expRun+'Scint BKLMHit2d ctime distribution;ct - ct(trigger) - dt(sector) (ns)', 128, -0.5, 1023.5)
         self.hist_ctScintCal2dBySector = ROOT.TH2F('ctScintCal2dBySector', expRun+'Scint BKLMHit2d ctime distribution;sector # (0-7 = backward, 8-15 = forward);ct - ct(trigger) - dt(sector) (ns)', 16, -0.5, 15.5, 128, -0.5, 1023.5)
+        # buffer the Fill() calls of all hist_* histograms and hand them to ROOT in bulk with FillN
+        self.histFiller = histFiller.HistogramFiller()
+        self.histFiller.adopt(self)
 
     def terminate(self):
+        self.histFiller.flush()
         for sectorFB in range(0, 16):
             mappedScintSectorOccupancy = self.hist_mappedScintSectorOccupancy.GetBinContent(sectorFB+1)
             if mappedScintSectorOccupancy > 0:
@@ -544,13 +422,9 @@ class EventInspectorBKLM(Module):
                             elif isScint:
                                 self.hist_rawKLMtExtraScint.Fill(sectorFB, tExtra)
                                 self.hist_rawKLMqExtraScint.Fill(sectorFB, qExtra)
-                            fb = -1
-                            sector = -1
-                            layer = -1
-                            plane = -1
-                            strip = -1
                             electId = (channel << 12) | (axis << 11) | (lane << 6) | (finesse << 4) | nodeID
-                            if electId in self.electIdToModuleId:
+                            moduleId, fb, sector, layer, plane, strip = self.electIdLookup.table[electId].tolist()
+                            if moduleId >= 0:
                                 if isRPC:
                                     if ctime < minRPCCtime:
                                         minRPCCtime = ctime
@@ -562,12 +436,6 @@ class EventInspectorBKLM(Module):
                                     if ctime > maxScintCtime:
                                         maxScintCtime = ctime
                                 self.hist_mappedSectorOccupancyMultihit.Fill(sectorFB)
-                                moduleId = self.electIdToModuleId[electId]
-                                fb = (moduleId & self.BKLM_END_MASK) >> self.BKLM_END_BIT
-                                sector = (moduleId & self.BKLM_SECTOR_MASK) >> self.BKLM_SECTOR_BIT
-                                layer = (moduleId & self.BKLM_LAYER_MASK) >> self.BKLM_LAYER_BIT
-                                plane = (moduleId & self.BKLM_PLANE_MASK) >> self.BKLM_PLANE_BIT
-                                strip = (moduleId & self.BKLM_STRIP_MASK) >> self.BKLM_STRIP_BIT
                             else:
                                 self.hist_unmappedSectorOccupancyMultihit.Fill(sectorFB)
                             rawFb[dc].append(fb)
@@ -613,7 +481,7 @@ class EventInspectorBKLM(Module):
                                 t0j = 0.75 * j
                                 ct  = (ctime << 3) - (trigCtime & 0x7fff8) # in ns, range is only 8 bits in SCROD (??)
                                 ct  = ct & 0x3ff
-                                if electId in self.electIdToModuleId:
+                                if self.electIdLookup.moduleId[electId] >= 0:
                                     self.hist_mappedSectorOccupancy.Fill(sectorFB)
                                     #if count[dc] > 60:
                                     #if (lane > 2) and (channelMultiplicity[laneAxisChannel] > 1):
@@ -956,6 +824,7 @@ class EventInspectorBKLM(Module):
                 for g in zyList:
                     g.Draw("L")
                 #self.eventCanvas.Print(eventPdfName, "Title:{0}".format(event))
+        self.histFiller.endEvent()
         super(EventInspectorBKLM, self).return_value(someOK)
 
 #=========================================================================
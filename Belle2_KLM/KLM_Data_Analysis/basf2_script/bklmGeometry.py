@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Nominal BKLM geometry for event displays and occupancy plots, computed once per job.
+#   STRIP_CENTRES holds the display coordinates of every strip centre, indexed by
+#   (fb, sector, layer, plane, strip), so the position of a BKLMHit1d spanning stripMin..stripMax
+#   is a gather of two table rows plus a midpoint average (see hitPositions).
+#   outlineGraphs() builds the detector outline drawn behind the hits in the end and side views.
+#
+#   Columns of STRIP_CENTRES:
+#     X, Y  end-view (x,y) position of a phi-readout strip (plane 1); NaN for z-readout strips
+#     Z     side-view z position of a z-readout strip (plane 0); NaN for phi-readout strips
+#     R     radius of the strip's layer (the side-view y coordinate)
+
+import math
+import numpy
+
+#: radius of the innermost layer (cm)
+R0 = 201.9 + 0.5 * 4.4
+#: radial distance between adjacent layers (cm)
+DR = 9.1
+#: z position of strip 0 of the z-readout planes (cm)
+Z0 = 47.0
+#: half-length of the barrel (cm)
+ZL = 220.0
+#: width of the scintillator z-readout strips (cm)
+DZ_SCINT = 4.0
+#: width of the RPC z-readout strips (cm)
+DZ_RPC = 4.52
+#: number of phi-readout strips in each layer
+N_PHI_STRIPS = [37, 42, 36, 36, 36, 36, 48, 48, 48, 48, 48, 48, 48, 48, 48]
+#: width of the phi-readout strips in each layer (cm)
+D_PHI_STRIPS = [4.0, 4.0, 4.9, 5.11, 5.32, 5.53, 4.3, 4.46, 4.62, 4.77, 4.93, 5.09, 5.25, 5.4, 5.56]
+#: direction of increasing phi-strip number of the scintillator layers, indexed by [fb][sector][layer]
+SCINT_FLIP = [[[-1, 1], [-1, 1], [1, 1], [1, -1], [1, -1], [1, -1], [-1, -1], [-1, 1]],
+              [[1, -1], [1, -1], [1, 1], [-1, 1], [-1, 1], [-1, 1], [-1, -1], [1, -1]]]
+#: tangent of the half-opening angle of a sector
+TAN0 = math.tan(math.pi / 8.0)
+
+#: column indices of STRIP_CENTRES
+X, Y, Z, R = 0, 1, 2, 3
+#: number of detector ends, sectors, layers, planes and strips per plane
+N_FB, N_SECTOR, N_LAYER, N_PLANE, N_STRIP = 2, 8, 15, 2, 48
+
+
+def makeStripCentres():
+    """Return the float64 array of shape (2, 8, 15, 2, 48, 4) of strip-centre display coordinates"""
+    centres = numpy.full((N_FB, N_SECTOR, N_LAYER, N_PLANE, N_STRIP, 4), numpy.nan)
+    strip = numpy.arange(N_STRIP, dtype=numpy.float64)
+    phi = numpy.pi * numpy.arange(N_SECTOR) / 4
+    cosine = numpy.cos(phi)
+    sine = numpy.sin(phi)
+    for layer in range(0, N_LAYER):
+        r = R0 + layer * DR
+        centres[:, :, layer, :, :, R] = r
+        dz = DZ_SCINT if layer < 2 else DZ_RPC
+        centres[0, :, layer, 0, :, Z] = Z0 - strip * dz
+        centres[1, :, layer, 0, :, Z] = Z0 + strip * dz
+        h = (strip - 0.5 * N_PHI_STRIPS[layer]) * D_PHI_STRIPS[layer]
+        for fb in range(0, N_FB):
+            for sector in range(0, N_SECTOR):
+                flip = SCINT_FLIP[fb][sector][layer] if layer < 2 else 1  # no flip for RPCs
+                centres[fb, sector, layer, 1, :, X] = r * cosine[sector] - h * flip * sine[sector]
+                centres[fb, sector, layer, 1, :, Y] = r * sine[sector] + h * flip * cosine[sector]
+    centres.setflags(write=False)
+    return centres
+
+
+#: display coordinates of every strip centre, indexed by (fb, sector, layer, plane, strip, column)
+STRIP_CENTRES = makeStripCentres()
+
+
+def hitPositions(fb, sector, layer, plane, stripMin, stripMax):
+    """Return the display coordinates (..., 4) of hits spanning stripMin..stripMax (midpoint of the end strips)
+
+    All arguments can be ints or NumPy arrays of equal length.
+
+    Arguments:
+        fb: detector end [0..1]
+        sector: sector [0..7]
+        layer: layer [0..14]
+        plane: plane [0..1]; 0 is z-readout, 1 is phi-readout
+        stripMin: lowest strip [0..47]
+        stripMax: highest strip [0..47]
+    """
+    return 0.5 * (STRIP_CENTRES[fb, sector, layer, plane, stripMin] + STRIP_CENTRES[fb, sector, layer, plane, stripMax])
+
+
+def outlinePoints():
+    """Return the BKLM outline polylines of the end (x,y) and side (z,y) views
+
+    Each view is a list of (points, lineColor, lineStyle) with points a list of (x,y) or (z,y) tuples.
+    """
+    rF = R0 + 14 * DR
+    x0 = R0 * TAN0
+    cross = [(-5.0, 0.0), (+5.0, 0.0), (0.0, 0.0), (0.0, +5.0), (0.0, -5.0)]
+    endView = [([(-200.0, 0.0), (+200.0, 0.0)], 19, 3),
+               ([(0.0, -200.0), (0.0, +200.0)], 19, 3),
+               (cross, 1, 1)]
+    for layer in range(0, N_LAYER):
+        r = R0 + layer * DR
+        x = r * TAN0
+        points = [(+r, -x), (+r, +x), (+x, +r), (-x, +r), (-r, +x), (-r, -x), (-x, -r), (+x, -r), (+r, -x)]
+        if layer < 2:
+            endView.append((points, 18, 1))
+        else:
+            endView.append((points, 17, 3 if (layer % 5) == 0 else 1))
+    sideView = [([(-ZL + Z0 - 140.0, 0.0), (+ZL + Z0 + 70.0, 0.0)], 19, 3),
+                ([(0.0, -315.0), (0.0, +340.0)], 19, 3),
+                (cross, 1, 1),
+                ([(-ZL + Z0, +x0), (-ZL + Z0, +R0)], 18, 3),
+                ([(-ZL + Z0, -x0), (-ZL + Z0, -R0)], 18, 3),
+                ([(+ZL + Z0, +x0), (+ZL + Z0, +R0)], 18, 3),
+                ([(+ZL + Z0, -x0), (+ZL + Z0, -R0)], 18, 3),
+                ([(-ZL + Z0, R0), (+ZL + Z0, R0), (+ZL + Z0, rF), (-ZL + Z0, rF), (-ZL + Z0, R0)], 18, 1),
+                ([(-ZL + Z0, -R0), (+ZL + Z0, -R0), (+ZL + Z0, -rF), (-ZL + Z0, -rF), (-ZL + Z0, -R0)], 18, 1),
+                ([(-ZL + Z0, -x0), (+ZL + Z0, -x0), (+ZL + Z0, +x0), (-ZL + Z0, +x0), (-ZL + Z0, -x0)], 18, 1)]
+    return endView, sideView
+
+
+def outlineGraphs():
+    """Return the lists of TGraphs (end view, side view) that draw the BKLM outline of the event displays"""
+    import ROOT
+    views = []
+    for view in outlinePoints():
+        graphs = []
+        for points, lineColor, lineStyle in view:
+            g = ROOT.TGraph()
+            for i, (u, v) in enumerate(points):
+                g.SetPoint(i, u, v)
+            g.SetLineColor(lineColor)
+            g.SetLineWidth(1)
+            if lineStyle != 1:
+                g.SetLineStyle(lineStyle)
+            graphs.append(g)
+        views.append(graphs)
+    return views[0], views[1]
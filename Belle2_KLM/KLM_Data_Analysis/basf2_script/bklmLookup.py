@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Dense electronicsID -> detector moduleID lookup table for BKLM readout channels.
+#   The table is indexed directly by electId; unmapped channels hold -1 in every column.
+#   Besides the moduleId itself, each row holds the precomputed fb, sector, layer, plane and strip
+#   so that one indexed gather replaces the dict membership test and the mask/shift decoding.
+#
+#   electId = (channel << 12) | (axis << 11) | (lane << 6) | (finesse << 4) | nodeID
+#   uses 19 bits, so the table has 2**19 rows.
+#
+#   The tables can be stored in a versioned binary mapping file (written by makeBklmMap.py) that holds
+#   one table per experiment/run validity range. getLookup() memory-maps the table that is valid for
+#   the requested run on first use, so job start-up does not execute bklmDB.py and forked workers
+#   share the read-only pages. Without a mapping file, getLookup() falls back to bklmDB.fillDB().
+#
+# Mapping-file layout (little-endian):
+#   header:    magic 'BKLMMAP', format version, number of payloads, rows and columns per table
+#   directory: one (expLow, runLow, expHigh, runHigh, offset) entry per payload; expHigh/runHigh = -1 is open-ended
+#   payloads:  int16 tables of shape (rows, columns), each aligned to a page boundary
+
+import os
+import numpy
+
+#: number of distinct electronics identifiers (channel is the highest field, at bits 12..18)
+ELECTID_SIZE = 1 << 19
+
+#: bit position for strip-1 [0..47]
+BKLM_STRIP_BIT = 0
+#: bit position for plane-1 [0..1]; 0 is inner-plane
+BKLM_PLANE_BIT = 6
+#: bit position for layer-1 [0..14]; 0 is innermost
+BKLM_LAYER_BIT = 7
+#: bit position for sector-1 [0..7]; 0 is on the +x axis and 2 is on the +y axis
+BKLM_SECTOR_BIT = 11
+#: bit position for detector end [0..1]; forward is 0
+BKLM_END_BIT = 14
+#: bit mask for strip-1 [0..47]
+BKLM_STRIP_MASK = 0x3f
+#: bit mask for plane-1 [0..1]; 0 is inner-plane
+BKLM_PLANE_MASK = (1 << BKLM_PLANE_BIT)
+#: bit mask for layer-1 [0..15]; 0 is innermost and 14 is outermost
+BKLM_LAYER_MASK = (15 << BKLM_LAYER_BIT)
+#: bit mask for sector-1 [0..7]; 0 is on the +x axis and 2 is on the +y axis
+BKLM_SECTOR_MASK = (7 << BKLM_SECTOR_BIT)
+#: bit mask for detector end [0..1]; forward is 0
+BKLM_END_MASK = (1 << BKLM_END_BIT)
+
+#: column names of the lookup table, in storage order
+COLUMNS = ('moduleId', 'fb', 'sector', 'layer', 'plane', 'strip')
+
+#: identifier at the start of every mapping file
+MAP_MAGIC = b'BKLMMAP'
+#: format version of the mapping file; bump whenever the layout changes
+MAP_VERSION = 1
+#: default mapping file, next to this module (can be overridden by the BKLM_MAP_FILE environment variable)
+MAP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bklmDB.map')
+#: alignment (bytes) of each payload in the mapping file
+MAP_ALIGNMENT = 4096
+
+#: mapping-file header
+_HEADER = numpy.dtype([('magic', 'S8'), ('version', '<u4'), ('nPayloads', '<u4'),
+                       ('nRows', '<u4'), ('nColumns', '<u4')])
+#: mapping-file directory entry (validity range and byte offset of one payload)
+_PAYLOAD = numpy.dtype([('expLow', '<i4'), ('runLow', '<i4'), ('expHigh', '<i4'), ('runHigh', '<i4'),
+                        ('offset', '<u8')])
+
+#: lookup tables that were already loaded in this process, keyed by (file name, payload index)
+_lookups = {}
+
+
+class ElectIdLookup:
+    """Dense electId -> (moduleId, fb, sector, layer, plane, strip) lookup table"""
+
+    def __init__(self, table):
+        """Constructor
+
+        Arguments:
+            table (numpy.ndarray): int16 array of shape (ELECTID_SIZE, 6) with the columns listed in COLUMNS
+        """
+        #: one row per electId: moduleId, fb, sector, layer, plane, strip (all -1 for unmapped channels)
+        self.table = table
+        #: moduleId column (-1 for unmapped channels)
+        self.moduleId = table[:, 0]
+        #: detector-end column [0..1]
+        self.fb = table[:, 1]
+        #: sector column [0..7]
+        self.sector = table[:, 2]
+        #: layer column [0..14]
+        self.layer = table[:, 3]
+        #: plane column [0..1]
+        self.plane = table[:, 4]
+        #: strip column [0..47]
+        self.strip = table[:, 5]
+
+    @classmethod
+    def fromDict(cls, electIdToModuleId):
+        """Build the lookup table from an electId -> moduleId dictionary (e.g. bklmDB.fillDB())
+
+        Arguments:
+            electIdToModuleId (dict): readout <-> detector map
+        """
+        electIds = numpy.fromiter(electIdToModuleId.keys(), dtype=numpy.int64, count=len(electIdToModuleId))
+        moduleIds = numpy.fromiter(electIdToModuleId.values(), dtype=numpy.int64, count=len(electIdToModuleId))
+        table = numpy.full((ELECTID_SIZE, len(COLUMNS)), -1, dtype=numpy.int16)
+        table[electIds, 0] = moduleIds
+        table[electIds, 1] = (moduleIds & BKLM_END_MASK) >> BKLM_END_BIT
+        table[electIds, 2] = (moduleIds & BKLM_SECTOR_MASK) >> BKLM_SECTOR_BIT
+        table[electIds, 3] = (moduleIds & BKLM_LAYER_MASK) >> BKLM_LAYER_BIT
+        table[electIds, 4] = (moduleIds & BKLM_PLANE_MASK) >> BKLM_PLANE_BIT
+        table[electIds, 5] = (moduleIds & BKLM_STRIP_MASK) >> BKLM_STRIP_BIT
+        return cls(table)
+
+    def isMapped(self, electId):
+        """Return True if the readout channel (or a NumPy array of them) has a detector module
+
+        Arguments:
+            electId (int or numpy.ndarray): electronics identifier(s)
+        """
+        return self.moduleId[electId] >= 0
+
+
+def _align(nBytes):
+    """Return nBytes rounded up to the next multiple of MAP_ALIGNMENT"""
+    return (nBytes + MAP_ALIGNMENT - 1) // MAP_ALIGNMENT * MAP_ALIGNMENT
+
+
+def _isValid(entry, exp, run):
+    """Return True if (exp, run) lies inside the validity range of a mapping-file directory entry"""
+    if (exp, run) < (entry['expLow'], entry['runLow']):
+        return False
+    if entry['expHigh'] < 0:
+        return True
+    if exp != entry['expHigh']:
+        return exp < entry['expHigh']
+    return (entry['runHigh'] < 0) or (run <= entry['runHigh'])
+
+
+def writeMapFile(fileName, payloads):
+    """Write lookup tables with their validity ranges to a binary mapping file
+
+    The file is written to a temporary name first and then renamed, so readers never see a partial file.
+
+    Arguments:
+        fileName (str): path name of the mapping file
+        payloads (list): (expLow, runLow, expHigh, runHigh, ElectIdLookup) tuples; -1 means open-ended
+    """
+    header = numpy.zeros(1, dtype=_HEADER)
+    header['magic'] = MAP_MAGIC
+    header['version'] = MAP_VERSION
+    header['nPayloads'] = len(payloads)
+    header['nRows'] = ELECTID_SIZE
+    header['nColumns'] = len(COLUMNS)
+    directory = numpy.zeros(len(payloads), dtype=_PAYLOAD)
+    offset = _align(header.nbytes + directory.nbytes)
+    for i, (expLow, runLow, expHigh, runHigh, lookup) in enumerate(payloads):
+        directory[i] = (expLow, runLow, expHigh, runHigh, offset)
+        offset += _align(ELECTID_SIZE * len(COLUMNS) * numpy.dtype('<i2').itemsize)
+    tmpName = fileName + '.tmp'
+    with open(tmpName, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(directory.tobytes())
+        for entry, payload in zip(directory, payloads):
+            f.seek(int(entry['offset']))
+            f.write(numpy.ascontiguousarray(payload[4].table, dtype='<i2').tobytes())
+    os.replace(tmpName, fileName)
+
+
+def readMapDirectory(fileName):
+    """Return the payload directory of a binary mapping file after checking its header
+
+    Arguments:
+        fileName (str): path name of the mapping file
+    """
+    header = numpy.fromfile(fileName, dtype=_HEADER, count=1)
+    if len(header) != 1 or header['magic'][0] != MAP_MAGIC:
+        raise ValueError('{0} is not a BKLM mapping file'.format(fileName))
+    if header['version'][0] != MAP_VERSION:
+        raise ValueError('{0} has mapping-file version {1} but version {2} is required'.format(
+            fileName, header['version'][0], MAP_VERSION))
+    if header['nRows'][0] != ELECTID_SIZE or header['nColumns'][0] != len(COLUMNS):
+        raise ValueError('{0} has tables of unexpected shape'.format(fileName))
+    return numpy.fromfile(fileName, dtype=_PAYLOAD, count=int(header['nPayloads'][0]), offset=_HEADER.itemsize)
+
+
+def loadMapFile(fileName, exp, run):
+    """Memory-map and return the ElectIdLookup that is valid for (exp, run) in a binary mapping file
+
+    When several validity ranges contain (exp, run), the payload written last wins.
+
+    Arguments:
+        fileName (str): path name of the mapping file
+        exp (int): experiment number
+        run (int): run number
+    """
+    directory = readMapDirectory(fileName)
+    for index in range(len(directory) - 1, -1, -1):
+        if _isValid(directory[index], exp, run):
+            break
+    else:
+        raise ValueError('{0} has no BKLM mapping for experiment {1} run {2}'.format(fileName, exp, run))
+    key = (os.path.abspath(fileName), index)
+    if key not in _lookups:
+        table = numpy.memmap(fileName, dtype='<i2', mode='r', offset=int(directory[index]['offset']),
+                             shape=(ELECTID_SIZE, len(COLUMNS)))
+        _lookups[key] = ElectIdLookup(table)
+    return _lookups[key]
+
+
+def getLookup(exp, run, fileName=None):
+    """Return the ElectIdLookup for (exp, run), loading it lazily on first use
+
+    Uses the binary mapping file if it exists; otherwise the table is built once from bklmDB.fillDB().
+
+    Arguments:
+        exp (int or str): experiment number
+        run (int or str): run number
+        fileName (str): path name of the mapping file [BKLM_MAP_FILE or MAP_FILE]
+    """
+    if fileName is None:
+        fileName = os.environ.get('BKLM_MAP_FILE', MAP_FILE)
+    if os.path.exists(fileName):
+        return loadMapFile(fileName, int(exp), int(run))
+    if 'bklmDB' not in _lookups:
+        import bklmDB
+        _lookups['bklmDB'] = ElectIdLookup.fromDict(bklmDB.fillDB())
+    return _lookups['bklmDB']
@@ -4,7 +4,8 @@
 # Prerequisite (on kekcc): type
 # source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
 #
-# This uses the external python scrypt bklmDB.py, which should be in the same folder.
+# This uses the external python scripts bklmLookup.py and bklmDB.py (or the binary mapping file
+# bklmDB.map written by makeBklmMap.py), which should be in the same folder.
 # 
 # basf2 bklm.py -- -e # -r #
 # Optional arguments:
@@ -19,7 +20,7 @@
 # (This script cannot analyze MDST files because they don't contain RawKLMs.)
 
 from basf2 import *
-import bklmDB
+import bklmLookup
 import simulation
 import reconstruction
 import rawdata
@@ -221,7 +222,8 @@ class EventInspectorBKLM(Module):
         g.SetLineWidth(1)
         self.bklmZY.append(g)
         # fill the readout <-> detector map from the information retrieved from the conditions database
-        self.electIdToModuleId = bklmDB.fillDB()
+        # (dense table indexed by electId; one row holds moduleId, fb, sector, layer, plane, strip or all -1)
+        self.electIdLookup = bklmLookup.getLookup(exp, run)
         # maps for sectorFB <-> data concentrator
         self.sectorFBToDC = [ 11, 15, 2, 6, 10, 14, 3, 7, 9, 13, 0, 4, 8, 12, 1, 5 ]
         self.dcToSectorFB = [ 10, 14, 2, 6, 11, 15, 3, 7, 12, 8, 4, 0, 13, 9, 5, 1 ]
@@ -554,13 +556,9 @@ class EventInspectorBKLM(Module):
                             elif isScint:
                                 self.hist_rawKLMtExtraScint.Fill(sectorFB, tExtra)
                                 self.hist_rawKLMqExtraScint.Fill(sectorFB, qExtra)
-                            fb = -1
-                            sector = -1
-                            layer = -1
-                            plane = -1
-                            strip = -1
                             electId = (channel << 12) | (axis << 11) | (lane << 6) | (finesse << 4) | nodeID
-                            if electId in self.electIdToModuleId:
+                            moduleId, fb, sector, layer, plane, strip = self.electIdLookup.table[electId].tolist()
+                            if moduleId >= 0:
                                 if isRPC:
                                     if ctime < minRPCCtime:
                                         minRPCCtime = ctime
@@ -572,12 +570,6 @@ class EventInspectorBKLM(Module):
                                     if ctime > maxScintCtime:
                                         maxScintCtime = ctime
                                 self.hist_mappedSectorOccupancyMultihit.Fill(sectorFB)
-                                moduleId = self.electIdToModuleId[electId]
-                                fb = (moduleId & self.BKLM_END_MASK) >> self.BKLM_END_BIT
-                                sector = (moduleId & self.BKLM_SECTOR_MASK) >> self.BKLM_SECTOR_BIT
-                                layer = (moduleId & self.BKLM_LAYER_MASK) >> self.BKLM_LAYER_BIT
-                                plane = (moduleId & self.BKLM_PLANE_MASK) >> self.BKLM_PLANE_BIT
-                                strip = (moduleId & self.BKLM_STRIP_MASK) >> self.BKLM_STRIP_BIT
                             else:
                                 self.hist_unmappedSectorOccupancyMultihit.Fill(sectorFB)
                             rawFb[dc].append(fb)
@@ -623,7 +615,7 @@ class EventInspectorBKLM(Module):
                                 t0j = 0.75 * j
                                 ct  = (ctime << 3) - (trigCtime & 0x7fff8) # in ns, range is only 8 bits in SCROD (??)
                                 ct  = ct & 0x3ff
-                                if electId in self.electIdToModuleId:
+                                if self.electIdLookup.moduleId[electId] >= 0:
                                     self.hist_mappedSectorOccupancy.Fill(sectorFB)
                                     #if count[dc] > 60:
                                     #if (lane > 2) and (channelMultiplicity[laneAxisChannel] > 1):
@@ -1003,6 +995,12 @@ parser.add_option('-t', '--hlt', dest='tHLT',
 parser.add_option('-c', '--count', dest='counter',
                   default='1000',
                   help='Max # of event displays [default=1000]')
+parser.add_option('-i', '--inputfile', dest='infilename',
+                  default='',
+                  help='Input ROOT file(s), instead of all files of the HLT stream [no default]')
+parser.add_option('-o', '--outputfile', dest='outfilename',
+                  default='',
+                  help='Output histogram file [default=bklmHists-e#r#_HLT#.root]')
 (options, args) = parser.parse_args()
 exp = '{0:04d}'.format(int(options.eNumber))
 run = '{0:05d}'.format(int(options.rNumber))
@@ -1044,6 +1042,8 @@ elif int(exp) == 5: # new cosmic runs
         seqInputNames = [ prefix + 'stottler_aux_run45_dcFirmwareTest_v190110.sroot' ]
     if int(run) == 46:
         seqInputNames = [ prefix + 'stottler_30kHzPoisson_run46_dcFirmwareTest_v190110.sroot' ]
+if options.infilename != '':
+    inputName = options.infilename
 print(inputName)
 #print (seqInputNames)
 
@@ -1052,6 +1052,8 @@ print(inputName)
 
 outputName = 'bklm-e{0}r{1}.root'.format(exp, run)
 histName = 'bklmHists-e{0}r{1}_{2}.root'.format(exp, run, HLT)
+if options.outfilename != '':
+    histName = options.outfilename
 #histName = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/bklmHists-e{0}r{1}_{2}.root'.format(exp, run, HLT)
 #pdfName = 'bklmPlots-e{0}r{1}.pdf'.format(exp, run)
 #eventPdfName = 'bklmEvents-e{0}r{1}.pdf'.format(exp, run)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Checkpoint and resume for long EventInspector/EventInspectorEKLM jobs, so that a killed or pre-empted job
+#   loses minutes of work instead of starting again from event 0.
+#
+#   Every N events or T seconds the inspector hands its HistogramFiller to Checkpointer.write(), which saves
+#   all booked histograms (unnormalized, in booking order) together with the event counter and the number of
+#   input entries consumed into one ROOT file. The file is written under a temporary name and renamed, so a
+#   checkpoint is always complete. The selected event displays are saved next to it (see eventDisplay.py).
+#
+#   When the same job is started again, the steering script finds the checkpoint with readState() and
+#   restarts RootInput after the consumed entries with resumeInput(), which turns the position into one
+#   entrySequences range per remaining input file. At the start of the run the inspector calls
+#   Checkpointer.restore(), which adds the saved histograms to the freshly booked ones and returns the
+#   saved counters. A job that terminates normally removes its checkpoint.
+#
+# Checkpoint file contents:
+#   h#####       histogram number ##### of the filler (booking order), under its own title and binning
+#   checkpoint   TNamed whose title is the JSON state: entries, eventCounter, eventDisplays, ...
+
+import os
+import glob
+import json
+import time
+import ROOT
+
+
+def checkpointName(histName):
+    """Return the checkpoint file name that belongs to an output histogram file
+
+    Arguments:
+        histName (str): path name of the output histogram ROOT file
+    """
+    return (histName[:-5] if histName.endswith('.root') else histName) + '.ckpt.root'
+
+
+def readState(fileName):
+    """Return the saved state (dict) of a checkpoint file, or None if there is no usable checkpoint
+
+    Arguments:
+        fileName (str): path name of the checkpoint file
+    """
+    if not os.path.exists(fileName):
+        return None
+    checkpointFile = ROOT.TFile.Open(fileName)
+    if not checkpointFile or checkpointFile.IsZombie():
+        return None
+    named = checkpointFile.Get('checkpoint')
+    state = json.loads(named.GetTitle()) if named else None
+    checkpointFile.Close()
+    return state
+
+
+def countEntries(fileName, treeName='tree'):
+    """Return the number of entries of the event tree in a ROOT file
+
+    Arguments:
+        fileName (str): path name of the ROOT file
+        treeName (str): name of the event tree
+    """
+    rootFile = ROOT.TFile.Open(fileName)
+    tree = rootFile.Get(treeName) if rootFile and not rootFile.IsZombie() else None
+    count = int(tree.GetEntries()) if tree else 0
+    if rootFile:
+        rootFile.Close()
+    return count
+
+
+def entryRange(inputName, first, last=None):
+    """Return (inputFileNames, entrySequences) for RootInput that read only the input entries first..last
+
+    The entries are numbered over the files matching inputName in sorted order; files without entries in the
+    range are dropped and the remaining ones get one 'first:last' range each.
+
+    Arguments:
+        inputName (str): input file name or wildcard pattern, as given to RootInput
+        first (int): first entry to read
+        last (int): last entry to read [last entry of the input]
+    """
+    fileNames = []
+    sequences = []
+    offset = 0
+    for fileName in sorted(glob.glob(inputName)):
+        if (last is not None) and (offset > last):
+            break
+        count = countEntries(fileName)
+        begin = max(first - offset, 0)
+        end = count - 1 if last is None else min(last - offset, count - 1)
+        if begin <= end:
+            fileNames.append(fileName)
+            sequences.append('{0}:{1}'.format(begin, end))
+        offset += count
+    return fileNames, sequences
+
+
+def resumeInput(inputName, entries):
+    """Return (inputFileNames, entrySequences) for RootInput that skip the first entries of the input
+
+    Arguments:
+        inputName (str): input file name or wildcard pattern, as given to RootInput
+        entries (int): number of input entries consumed before the checkpoint
+    """
+    return entryRange(inputName, entries)
+
+
+class Checkpointer:
+    """Write the histograms and counters of an inspector to a checkpoint file every N events or T seconds"""
+
+    def __init__(self, fileName, everyEvents=10000, everySeconds=600.0):
+        """Constructor
+
+        Arguments:
+            fileName (str): path name of the checkpoint file
+            everyEvents (int): write a checkpoint every everyEvents events (0 for no event-count trigger)
+            everySeconds (float): write a checkpoint every everySeconds seconds (0 for no time trigger)
+        """
+        #: path name of the checkpoint file
+        self.fileName = fileName
+        #: path name of the event-display snapshot that goes with the checkpoint
+        self.displayName = fileName[:-5] + '.displays.npz'
+        #: number of events between checkpoints
+        self.everyEvents = everyEvents
+        #: number of seconds between checkpoints
+        self.everySeconds = everySeconds
+        #: event counter at the last checkpoint
+        self.lastEvents = 0
+        #: time of the last checkpoint
+        self.lastTime = time.time()
+        #: True once restore() has been called
+        self.restored = False
+
+    def restore(self, filler, recorder=None):
+        """Add the saved histograms to the filler's histograms and return the saved state (None if none)
+
+        Only the first call does anything, so it can be made from beginRun().
+
+        Arguments:
+            filler (histFiller.HistogramFiller): filler holding all histograms of the job
+            recorder (eventDisplay.EventDisplayRecorder): recorder that gets the saved event displays [none]
+        """
+        if self.restored:
+            return None
+        self.restored = True
+        state = readState(self.fileName)
+        if state is None:
+            return None
+        directory = ROOT.gDirectory.GetPath()
+        checkpointFile = ROOT.TFile.Open(self.fileName)
+        for index, hist in enumerate(filler.histograms()):
+            saved = checkpointFile.Get('h{0:05d}'.format(index))
+            if not saved or saved.GetNbinsX() != hist.GetNbinsX() or saved.GetNbinsY() != hist.GetNbinsY():
+                checkpointFile.Close()
+                raise RuntimeError('checkpoint {0} does not match histogram {1}'.format(self.fileName, hist.GetName()))
+            hist.Add(saved)
+        checkpointFile.Close()
+        ROOT.gDirectory.cd(directory)
+        if recorder is not None and os.path.exists(self.displayName):
+            recorder.restore(self.displayName, state['eventCounter'])
+        self.lastEvents = state['eventCounter']
+        print('Resumed from checkpoint', self.fileName, 'after', state['entries'], 'input entries')
+        return state
+
+    def due(self, eventCounter):
+        """Return True if a checkpoint is due after this event
+
+        Arguments:
+            eventCounter (int): number of events processed so far
+        """
+        if self.everyEvents > 0 and eventCounter - self.lastEvents >= self.everyEvents:
+            return True
+        return self.everySeconds > 0 and time.time() - self.lastTime >= self.everySeconds
+
+    def write(self, filler, state, recorder=None):
+        """Write all histograms of the filler and the state to the checkpoint file
+
+        Arguments:
+            filler (histFiller.HistogramFiller): filler holding all histograms of the job
+            state (dict): counters to save; must contain entries and eventCounter
+            recorder (eventDisplay.EventDisplayRecorder): recorder whose event displays are saved too [none]
+        """
+        if recorder is not None:
+            recorder.write(self.displayName)
+        directory = ROOT.gDirectory.GetPath()
+        tmpName = self.fileName + '.tmp.root'
+        checkpointFile = ROOT.TFile(tmpName, 'RECREATE')
+        for index, hist in enumerate(filler.histograms()):
+            checkpointFile.WriteTObject(hist, 'h{0:05d}'.format(index))
+        ROOT.TNamed('checkpoint', json.dumps(state)).Write()
+        checkpointFile.Close()
+        os.replace(tmpName, self.fileName)
+        ROOT.gDirectory.cd(directory)
+        self.lastEvents = state['eventCounter']
+        self.lastTime = time.time()
+
+    def remove(self):
+        """Remove the checkpoint files after a successful job"""
+        for fileName in (self.fileName, self.displayName):
+            if os.path.exists(fileName):
+                os.remove(fileName)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Compact storage of BKLM event displays. During event processing, EventInspector keeps only the
+#   hit coordinates of the events that pass the event-display selection; they are written to a
+#   NumPy .npz side file at the end of the job and drawn later by renderEvents.py.
+#
+# Side-file contents (one entry per display or per displayed hit):
+#   exp, run, minRPCHits       scalars copied from the job
+#   event, ordinal, view       per display: event number, ordinal event number in the job, 1D (1) or 2D (2) hits
+#   hitStart                   per display + 1: index of the display's first hit (hits are stored display by display)
+#   panel                      per hit: 0 for the end view (u,v) = (x,y), 1 for the side view (u,v) = (z,y)
+#   sector, u, v, color        per hit: sector [0..7], display coordinates (cm), ROOT line colour
+
+import os
+import numpy
+
+#: panel index of the BKLM end view (x,y)
+END_VIEW = 0
+#: panel index of the BKLM side view (z,y)
+SIDE_VIEW = 1
+
+
+class EventDisplayRecorder:
+    """Collect the hit coordinates of the selected event displays and write them to a side file"""
+
+    def __init__(self, exp, run, minRPCHits):
+        """Constructor
+
+        Arguments:
+            exp (str): formatted experiment number
+            run (str): formatted run number
+            minRPCHits (int): min # of RPC hits in any sector for event display (for the record)
+        """
+        #: experiment number
+        self.exp = int(exp)
+        #: run number
+        self.run = int(run)
+        #: minimum number of RPC hits in any sector for event display
+        self.minRPCHits = minRPCHits
+        #: per-display (event, ordinal, view) tuples
+        self.displays = []
+        #: per-display hit arrays (panel, sector, u, v, color)
+        self.hits = []
+
+    def __len__(self):
+        """Return the number of recorded displays"""
+        return len(self.displays)
+
+    def add(self, event, ordinal, view, panel, sector, u, v, color):
+        """Record one event display; the per-hit arguments are NumPy arrays (or sequences) of equal length
+
+        Arguments:
+            event (int): event number
+            ordinal (int): ordinal event number in this job
+            view (int): display built from one-dimensional (1) or two-dimensional (2) hits
+            panel: END_VIEW or SIDE_VIEW of each hit
+            sector: sector [0..7] of each hit
+            u: horizontal display coordinate (cm) of each hit
+            v: vertical display coordinate (cm) of each hit
+            color: ROOT line colour of each hit
+        """
+        self.displays.append((event, ordinal, view))
+        self.hits.append((numpy.asarray(panel, dtype=numpy.int8), numpy.asarray(sector, dtype=numpy.int8),
+                          numpy.asarray(u, dtype=numpy.float32), numpy.asarray(v, dtype=numpy.float32),
+                          numpy.asarray(color, dtype=numpy.int16)))
+
+    def restore(self, fileName, maxOrdinal):
+        """Record again the displays of a side file written earlier by this job (see checkpoint.py)
+
+        Arguments:
+            fileName (str): path name of the side file
+            maxOrdinal (int): ignore displays of events after this ordinal event number
+        """
+        exp, run, displays = readDisplays(fileName)
+        for display in displays:
+            if display['ordinal'] <= maxOrdinal:
+                self.add(display['event'], display['ordinal'], display['view'], display['panel'],
+                         display['sector'], display['u'], display['v'], display['color'])
+
+    def write(self, fileName):
+        """Write the recorded displays to a .npz side file (via a temporary file, so it is never partial)
+
+        Arguments:
+            fileName (str): path name of the side file
+        """
+        displays = numpy.array(self.displays, dtype=numpy.int64).reshape(-1, 3)
+        counts = [len(hit[0]) for hit in self.hits]
+        hitStart = numpy.concatenate(([0], numpy.cumsum(counts, dtype=numpy.int64)))
+        columns = []
+        for i, dtype in enumerate((numpy.int8, numpy.int8, numpy.float32, numpy.float32, numpy.int16)):
+            columns.append(numpy.concatenate([hit[i] for hit in self.hits]) if self.hits else numpy.zeros(0, dtype))
+        tmpName = fileName + '.tmp.npz'
+        numpy.savez_compressed(tmpName, exp=self.exp, run=self.run, minRPCHits=self.minRPCHits,
+                               event=displays[:, 0], ordinal=displays[:, 1], view=displays[:, 2], hitStart=hitStart,
+                               panel=columns[0], sector=columns[1], u=columns[2], v=columns[3], color=columns[4])
+        os.replace(tmpName, fileName)
+
+
+def readDisplays(fileName):
+    """Return (exp, run, displays) from an event-display side file
+
+    Each display is a dict with keys event, ordinal, view and the per-hit arrays panel, sector, u, v, color.
+
+    Arguments:
+        fileName (str): path name of the side file
+    """
+    with numpy.load(fileName) as data:
+        exp = int(data['exp'])
+        run = int(data['run'])
+        hitStart = data['hitStart']
+        columns = {name: data[name] for name in ('panel', 'sector', 'u', 'v', 'color')}
+        displays = []
+        for i in range(0, len(data['event'])):
+            display = {'event': int(data['event'][i]), 'ordinal': int(data['ordinal'][i]), 'view': int(data['view'][i])}
+            for name, column in columns.items():
+                display[name] = column[hitStart[i]:hitStart[i + 1]]
+            displays.append(display)
+    return exp, run, displays
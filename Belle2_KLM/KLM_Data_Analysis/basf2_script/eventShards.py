@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Event-range sharding of one bklm-dst.py job across the cores of a node (bklm-dst.py -j #), also when the
+#   input is a single large file. The input entries are split into contiguous ranges; each range is analyzed
+#   by a copy of the job in its own basf2 process, which reads only its range through RootInput
+#   entrySequences (see checkpoint.entryRange) and numbers its events from the first entry of the range, so
+#   the ordinal event numbers of the event displays are those of a single-process job.
+#
+#   The shards write unnormalized histograms; mergeHistograms() adds them in shard order, then converts the
+#   lane/axis occupancies to percent as EventInspector.terminate() does. mergeDisplays() concatenates the
+#   event displays in shard order and keeps the first maxDisplays, which are the displays a single-process
+#   job would have selected.
+
+import os
+import subprocess
+import ROOT
+import checkpoint
+import eventDisplay
+import rawKLMHists
+
+
+def shardName(fileName, shard):
+    """Return the name of a shard's output file: fileName with _shard## before the extension
+
+    Arguments:
+        fileName (str): path name of the merged output file
+        shard (int): shard index
+    """
+    base, extension = os.path.splitext(fileName)
+    return '{0}_shard{1:02d}{2}'.format(base, shard, extension)
+
+
+def totalEntries(inputName):
+    """Return the number of entries in the input files matching inputName
+
+    Arguments:
+        inputName (str): input file name or wildcard pattern, as given to RootInput
+    """
+    fileNames, sequences = checkpoint.entryRange(inputName, 0)
+    return sum(int(sequence.split(':')[1]) + 1 for sequence in sequences)
+
+
+def splitEntries(total, nShards):
+    """Return up to nShards contiguous (first, last) entry ranges of nearly equal size that cover 0..total-1
+
+    Arguments:
+        total (int): number of entries
+        nShards (int): number of shards
+    """
+    nShards = max(1, min(nShards, total))
+    ranges = []
+    first = 0
+    for shard in range(0, nShards):
+        size = total // nShards + (1 if shard < total % nShards else 0)
+        if size > 0:
+            ranges.append((first, first + size - 1))
+        first += size
+    return ranges
+
+
+def runShards(script, arguments, ranges, logName):
+    """Run one basf2 process per entry range in parallel and return their exit codes in shard order
+
+    Arguments:
+        script (str): path name of the steering script
+        arguments (list): the script's own arguments (they are repeated for every shard)
+        ranges (list): (first, last) entry range of every shard
+        logName (str): path name of the log file; each shard writes to shardName(logName, shard)
+    """
+    processes = []
+    for shard, (first, last) in enumerate(ranges):
+        log = open(shardName(logName, shard), 'w')
+        command = ['basf2', script, '--'] + list(arguments) + ['-j', '1', '--shard', str(shard),
+                                                               '--entries', '{0}:{1}'.format(first, last)]
+        processes.append((subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log))
+    codes = []
+    for process, log in processes:
+        codes.append(process.wait())
+        log.close()
+    return codes
+
+
+def _collect(directory, path, hists):
+    """Append (path, name, histogram) of every histogram below a directory, in key order"""
+    seen = set()
+    for key in directory.GetListOfKeys():
+        name = key.GetName()
+        if name in seen:
+            continue
+        seen.add(name)
+        thisObject = key.ReadObj()
+        if thisObject.InheritsFrom('TDirectory'):
+            _collect(thisObject, path + name + '/', hists)
+        elif thisObject.InheritsFrom('TH1'):
+            thisObject.SetDirectory(0)
+            hists.append((path, name, thisObject))
+
+
+def mergeHistograms(outputName, partialNames):
+    """Add the histograms of the shards in shard order, normalize the lane/axis occupancies, write outputName
+
+    Arguments:
+        outputName (str): path name of the merged histogram file (written via a temporary file)
+        partialNames (list): path names of the shards' histogram files, in shard order
+    """
+    merged = None
+    for partialName in partialNames:
+        partialFile = ROOT.TFile.Open(partialName)
+        if not partialFile or partialFile.IsZombie():
+            raise RuntimeError('cannot read shard output {0}'.format(partialName))
+        hists = []
+        _collect(partialFile, '', hists)
+        partialFile.Close()
+        if merged is None:
+            merged = hists
+            continue
+        if [(path, name) for path, name, hist in hists] != [(path, name) for path, name, hist in merged]:
+            raise RuntimeError('shard output {0} holds other histograms than the first shard'.format(partialName))
+        for (path, name, total), (path2, name2, hist) in zip(merged, hists):
+            total.Add(hist)
+    byName = {path + name: hist for path, name, hist in merged}
+    for sectorName, laneAxisName in rawKLMHists.OCCUPANCY_PAIRS:
+        if sectorName in byName and laneAxisName in byName:
+            rawKLMHists.normalizeLaneAxisOccupancy(byName[sectorName], byName[laneAxisName])
+    tmpName = outputName + '.tmp.root'
+    outputFile = ROOT.TFile(tmpName, 'RECREATE')
+    for path, name, hist in merged:
+        directory = outputFile
+        for part in path.split('/')[:-1]:
+            directory = directory.GetDirectory(part) or directory.mkdir(part)
+        directory.WriteTObject(hist, name)
+    outputFile.Close()
+    os.replace(tmpName, outputName)
+
+
+def mergeDisplays(displayName, partialNames, exp, run, minRPCHits, maxDisplays):
+    """Concatenate the event displays of the shards in shard order and keep the first maxDisplays
+
+    Arguments:
+        displayName (str): path name of the merged event-display side file
+        partialNames (list): path names of the shards' side files, in shard order
+        exp (str): formatted experiment number
+        run (str): formatted run number
+        minRPCHits (int): min # of RPC hits in any sector for event display (for the record)
+        maxDisplays (int): max # of event displays
+    """
+    recorder = eventDisplay.EventDisplayRecorder(exp, run, minRPCHits)
+    for partialName in partialNames:
+        if os.path.exists(partialName):
+            recorder.restore(partialName, float('inf'))
+    del recorder.displays[maxDisplays:]
+    del recorder.hits[maxDisplays:]
+    recorder.write(displayName)
+    return len(recorder)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Batched filling of ROOT histograms from python. Every TH1.Fill/TH2.Fill call from a basf2 python
+#   module crosses the python/C++ boundary; with hundreds of fills per event this dominates the CPU time.
+#   A BufferedHist stands in for one histogram and collects the Fill() arguments in preallocated NumPy
+#   buffers; the buffers are handed to the histogram in bulk with FillN when they are full, every
+#   flushEvents events, and when the job terminates. Since FillN calls Fill for each entry, the bin
+#   contents and statistics are identical to those of unbuffered filling.
+#
+# Usage (inside a basf2 module):
+#   initialize(): book histograms as self.hist_* attributes as before, then
+#                     self.histFiller = histFiller.HistogramFiller()
+#                     self.histFiller.adopt(self)
+#   event():      fill as before via self.hist_*.Fill(...); call self.histFiller.endEvent() at the end
+#   terminate():  self.histFiller.flush() before writing the histogram file
+#
+#   Any other attribute of a BufferedHist (GetBinContent, SetTitle, Draw, ...) flushes the buffer first
+#   and is then forwarded to the underlying histogram, so the adopted hist_* attributes behave as before.
+
+import numpy
+import ROOT
+
+
+class BufferedHist:
+    """Stand-in for a ROOT TH1 or TH2 that buffers Fill() calls and flushes them with FillN"""
+
+    def __init__(self, hist, capacity):
+        """Constructor
+
+        Arguments:
+            hist (ROOT.TH1): histogram that receives the buffered entries
+            capacity (int): number of entries buffered before they are flushed
+        """
+        #: underlying ROOT histogram
+        self.hist = hist
+        #: dimension of the histogram (1 for TH1, 2 for TH2)
+        self.dimension = 2 if isinstance(hist, ROOT.TH2) else 1
+        #: number of entries that fit in the buffers
+        self.capacity = capacity
+        #: number of entries currently in the buffers
+        self.n = 0
+        #: buffered x values (allocated on the first Fill)
+        self.x = None
+        #: buffered y values (2D histograms only)
+        self.y = None
+        #: buffered weights
+        self.w = None
+
+    def allocate(self):
+        """Allocate the NumPy buffers"""
+        self.x = numpy.empty(self.capacity, dtype=numpy.float64)
+        self.w = numpy.empty(self.capacity, dtype=numpy.float64)
+        if self.dimension == 2:
+            self.y = numpy.empty(self.capacity, dtype=numpy.float64)
+
+    def Fill(self, *args):
+        """Buffer one entry; same arguments as TH1.Fill(x[, w]) or TH2.Fill(x, y[, w])"""
+        n = self.n
+        if n == 0 and self.x is None:
+            self.allocate()
+        elif n == self.capacity:
+            self.flush()
+            n = 0
+        self.x[n] = args[0]
+        if self.dimension == 1:
+            self.w[n] = args[1] if len(args) > 1 else 1.0
+        else:
+            self.y[n] = args[1]
+            self.w[n] = args[2] if len(args) > 2 else 1.0
+        self.n = n + 1
+
+    def fillArray(self, x, y=None, w=None):
+        """Buffer many entries at once from NumPy arrays (or sequences) of equal length
+
+        Arguments:
+            x: x values
+            y: y values (2D histograms only)
+            w: weights [1]
+        """
+        x = numpy.asarray(x, dtype=numpy.float64).ravel()
+        count = len(x)
+        if count == 0:
+            return
+        w = numpy.ones(count) if w is None else numpy.asarray(w, dtype=numpy.float64).ravel()
+        if self.dimension == 2:
+            y = numpy.asarray(y, dtype=numpy.float64).ravel()
+        if count > self.capacity - self.n:
+            self.flush()
+        if count > self.capacity:  # too large to buffer: hand it over directly
+            if self.dimension == 1:
+                self.hist.FillN(count, x, w)
+            else:
+                self.hist.FillN(count, x, y, w)
+            return
+        if self.x is None:
+            self.allocate()
+        n = self.n
+        self.x[n:n + count] = x
+        self.w[n:n + count] = w
+        if self.dimension == 2:
+            self.y[n:n + count] = y
+        self.n = n + count
+
+    def flush(self):
+        """Hand all buffered entries to the histogram with one FillN call"""
+        n = self.n
+        if n == 0:
+            return
+        if self.dimension == 1:
+            self.hist.FillN(n, self.x, self.w)
+        else:
+            self.hist.FillN(n, self.x, self.y, self.w)
+        self.n = 0
+
+    def __getattr__(self, name):
+        """Flush, then forward any other attribute to the underlying histogram"""
+        if name in ('hist', 'n'):  # not yet set (e.g. during copying): avoid infinite recursion
+            raise AttributeError(name)
+        self.flush()
+        return getattr(self.hist, name)
+
+
+class HistogramFiller:
+    """Owns the BufferedHists of one module and flushes them together"""
+
+    def __init__(self, capacity=1024, flushEvents=1000):
+        """Constructor
+
+        Arguments:
+            capacity (int): number of entries buffered per histogram before it is flushed
+            flushEvents (int): flush all histograms every flushEvents events (0 to flush only when full or at the end)
+        """
+        #: number of entries buffered per histogram
+        self.capacity = capacity
+        #: number of events between flushes of all histograms
+        self.flushEvents = flushEvents
+        #: events seen since the last flush of all histograms
+        self.eventsSinceFlush = 0
+        #: all booked histograms, in booking order
+        self.buffered = []
+
+    def book(self, hist):
+        """Return a BufferedHist for a ROOT histogram (or the same BufferedHist if it is already booked)
+
+        Arguments:
+            hist (ROOT.TH1): histogram to be filled through the buffer
+        """
+        if isinstance(hist, BufferedHist):
+            return hist
+        bufferedHist = BufferedHist(hist, self.capacity)
+        self.buffered.append(bufferedHist)
+        return bufferedHist
+
+    def bookAll(self, item):
+        """Book a histogram, or every histogram in a (nested) list in place; other items are returned unchanged
+
+        Arguments:
+            item: ROOT histogram, list of (lists of) histograms, or anything else
+        """
+        if isinstance(item, list):
+            for i in range(0, len(item)):
+                item[i] = self.bookAll(item[i])
+            return item
+        if isinstance(item, ROOT.TH1):
+            return self.book(item)
+        return item
+
+    def adopt(self, owner, prefix='hist_'):
+        """Book every histogram held in an attribute of owner whose name starts with prefix
+
+        The attributes are replaced by their BufferedHists, so existing Fill() calls are batched unchanged.
+
+        Arguments:
+            owner: object (usually a basf2 module) holding the histograms
+            prefix (str): attribute-name prefix of the histograms
+        """
+        for name, value in list(vars(owner).items()):
+            if name.startswith(prefix):
+                setattr(owner, name, self.bookAll(value))
+
+    def endEvent(self):
+        """Count one processed event and flush all histograms every flushEvents events"""
+        self.eventsSinceFlush += 1
+        if self.flushEvents > 0 and self.eventsSinceFlush >= self.flushEvents:
+            self.flush()
+
+    def flush(self):
+        """Flush the buffers of all booked histograms"""
+        for bufferedHist in self.buffered:
+            bufferedHist.flush()
+        self.eventsSinceFlush = 0
+
+    def histograms(self):
+        """Return the underlying ROOT histograms of all booked BufferedHists, after flushing them"""
+        self.flush()
+        return [bufferedHist.hist for bufferedHist in self.buffered]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Columnar cache of the decoded RawKLM hits of a BKLM job, so that the hit-level histograms can be
+#   rebuilt with other binnings, time-calibration constants or working-sector lists (see rehistogram.py)
+#   without running basf2 over the raw data again.
+#
+#   EventInspector hands the decoded hits of every data concentrator to a HitCacheWriter, which keeps
+#   them in per-column lists and writes them out as one chunk every chunkSize hits. The file is an
+#   ordinary compressed NumPy .npz archive: each chunk is stored as one array per column, named
+#   'c#####_<column>', next to the job's metadata arrays. readChunks() yields the chunks in order.
+#
+# Columns (one entry per decoded hit, in decoding order):
+#   event         event number
+#   dc            data concentrator [0..15] = (finesse << 2) + copper
+#   sectorFB      sector [0..15] of the data concentrator (0-7 = backward, 8-15 = forward)
+#   lane, axis, channel, ctime, tdc, flag, multiplicity   as decoded by rawKLMDecoder.decodeDC()
+#   moduleId      mapped detector moduleId (-1 for unmapped channels)
+#   trigCtime     trigger ctime (ns) of the RawKLM, needed to form the hit times
+#   index         position of the hit in its data concentrator's packet list
+#   tdcExtra, adcExtra   extra TDC/ADC bits of the hit as decoded by rawKLMDecoder.decodeDC()
+#                 (absent from caches written before these were stored; readChunks() then skips them)
+#
+# Metadata: exp, run, chunkSize, nChunks, plus the calibration constants and working-DC list of the job
+# (t0Cal, ct0Cal, t0RPC, ct0Scint, workingdc) that rehistogram.py uses unless told otherwise.
+
+import os
+import zipfile
+import numpy
+
+#: column names and storage types of the cache file, in storage order
+COLUMNS = (('event', numpy.uint32), ('dc', numpy.int8), ('sectorFB', numpy.int8), ('lane', numpy.int8),
+           ('axis', numpy.int8), ('channel', numpy.int8), ('ctime', numpy.int32), ('tdc', numpy.int16),
+           ('flag', numpy.int8), ('moduleId', numpy.int16), ('multiplicity', numpy.int16),
+           ('trigCtime', numpy.int32), ('index', numpy.int32), ('tdcExtra', numpy.int8), ('adcExtra', numpy.int8))
+
+#: default number of hits per chunk
+CHUNK_SIZE = 1 << 20
+
+
+def _writeArray(archive, name, array):
+    """Add one array as name.npy to an open zip archive
+
+    Arguments:
+        archive (zipfile.ZipFile): archive opened for writing
+        name (str): array name (key of numpy.load)
+        array: NumPy array or scalar
+    """
+    with archive.open(name + '.npy', 'w', force_zip64=True) as f:
+        numpy.lib.format.write_array(f, numpy.asanyarray(array), allow_pickle=False)
+
+
+def _isChunkArray(name):
+    """Return True if an archive member name belongs to a hit chunk ('c#####_<column>')"""
+    return len(name) > 7 and name[0] == 'c' and name[1:6].isdigit() and name[6] == '_'
+
+
+class HitCacheWriter:
+    """Collect decoded RawKLM hits column by column and write them in compressed chunks to a .npz file"""
+
+    def __init__(self, fileName, exp, run, chunkSize=CHUNK_SIZE, **constants):
+        """Constructor: open a temporary archive next to fileName (renamed to fileName by close())
+
+        Arguments:
+            fileName (str): path name of the cache file
+            exp (str): formatted experiment number
+            run (str): formatted run number
+            chunkSize (int): number of hits per chunk
+            constants: calibration constants and lists of the job to store with the hits (e.g. t0RPC=[...])
+        """
+        #: path name of the cache file
+        self.fileName = fileName
+        #: path name of the archive while it is being written
+        self.tmpName = fileName + '.tmp.npz'
+        #: number of hits per chunk
+        self.chunkSize = chunkSize
+        #: number of chunks written so far
+        self.nChunks = 0
+        #: number of hits in the pending column pieces
+        self.nPending = 0
+        #: pending column pieces (list of arrays per column)
+        self.pending = [[] for name, dtype in COLUMNS]
+        #: open archive
+        self.archive = zipfile.ZipFile(self.tmpName, 'w', compression=zipfile.ZIP_DEFLATED)
+        _writeArray(self.archive, 'exp', int(exp))
+        _writeArray(self.archive, 'run', int(run))
+        _writeArray(self.archive, 'chunkSize', chunkSize)
+        for name, value in constants.items():
+            _writeArray(self.archive, name, numpy.asarray(value))
+
+    def add(self, event, dc, sectorFB, trigCtime, hits, moduleId):
+        """Append the decoded hits of one data concentrator
+
+        Arguments:
+            event (int): event number
+            dc (int): data concentrator [0..15]
+            sectorFB (int): sector [0..15] of the data concentrator
+            trigCtime (int): trigger ctime (ns) of the RawKLM
+            hits (rawKLMDecoder.DCHits): decoded hits
+            moduleId (numpy.ndarray): mapped moduleId of each hit (-1 for unmapped channels)
+        """
+        count = len(hits.ctime)
+        if count == 0:
+            return
+        pieces = (numpy.full(count, event), numpy.full(count, dc), numpy.full(count, sectorFB), hits.lane,
+                  hits.axis, hits.channel, hits.ctime, hits.tdc, hits.flag, moduleId, hits.multiplicity,
+                  numpy.full(count, trigCtime), numpy.arange(count), hits.tdcExtra, hits.adcExtra)
+        for (name, dtype), column, piece in zip(COLUMNS, self.pending, pieces):
+            column.append(numpy.asarray(piece, dtype=dtype))
+        self.nPending += count
+        if self.nPending >= self.chunkSize:
+            self.writeChunk()
+
+    def writeChunk(self):
+        """Write the pending hits as the next chunk"""
+        if self.nPending == 0:
+            return
+        prefix = 'c{0:05d}_'.format(self.nChunks)
+        for (name, dtype), column in zip(COLUMNS, self.pending):
+            _writeArray(self.archive, prefix + name, numpy.concatenate(column))
+            column.clear()
+        self.nChunks += 1
+        self.nPending = 0
+
+    def close(self):
+        """Write the last chunk and the chunk count, then move the archive to its final name"""
+        self.writeChunk()
+        _writeArray(self.archive, 'nChunks', self.nChunks)
+        self.archive.close()
+        os.replace(self.tmpName, self.fileName)
+
+
+def readMetadata(fileName):
+    """Return the metadata of a cache file as a dict (exp, run, chunkSize, nChunks and the stored constants)
+
+    Arguments:
+        fileName (str): path name of the cache file
+    """
+    with numpy.load(fileName) as data:
+        return {name: data[name] for name in data.files if not _isChunkArray(name)}
+
+
+def readChunks(fileName, columns=None):
+    """Yield the chunks of a cache file in order, each as a dict of column name -> NumPy array
+
+    Arguments:
+        fileName (str): path name of the cache file
+        columns (list): names of the columns to read [all that the file has]
+    """
+    with numpy.load(fileName) as data:
+        if columns is None:
+            columns = [name for name, dtype in COLUMNS if 'c00000_' + name in data.files]
+        for chunk in range(0, int(data['nChunks'])):
+            prefix = 'c{0:05d}_'.format(chunk)
+            yield {name: data[prefix + name] for name in columns}
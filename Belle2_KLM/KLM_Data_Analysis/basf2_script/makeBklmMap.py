@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Convert one or more python electId -> moduleId mapping scripts (like bklmDB.py) into the versioned
+#   binary mapping file that bklmLookup.getLookup() memory-maps at job start-up. Each mapping is stored
+#   with its experiment/run validity range so that different electronics maps can coexist in one file.
+#   Run this once whenever a mapping script changes; the basf2 jobs never have to import bklmDB.py then.
+#
+# Usage:
+#   python3 makeBklmMap.py [-o outfilename] [-p module:expLow:runLow:expHigh:runHigh ...]
+#   Optional arguments:
+#      -o outfilename   to specify the output mapping file (default is bklmDB.map next to bklmLookup.py)
+#      -p payload       to add the fillDB() map of the python module with its validity range; expHigh
+#                       and runHigh may be -1 for an open-ended range. May be given several times; when
+#                       ranges overlap, the payload given last wins. (default is bklmDB:0:0:-1:-1)
+#
+# Output:
+#   binary mapping file (see bklmLookup.py for the layout)
+#
+
+import sys
+import importlib
+import bklmLookup
+from optparse import OptionParser
+
+parser = OptionParser()
+parser.add_option('-o', '--outputfile',
+                  dest='outfilename', default=bklmLookup.MAP_FILE,
+                  help='Output mapping filename [{0}]'.format(bklmLookup.MAP_FILE))
+parser.add_option('-p', '--payload',
+                  dest='payloads', action='append', default=[],
+                  help='module:expLow:runLow:expHigh:runHigh [bklmDB:0:0:-1:-1]')
+(options, args) = parser.parse_args()
+
+specs = options.payloads if len(options.payloads) > 0 else ['bklmDB:0:0:-1:-1']
+payloads = []
+for spec in specs:
+    fields = spec.split(':')
+    if len(fields) != 5:
+        print("Payload ({0}) is not of the form module:expLow:runLow:expHigh:runHigh".format(spec))
+        sys.exit()
+    try:
+        expLow, runLow, expHigh, runHigh = [int(field) for field in fields[1:]]
+    except ValueError:
+        print("Payload ({0}) has an invalid validity range".format(spec))
+        sys.exit()
+    electIdToModuleId = importlib.import_module(fields[0]).fillDB()
+    print('makeBklmMap: {0} channels from {1} valid for e{2}r{3} .. e{4}r{5}'.format(
+        len(electIdToModuleId), fields[0], expLow, runLow, expHigh, runHigh))
+    payloads.append((expLow, runLow, expHigh, runHigh, bklmLookup.ElectIdLookup.fromDict(electIdToModuleId)))
+
+bklmLookup.writeMapFile(options.outfilename, payloads)
+print('makeBklmMap: wrote', options.outfilename)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Booking of the RawKLM hit-level histograms, shared by EventInspector.py (which fills them from the decoded
+#   RawKLMs) and rehistogram.py (which fills them from a hit-cache file), so that both write the same names,
+#   titles and binnings.
+#
+
+import ROOT
+
+#: map for sectorFB -> data concentrator
+SECTORFB_TO_DC = [11, 15, 2, 6, 10, 14, 3, 7, 9, 13, 0, 4, 8, 12, 1, 5]
+#: names of the (sector occupancy, lane/axis occupancy) histograms whose lane/axis occupancy is shown in percent
+OCCUPANCY_PAIRS = (('mappedScintSectorOccupancy', 'mappedScintLaneAxisOccupancy'),
+                   ('mappedRPCSectorOccupancy', 'mappedRPCLaneAxisOccupancy'),
+                   ('unmappedScintSectorOccupancy', 'unmappedScintLaneAxisOccupancy'),
+                   ('unmappedRPCSectorOccupancy', 'unmappedRPCLaneAxisOccupancy'))
+
+
+def normalizeLaneAxisOccupancy(sectorOccupancy, laneAxisOccupancy):
+    """Convert the lane/axis occupancy of every sector to percent of that sector's occupancy
+
+    Arguments:
+        sectorOccupancy (ROOT.TH1): occupancy by sector
+        laneAxisOccupancy (ROOT.TH2): occupancy by sector and lane/axis
+    """
+    for sectorFB in range(0, 16):
+        denominator = sectorOccupancy.GetBinContent(sectorFB + 1)
+        if denominator > 0:
+            for laneAxis in range(0, 42):
+                numerator = laneAxisOccupancy.GetBinContent(sectorFB + 1, laneAxis + 1)
+                laneAxisOccupancy.SetBinContent(sectorFB + 1, laneAxis + 1, 100.0 * numerator / denominator)
+
+
+def bookHitHistograms(owner, expRun, sectorFBToDC=SECTORFB_TO_DC):
+    """Create the RawKLM hit-level histograms as hist_* attributes of owner
+
+    Arguments:
+        owner: object (EventInspector or rehistogram.HitHistograms) that receives the histograms
+        expRun (str): title prefix 'e##r#####: '
+        sectorFBToDC (list): map for sectorFB -> data concentrator
+    """
+    #: scatterplot of the RawKLM hit's lane vs flag (1=RPC, 2=Scint)
+    owner.hist_rawKLMlaneFlag = ROOT.TH2F('rawKLMlaneFlag',
+                                          expRun + 'RawKLM lane vs flag;' +
+                                          'Flag (1=RPC, 2=Scint);' +
+                                          'Lane (scint: 1..7, RPC: 8..20)',
+                                          4, -0.5, 3.5, 21, -0.5, 20.5)
+    #: scatterplot of the RawKLM RPC hit's extra bits vs sector in the third (time) word
+    owner.hist_rawKLMtdcExtraRPC = ROOT.TH2F('rawKLMtdcExtraRPC',
+                                             expRun + 'RawKLM RPC tdcExtra bits;' +
+                                             'Sector # (0-7 = backward, 8-15 = forward);' +
+                                             'tdcExtra [should be 0]',
+                                             16, -0.5, 15.5, 32, -0.5, 31.5)
+    #: scatterplot of the RawKLM RPC hit's extra bits vs sector in the fourth (adc) word
+    owner.hist_rawKLMadcExtraRPC = ROOT.TH2F('rawKLMadcExtraRPC',
+                                             expRun + 'RawKLM RPC adcExtra bits;' +
+                                             'Sector # (0-7 = backward, 8-15 = forward);' +
+                                             'adcExtra [should be 0]',
+                                             16, -0.5, 15.5, 16, -0.5, 15.5)
+    #: scatterplot of the RawKLM scint hit's extra bits vs sector in the third (time) word
+    owner.hist_rawKLMtdcExtraScint = ROOT.TH2F('rawKLMtdcExtraScint',
+                                               expRun + 'RawKLM Scint tdcExtra bits;' +
+                                               'Sector # (0-7 = backward, 8-15 = forward);' +
+                                               'tdcExtra',
+                                               16, -0.5, 15.5, 32, -0.5, 31.5)
+    #: scatterplot of the RawKLM scint hit's extra bits vs sector in the fourth (adc) word
+    owner.hist_rawKLMadcExtraScint = ROOT.TH2F('rawKLMadcExtraScint',
+                                               expRun + 'RawKLM Scint adcExtra bits;' +
+                                               'Sector # (0-7 = backward, 8-15 = forward);' +
+                                               'adcExtra',
+                                               16, -0.5, 15.5, 16, -0.5, 15.5)
+    #: scatterplots of multiplicity of entries in one readout channel vs lane/axis, indexed by sector#
+    owner.hist_rawKLMchannelMultiplicity = []
+    #: scatterplots of multiplicity of entries in one readout channel vs lane/axis/channel, indexed by sector#
+    owner.hist_rawKLMchannelMultiplicityFine = []
+    for sectorFB in range(0, 16):
+        dc = sectorFBToDC[sectorFB]
+        copper = dc & 0x03
+        finesse = dc >> 2
+        label = 'rawKLM_S{0:02d}_channelMultiplicity'.format(sectorFB)
+        title = '{0}sector {1} [COPPER {2} finesse {3}] per-channel multiplicity (N/channel > 1);'.format(
+            expRun, sectorFB, copper, finesse) + 'Per-channel multiplicity;(Lane #) * 2 + (Axis #)'
+        owner.hist_rawKLMchannelMultiplicity.append(ROOT.TH2F(label, title, 30, -0.5, 29.5, 42, -0.5, 41.5))
+        label = 'rawKLM_S{0:02d}_channelMultiplicityFine'.format(sectorFB)
+        title = '{0}sector {1} [COPPER {2} finesse {3}] per-channel multiplicity (N/channel > 1);'.format(
+            expRun, sectorFB, copper, finesse) + 'Per-channel multiplicity;(Lane #) * 256 + (Axis #) * 128 + (Channel #)'
+        owner.hist_rawKLMchannelMultiplicityFine.append(ROOT.TH2F(label, title, 30, -0.5, 29.5, 8192, -0.5, 8191.5))
+    #: histogram of number of mapped hits by sector, including multiple entries on one readout channel
+    owner.hist_mappedSectorOccupancyMultihit = ROOT.TH1F(
+         'mappedSectorOccupancyMultihit',
+         expRun + 'Sector occupancy of mapped channels (N/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: histogram of number of unmapped hits by sector, including multiple entries on one readout channel
+    owner.hist_unmappedSectorOccupancyMultihit = ROOT.TH1F(
+         'unmappedSectorOccupancyMultihit',
+         expRun + 'Sector occupancy of unmapped channels (N/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: histogram of number of mapped hits by sector, at most one entry per readout channel
+    owner.hist_mappedSectorOccupancy = ROOT.TH1F(
+         'mappedSectorOccupancy',
+         expRun + 'Sector occupancy of mapped channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: histogram of number of unmapped hits by sector, at most one entry per readout channel
+    owner.hist_unmappedSectorOccupancy = ROOT.TH1F(
+         'unmappedSectorOccupancy',
+         expRun + 'Sector occupancy of unmapped channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: histogram of number of mapped RPC hits by sector, at most one entry per readout channel
+    owner.hist_mappedRPCSectorOccupancy = ROOT.TH1F(
+         'mappedRPCSectorOccupancy',
+         expRun + 'Sector occupancy of mapped RPC channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: scatterplot of number of mapped RPC hits by lane/axis vs sector, at most one entry per readout channel
+    owner.hist_mappedRPCLaneAxisOccupancy = ROOT.TH2F(
+         'mappedRPCLaneAxisOccupancy',
+         expRun + 'Lane/axis occupancy of mapped RPC channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward);' +
+         '(Lane #) * 2 + (Axis #)',
+         16, -0.5, 15.5, 42, -0.5, 41.5)
+    #: histogram of number of unmapped RPC hits by sector, at most one entry per readout channel
+    owner.hist_unmappedRPCSectorOccupancy = ROOT.TH1F(
+         'unmappedRPCSectorOccupancy',
+         expRun + 'Sector occupancy of unmapped RPC channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: scatterplot of number of unmapped RPC hits by lane/axis vs sector, at most one entry per readout channel
+    owner.hist_unmappedRPCLaneAxisOccupancy = ROOT.TH2F(
+         'unmappedRPCLaneAxisOccupancy',
+         expRun + 'Lane/axis occupancy of unmapped RPC channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward);' +
+         '(Lane #) * 2 + (Axis #)',
+         16, -0.5, 15.5, 42, -0.5, 41.5)
+    #: scatterplot of number of mapped scint hits by lane/axis vs sector, at most one entry per readout channel
+    owner.hist_mappedScintSectorOccupancy = ROOT.TH1F(
+         'mappedScintSectorOccupancy',
+         expRun + 'Sector occupancy of mapped scint channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: scatterplot of number of mapped scint hits by lane/axis vs sector, at most one entry per readout channel
+    owner.hist_mappedScintLaneAxisOccupancy = ROOT.TH2F(
+         'mappedScintLaneAxisOccupancy',
+         expRun + 'Lane/axis occupancy of mapped scint channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward);' +
+         '(Lane #) * 2 + (Axis #)',
+         16, -0.5, 15.5, 42, -0.5, 41.5)
+    #: histogram of number of unmapped scint hits by sector, at most one entry per readout channel
+    owner.hist_unmappedScintSectorOccupancy = ROOT.TH1F(
+         'unmappedScintSectorOccupancy',
+         expRun + 'Sector occupancy of unmapped scint channels (1/channel);' +
+         'Sector # (0-7 = backward, 8-15 = forward)',
+         16, -0.5, 15.5)
+    #: scatterplot of number of unmapped scint hits by lane/axis vs sector, at most one entry per readout channel
+    owner.hist_unmappedScintLaneAxisOccupancy = ROOT.TH2F(
+         'unmappedScintLaneAxisOccupancy',
+         expRun + 'Lane/axis occupancy of unmapped scint channels (1/channel);' +
+                  'Sector # (0-7 = backward, 8-15 = forward);' +
+                  '(Lane #) * 2 + (Axis #)',
+         16, -0.5, 15.5, 42, -0.5, 41.5)
+    #: scatterplots of in-time mapped channel occupancy (1 hit per readout channel), indexed by sector#
+    owner.hist_mappedChannelOccupancyPrompt = [
+         [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0],
+         [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0]]
+    #: scatterplots of out-of-time mapped channel occupancy (1 hit per readout channel), indexed by sector#
+    owner.hist_mappedChannelOccupancyBkgd = [
+         [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0],
+         [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0]]
+    #: scatterplots of unmapped channel occupancy (1 hit per readout channel), indexed by sector#
+    owner.hist_unmappedChannelOccupancy = [
+         [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0],
+         [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0], [0, 0]]
+    for sectorFB in range(0, 16):
+        label = 'mappedChannelOccupancy_S{0:02d}ZPrompt'.format(sectorFB)
+        title = '{0}In-time mapped channel occupancy for sector {1} z hits;lane;channel'.format(expRun, sectorFB)
+        owner.hist_mappedChannelOccupancyPrompt[sectorFB][0] = ROOT.TH2F(label, title, 42, -0.25, 20.75, 128, -0.25, 63.75)
+        label = 'mappedChannelOccupancy_S{0:02d}ZBkgd'.format(sectorFB)
+        title = '{0}Out-of-time mapped channel occupancy for sector {1} z hits;lane;channel'.format(expRun, sectorFB)
+        owner.hist_mappedChannelOccupancyBkgd[sectorFB][0] = ROOT.TH2F(label, title, 42, -0.25, 20.75, 128, -0.25, 63.75)
+        label = 'unmappedChannelOccupancy_S{0:02d}Z'.format(sectorFB)
+        title = '{0}Unmapped channel occupancy for sector {1} z hits;lane;channel'.format(expRun, sectorFB)
+        owner.hist_unmappedChannelOccupancy[sectorFB][0] = ROOT.TH2F(label, title, 42, -0.25, 20.75, 128, -0.25, 63.75)
+        label = 'mappedChannelOccupancy_S{0:02d}PhiPrompt'.format(sectorFB)
+        title = '{0}In-time mapped occupancy for sector {1} phi hits;lane;channel'.format(expRun, sectorFB)
+        owner.hist_mappedChannelOccupancyPrompt[sectorFB][1] = ROOT.TH2F(label, title, 42, -0.25, 20.75, 128, -0.25, 63.75)
+        label = 'mappedChannelOccupancy_S{0:02d}PhiBkgd'.format(sectorFB)
+        title = '{0}Out-of-time mapped occupancy for sector {1} phi hits;lane;channel'.format(expRun, sectorFB)
+        owner.hist_mappedChannelOccupancyBkgd[sectorFB][1] = ROOT.TH2F(label, title, 42, -0.25, 20.75, 128, -0.25, 63.75)
+        label = 'unmappedChannelOccupancy_S{0:02d}Phi'.format(sectorFB)
+        title = '{0}Unmapped channel occupancy for sector {1} phi hits;lane;channel'.format(expRun, sectorFB)
+        owner.hist_unmappedChannelOccupancy[sectorFB][1] = ROOT.TH2F(label, title, 42, -0.25, 20.75, 128, -0.25, 63.75)
+    #: scatterplot of RPC TDC low-order bits vs sector (should be 0 since granularity is 4 ns)
+    owner.hist_RPCTimeLowBitsBySector = ROOT.TH2F('RPCTimeLowBitsBySector',
+                                                  expRun + 'RPC TDC lowest-order bits;' +
+                                                  'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                  'TDC % 4 (ns) [should be 0]',
+                                                  16, -0.5, 15.5, 4, -0.5, 3.5)
+    #: histogram of RPC mapped-channel TDC value relative to event's trigger time
+    owner.hist_mappedRPCTime = ROOT.TH1F(
+         'mappedRPCTime', expRun + 'RPC mapped-strip time distribution;t - t(trigger) (ns)', 256, -0.5, 1023.5)
+    #: histogram of RPC mapped-channel TDC value relative to event's trigger time, corrected for inter-sector variation
+    owner.hist_mappedRPCTimeCal = ROOT.TH1F(
+         'mappedRPCTimeCal', expRun + 'RPC mapped-strip time distribution;t - t(trigger) - dt(sector) (ns)', 256, -0.5, 1023.5)
+    #: histogram of RPC mapped-channel TDC relative to trigger time, corrected for inter-sector var'n and DC-processing delay
+    owner.hist_mappedRPCTimeCal2 = ROOT.TH1F('mappedRPCTimeCal2',
+                                             expRun + 'RPC mapped-strip time distribution;' +
+                                             't - t(trigger) - dt(sector) - t(index) (ns)',
+                                             256, -0.5, 1023.5)
+    #: histograms of RPC mapped-channel TDC value relative to event's trigger time, indexed by sector
+    owner.hist_mappedRPCTimePerSector = []
+    #: histograms of RPC mapped-channel TDC value relative to event's trigger time, indexed by sector/layer
+    owner.hist_mappedRPCTimePerLayer = []
+    for sectorFB in range(0, 16):
+        label = 'mappedRPCTime_S{0:02d}'.format(sectorFB)
+        title = '{0}RPC sector {1} time distribution;t - t(trigger) (ns)'.format(expRun, sectorFB)
+        owner.hist_mappedRPCTimePerSector.append(ROOT.TH1F(label, title, 256, -0.5, 1023.5))
+        owner.hist_mappedRPCTimePerLayer.append([0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        for layer in range(0, 15):
+            label = 'mappedRPCTime_S{0:02d}L{1:02d}'.format(sectorFB, layer)
+            title = '{0}RPC sector {1} layer {2} time distribution;t - t(trigger) (ns)'.format(expRun, sectorFB, layer)
+            owner.hist_mappedRPCTimePerLayer[sectorFB][layer] = ROOT.TH1F(label, title, 256, -0.5, 1023.5)
+    #: scatterplot of RPC mapped-channel TDC value relative to event's trigger time vs sector
+    owner.hist_mappedRPCTimeBySector = ROOT.TH2F('mappedRPCTimeBySector',
+                                                 expRun + 'RPC mapped-strip time;' +
+                                                 'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                 't - t(trigger) (ns)',
+                                                 16, -0.5, 15.5, 128, -0.5, 1023.5)
+    #: scatterplot of RPC mapped-channel TDC relative to trigger time, corrected for inter-sector variation, by sector
+    owner.hist_mappedRPCTimeCalBySector = ROOT.TH2F('mappedRPCTimeCalBySector',
+                                                    expRun + 'RPC mapped-strip time;' +
+                                                    'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                    't - t(trigger) - dt(sector) (ns)',
+                                                    16, -0.5, 15.5, 128, -0.5, 1023.5)
+    #: histogram of RPC mapped-channel REVO9 range in event
+    owner.hist_mappedRPCCtimeRange = ROOT.TH1F('mappedRPCCtimeRange',
+                                               expRun + 'RPC Ctime-range in event;' +
+                                               'CtimeMax - CtimeMin (ns)',
+                                               128, -0.5, 8191.5)
+    #: scatterplot of RPC mapped-channel REVO9 range in event vs sector
+    owner.hist_mappedRPCCtimeRangeBySector = ROOT.TH2F('mappedRPCCtimeRangeBySector',
+                                                       expRun + 'RPC Ctime-range in event;' +
+                                                       'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                       'CtimeMax - CtimeMin (ns)',
+                                                       16, -0.5, 15.5, 128, -0.5, 8191.5)
+    #: histogram of RPC unmapped-channel TDC value relative to event's trigger time
+    owner.hist_unmappedRPCTime = ROOT.TH1F('unmappedRPCTime',
+                                           expRun + 'RPC unmapped-strip time distribution;' +
+                                           't - t(trigger) (ns)',
+                                           256, -0.5, 1023.5)
+    #: scatterplot of RPC unmapped-channel TDC value relative to event's trigger time, by sector
+    owner.hist_unmappedRPCTimeBySector = ROOT.TH2F('unmappedRPCTimeBySector',
+                                                   expRun + 'RPC unmapped-strip time;' +
+                                                   'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                   't - t(trigger) (ns)',
+                                                   16, -0.5, 15.5, 128, -0.5, 1023.5)
+    #: scatterplot of scint TDC low-order bits vs sector
+    owner.hist_ScintTimeLowBitsBySector = ROOT.TH2F('ScintTimeLowBitsBySector',
+                                                    expRun + 'Scint TDC lowest-order bits;' +
+                                                    'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                    'TDC % 4 (ns)',
+                                                    16, -0.5, 15.5, 4, -0.5, 3.5)
+    #: histogram of scint mapped-channel CTIME value (NOT relative to event's trigger Ctime)
+    owner.hist_mappedScintCtime0 = ROOT.TH1F('mappedScintCtime0',
+                                             expRun + 'Scint mapped-strip ctime distribution;' +
+                                             'ctime (ns)',
+                                             32, -0.5, 1023.5)
+    #: scatterplot of scint mapped-channel CTIME value (NOT relative to event's trigger Ctime)
+    owner.hist_mappedScintCtime1 = ROOT.TH2F('mappedScintCtime1',
+                                             expRun + 'Scint mapped-strip ctime distribution;' +
+                                             'Sector # (0-7 = backward, 8-15 = forward);' +
+                                             'ctime (ns)',
+                                             16, -0.5, 15.5, 32, -0.5, 1023.5)
+    #: histogram of scint mapped-channel CTIME value relative to event's trigger Ctime
+    owner.hist_mappedScintCtime = ROOT.TH1F('mappedScintCtime',
+                                            expRun + 'Scint mapped-strip ctime distribution;' +
+                                            'ctime - ct(trigger) (ns)',
+                                            32, -0.5, 1023.5)
+    #: scatterplot of scint mapped-channel CTIME value relative to event's trigger Ctime vs sector
+    owner.hist_mappedScintCtimeBySector = ROOT.TH2F('mappedScintCtimeBySector',
+                                                    expRun + 'Scint mapped-strip ctime;' +
+                                                    'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                    'ctime - ct(trigger) (ns)',
+                                                    16, -0.5, 15.5, 32, -0.5, 1023.5)
+    #: histogram of scint mapped-channel CTIME value relative to event's trigger Ctime, corrected for inter-sector variation
+    owner.hist_mappedScintCtimeCal = ROOT.TH1F('mappedScintCtimeCal',
+                                               expRun + 'Scint mapped-strip ctime distribution;' +
+                                               'ctime - ct(trigger) - dt(sector) (ns)',
+                                               32, -0.5, 1023.5)
+    #: scatterplot of scint mapped-channel CTIME relative to trigger Ctime, corrected for inter-sector variation, by sector
+    owner.hist_mappedScintCtimeCalBySector = ROOT.TH2F('mappedScintCtimeCalBySector',
+                                                       expRun + 'Scint mapped-strip ctime;' +
+                                                       'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                       'ctime - ct(trigger) - dt(sector) (ns)',
+                                                       16, -0.5, 15.5, 32, -0.5, 1023.5)
+    #: histograms of scint mapped-channel CTIME value relative to event's trigger Ctime, indexed by sector
+    owner.hist_mappedScintCtimePerSector = []
+    #: histograms of scint mapped-channel CTIME value relative to event's trigger Ctime, indexed by sector/layer
+    owner.hist_mappedScintCtimePerLayer = []
+    for sectorFB in range(0, 16):
+        label = 'mappedScintCtime_S{0:02d}'.format(sectorFB)
+        title = '{0}Scint sector {1} ctime distribution;ctime - ct(trigger) (ns)'.format(expRun, sectorFB)
+        owner.hist_mappedScintCtimePerSector.append(ROOT.TH1F(label, title, 32, -0.5, 1023.5))
+        owner.hist_mappedScintCtimePerLayer.append([0, 0])
+        for layer in range(0, 2):
+            label = 'mappedScintCtime_S{0:02d}L{1:02d}'.format(sectorFB, layer)
+            title = '{0}Scint sector {1} layer {2} ctime distribution;ctime - ct(trigger) (ns)'.format(expRun, sectorFB, layer)
+            owner.hist_mappedScintCtimePerLayer[sectorFB][layer] = ROOT.TH1F(label, title, 32, -0.5, 1023.5)
+    #: histogram of scint mapped-channel CTIME range in event
+    owner.hist_mappedScintCtimeRange = ROOT.TH1F('mappedScintCtimeRange',
+                                                 expRun + 'Scint ctime-range in event;' +
+                                                 'ctimeMax - ctimeMin (ns)',
+                                                 128, -0.5, 1023.5)
+    #: scatterplot of scint mapped-channel CTIME range in event vs sector
+    owner.hist_mappedScintCtimeRangeBySector = ROOT.TH2F('mappedScintCtimeRangeBySector',
+                                                         expRun + 'Scint ctime-range in event;' +
+                                                         'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                         'ctimeMax - ctimeMin (ns)',
+                                                         16, -0.5, 15.5, 128, -0.5, 1023.5)
+    #: histogram of scint unmapped-channel CTIME value relative to event's trigger Ctime
+    owner.hist_unmappedScintCtime = ROOT.TH1F('unmappedScintCtime',
+                                              expRun + 'Scint unmapped-strip ctime distribution;' +
+                                              'ctime - ct(trigger) (ns)',
+                                              32, -0.5, 1023.5)
+    #: scatterplot of scint unmapped-channel CTIME value relative to event's trigger Ctime, by sector
+    owner.hist_unmappedScintCtimeBySector = ROOT.TH2F('unmappedScintCtimeBySector',
+                                                      expRun + 'Scint unmapped-strip ctime;' +
+                                                      'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                      'ctime - ct(trigger) (ns)',
+                                                      16, -0.5, 15.5, 32, -0.5, 1023.5)
+    #: histogram of scint mapped-channel TDC value (NOT relative to event's trigger Ctime)
+    owner.hist_mappedScintTDC = ROOT.TH1F('mappedScintTDC',
+                                          expRun + 'Scint mapped-strip TDC distribution;' +
+                                          't (ns)',
+                                          32, -0.5, 31.5)
+    #: histogram of scint mapped-channel TDC value relative to event's trigger Ctime
+    owner.hist_mappedScintTime = ROOT.TH1F('mappedScintTime',
+                                           expRun + 'Scint mapped-strip time distribution;' +
+                                           't - t(trigger) (ns)', 32, -0.5, 31.5)
+    #: scatterplot of scint mapped-channel TDC value (NOT relative to event's trigger Ctime) vs sector
+    owner.hist_mappedScintTDCBySector = ROOT.TH2F('mappedScintTDCBySector',
+                                                  expRun + 'Scint mapped-strip TDC;' +
+                                                  'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                  't (ns)',
+                                                  16, -0.5, 15.5, 32, -0.5, 31.5)
+    #: scatterplot of scint mapped-channel TDC value relative to event's trigger Ctime vs sector
+    owner.hist_mappedScintTimeBySector = ROOT.TH2F('mappedScintTimeBySector',
+                                                   expRun + 'Scint mapped-strip time;' +
+                                                   'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                   't - t(trigger) (ns)',
+                                                   16, -0.5, 15.5, 32, -0.5, 31.5)
+    #: histogram of scint unmapped-channel TDC value relative to event's trigger Ctime
+    owner.hist_unmappedScintTime = ROOT.TH1F('unmappedScintTime',
+                                             expRun + 'Scint unmapped-strip time distribution;' +
+                                             't - t(trigger) (ns)',
+                                             32, -0.5, 31.5)
+    #: scatterplot of scint unmapped-channel TDC value relative to event's trigger Ctime vs sector
+    owner.hist_unmappedScintTimeBySector = ROOT.TH2F('unmappedScintTimeBySector',
+                                                     expRun + 'Scint unmapped-strip time;' +
+                                                     'Sector # (0-7 = backward, 8-15 = forward);' +
+                                                     't - t(trigger) (ns)',
+                                                     16, -0.5, 15.5, 32, -0.5, 31.5)
+    # the RPC time-calibration/diagnostic histograms
+    #: scatterplot of RPC calibrated time vs hit's Ctime relative to earliest-Ctime
+    owner.hist_ctimeRPCtCal = ROOT.TH2F('CtimeRPCtCal',
+                                        expRun + 'RPC tCal vs relative Ctime;' +
+                                        't - t(trigger) - dt(sector) (ns);' +
+                                        'Ctime - minCtime',
+                                        16, 281.5, 345.5, 16, -0.5, 255.5)
+    #: scatterplot of RPC calibrated time vs hit's Ctime relative to earliest-Ctime, corrected for DC-processing delay
+    owner.hist_ctimeRPCtCalCorr = ROOT.TH2F('ctimeRPCtCalCorr',
+                                            expRun + 'RPC tCal vs relative Ctime;' +
+                                            't - t(trigger) - dt(sector) - dt(index) (ns);' +
+                                            'Ctime - minCtime',
+                                            16, 281.5, 345.5, 16, -0.5, 255.5)
+    #: scatterplot of RPC calibrated time vs hit's index
+    owner.hist_jRPCtCal = ROOT.TH2F('jRPCtCal',
+                                    expRun + 'RPC tCal vs hit index;' +
+                                    't - t(trigger) - dt(sector) (ns);' +
+                                    'Hit index',
+                                    16, 281.5, 345.5, 50, -0.5, 49.5)
+    #: scatterplot of RPC calibrated time vs hit's index, corrected for DC-processing delay
+    owner.hist_jRPCtCalCorr = ROOT.TH2F('jRPCtCalCorr',
+                                        expRun + 'RPC tCal vs hit index;' +
+                                        't - t(trigger) - dt(sector) - dt(index) (ns);' +
+                                        'Hit index',
+                                        16, 281.5, 345.5, 50, -0.5, 49.5)
+    #: histogram of RPC TDC range
+    owner.hist_tdcRangeRPC = ROOT.TH1F('tdcRangeRPC',
+                                       expRun + 'RPC TDC range;' +
+                                       'maxTDC - minTDC (ns)',
+                                       128, -0.5, 1023.5)
+    #: histogram of RPC Ctime range
+    owner.hist_ctimeRangeRPC = ROOT.TH1F('ctimeRangeRPC',
+                                         expRun + 'RPC Ctime range;' +
+                                         'maxCtime - minCtime (ns)',
+                                         128, -0.5, 1023.5)
+    #: scatterplot of RPC TDC range vs Ctime range
+    owner.hist_tdcRangeVsCtimeRangeRPC = ROOT.TH2F('tdcRangeVsCtimeRangeRPC',
+                                                   expRun + 'RPC Ctime range vs TDC range;' +
+                                                   'maxTDC - minTDC (ns);' +
+                                                   'maxCtime - minCtime (ns)',
+                                                   128, -0.5, 1023.5, 128, -0.5, 1023.5)
+    #: scatterplot of RPC TDC range vs time
+    owner.hist_tdcRangeVsTimeRPC = ROOT.TH2F('tdcRangeVsTimeRPC',
+                                             expRun + 'RPC TDC range vs time;' +
+                                             't - t(trigger) (ns);' +
+                                             'maxTDC - minTDC (ns)',
+                                             128, -0.5, 1023.5, 128, -0.5, 1023.5)
+    #: scatterplot of RPC Ctime range vs time
+    owner.hist_ctimeRangeVsTimeRPC = ROOT.TH2F('ctimeRangeVsTimeRPC',
+                                               expRun + 'RPC Ctime range vs time;' +
+                                               't - t(trigger) (ns);' +
+                                               'maxCtime - minCtime (ns)',
+                                               128, -0.5, 1023.5, 128, -0.5, 1023.5)
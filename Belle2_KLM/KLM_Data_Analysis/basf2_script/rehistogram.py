@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Rebuild the RawKLM hit-level histograms of EventInspector from a hit-cache file (see hitCache.py)
+#   without basf2 and without re-decoding the raw data. The time-calibration constants, the working
+#   data-concentrator list and the entries/channel selection default to those of the job that wrote
+#   the cache and can be overridden on the command line; binnings can be changed in HitHistograms.
+#   Each cache chunk is histogrammed with NumPy array operations and handed to ROOT with FillN.
+#
+# Usage:
+#   python3 rehistogram.py -i cachefile [-o outname] [options]
+#   Required argument:
+#      -i cachefile  hit-cache file written by bklm-dst.py -c 1 (bklmHits-e#r#.npz)
+#   Optional arguments:
+#      -o outname    output ROOT histogram file (default is the cache-file name with .root instead of .npz)
+#      -s #          select any (0) or exactly one (1) or more than one (2) entries/channel (default from the cache)
+#      --t0Cal #     RPC-time calibration adjustment (ns) (default from the cache)
+#      --ct0Cal #    scint-ctime calibration adjustment (ns) (default from the cache)
+#      --t0RPC list  comma-separated per-sector RPC-time adjustments (ns) (default from the cache)
+#      --ct0Scint list  comma-separated per-sector scint-ctime adjustments (ns) (default from the cache)
+#      --workingdc list comma-separated working data concentrators (default from the cache)
+#
+# Output:
+#   ROOT histogram file with the RawKLM hit-level histograms of EventInspector, booked by the same function
+#   (rawKLMHists.bookHitHistograms): sector, lane/axis and channel occupancies, channel multiplicities,
+#   extra TDC/ADC bits, RPC times and time ranges, scint ctimes/TDCs and ctime ranges.
+#   The per-RawKLM histograms of EventInspector (packet sizes, trigger ctime vs revo9 time) are not rebuilt.
+
+import sys
+from optparse import OptionParser
+import numpy
+import ROOT
+import histFiller
+import hitCache
+import rawKLMHists
+
+class HitHistograms:
+    """The RawKLM hit-level histograms of EventInspector, filled from hit-cache chunks"""
+
+    def __init__(self, expRun):
+        """Constructor: book the histograms with rawKLMHists.bookHitHistograms(), as EventInspector does
+
+        Arguments:
+            expRun (str): title prefix 'e##r#####: '
+        """
+        rawKLMHists.bookHitHistograms(self, expRun)
+        #: batched filling of all hist_* histograms
+        self.histFiller = histFiller.HistogramFiller(capacity=1 << 16, flushEvents=0)
+        self.histFiller.adopt(self)
+        #: histograms of sector occupancy, keyed by (mapped, multihit)
+        self.sectorOccupancy = {(True, True): self.hist_mappedSectorOccupancyMultihit,
+                                (True, False): self.hist_mappedSectorOccupancy,
+                                (False, True): self.hist_unmappedSectorOccupancyMultihit,
+                                (False, False): self.hist_unmappedSectorOccupancy}
+        #: histograms of RPC/scint sector occupancy, keyed by (mapped, flag)
+        self.flagSectorOccupancy = {(True, 1): self.hist_mappedRPCSectorOccupancy,
+                                    (True, 2): self.hist_mappedScintSectorOccupancy,
+                                    (False, 1): self.hist_unmappedRPCSectorOccupancy,
+                                    (False, 2): self.hist_unmappedScintSectorOccupancy}
+        #: scatterplots of RPC/scint lane/axis occupancy vs sector, keyed by (mapped, flag)
+        self.laneAxisOccupancy = {(True, 1): self.hist_mappedRPCLaneAxisOccupancy,
+                                  (True, 2): self.hist_mappedScintLaneAxisOccupancy,
+                                  (False, 1): self.hist_unmappedRPCLaneAxisOccupancy,
+                                  (False, 2): self.hist_unmappedScintLaneAxisOccupancy}
+
+    def fill(self, chunk, t0Cal, ct0Cal, t0RPC, ct0Scint, workingdc, singleEntry):
+        """Histogram one hit-cache chunk, as EventInspector.event() histograms the decoded RawKLM hits
+
+        Arguments:
+            chunk (dict): column name -> NumPy array (see hitCache.readChunks)
+            t0Cal (int): RPC-time calibration adjustment (ns)
+            ct0Cal (int): scint-ctime calibration adjustment (ns)
+            t0RPC (numpy.ndarray): per-sector RPC-time calibration adjustments (ns)
+            ct0Scint (numpy.ndarray): per-sector scint-ctime calibration adjustments (ns)
+            workingdc (list): data concentrators whose hits are histogrammed
+            singleEntry (int): select any (0) or exactly one (1) or more than one (2) entries/channel
+        """
+        working = numpy.isin(chunk['dc'], workingdc)
+        c = {name: column[working].astype(numpy.int64) for name, column in chunk.items()}
+        dc = c['dc']
+        if len(dc) == 0:
+            return
+        sectorFB = c['sectorFB']
+        lane = c['lane']
+        axis = c['axis']
+        channel = c['channel']
+        multiplicity = c['multiplicity']
+        laneAxis = numpy.where((lane < 1) | (lane > 20), axis, (lane << 1) + axis)
+        multi = (multiplicity > 1)
+        for i in numpy.unique(dc[multi]).tolist():
+            select = multi & (dc == i)
+            self.hist_rawKLMchannelMultiplicity[i].fillArray(multiplicity[select], laneAxis[select])
+            self.hist_rawKLMchannelMultiplicityFine[i].fillArray(
+                multiplicity[select], (lane[select] << 8) | (axis[select] << 7) | channel[select])
+        if singleEntry == 1:
+            keep = (multiplicity == 1)
+        elif singleEntry == 2:
+            keep = multi
+        else:
+            keep = numpy.ones(len(dc), dtype=bool)
+
+        # time ranges of each data concentrator's hits in one event, as rawKLMDecoder.timeRanges() finds them
+        # (over all of the hits, before the entries/channel selection); the cache starts every group at index 0
+        isFirst = (c['index'] == 0)
+        starts = numpy.flatnonzero(isFirst)
+        group = numpy.cumsum(isFirst) - 1
+        isRPC = (c['flag'] == 1)
+        isScint = (c['flag'] == 2)
+        minRPCCtime = numpy.minimum.reduceat(numpy.where(isRPC, c['ctime'], 99999), starts)
+        maxRPCCtime = numpy.maximum.reduceat(numpy.where(isRPC, c['ctime'], 0), starts)
+        minRPCtdc = numpy.minimum.reduceat(numpy.where(isRPC, c['tdc'], 99999), starts)
+        maxRPCtdc = numpy.maximum.reduceat(numpy.where(isRPC, c['tdc'], 0), starts)
+        minScintCtime = numpy.minimum.reduceat(numpy.where(isScint, c['ctime'], 99999), starts)
+        maxScintCtime = numpy.maximum.reduceat(numpy.where(isScint, c['ctime'], 0), starts)
+        nHits = numpy.diff(numpy.append(starts, len(dc)))
+        ctimeRangeRPC = (maxRPCCtime - minRPCCtime) << 3  # (ns)
+        ctimeRangeScint = (maxScintCtime - minScintCtime) << 3  # (ns)
+        select = (nHits > 1) & (maxRPCCtime > 0)
+        self.hist_mappedRPCCtimeRangeBySector.fillArray(sectorFB[starts][select], ctimeRangeRPC[select])
+        select = (nHits > 1) & (maxScintCtime > 0)
+        self.hist_mappedScintCtimeRange.fillArray(ctimeRangeScint[select])
+        self.hist_mappedScintCtimeRangeBySector.fillArray(sectorFB[starts][select], ctimeRangeScint[select])
+        c['nHits'] = nHits[group]
+        c['minRPCCtime'] = minRPCCtime[group]
+        c['tdcRangeRPC'] = (maxRPCtdc - minRPCtdc)[group]  # (ns)
+        c['ctimeRangeRPC'] = ctimeRangeRPC[group]
+
+        c = {name: column[keep] for name, column in c.items()}
+        sectorFB = c['sectorFB']
+        lane = c['lane']
+        axis = c['axis']
+        channel = c['channel']
+        flag = c['flag']
+        tdc = c['tdc']
+        ctimeRaw = c['ctime']
+        trigCtime = c['trigCtime']
+        laneAxis = laneAxis[keep]
+        single = (c['multiplicity'] == 1)
+        isMapped = (c['moduleId'] >= 0)
+        self.hist_rawKLMlaneFlag.fillArray(flag, lane)
+        if 'tdcExtra' in c:  # caches written before the extra bits were stored have no such columns
+            for isFlag, tdcExtraHist, adcExtraHist in ((1, self.hist_rawKLMtdcExtraRPC, self.hist_rawKLMadcExtraRPC),
+                                                       (2, self.hist_rawKLMtdcExtraScint, self.hist_rawKLMadcExtraScint)):
+                select = (flag == isFlag)
+                tdcExtraHist.fillArray(sectorFB[select], c['tdcExtra'][select])
+                adcExtraHist.fillArray(sectorFB[select], c['adcExtra'][select])
+        t = (tdc - trigCtime) & 0x03ff  # in ns, range is 0..1023
+        ct = ((ctimeRaw << 3) - (trigCtime & 0x7fff8)) & 0x3ff
+        dtIndex = 0.75 * c['index']
+        for mapped in (True, False):
+            inMap = (isMapped == mapped)
+            self.sectorOccupancy[(mapped, True)].fillArray(sectorFB[inMap])
+            self.sectorOccupancy[(mapped, False)].fillArray(sectorFB[inMap & single])
+            for isFlag in (1, 2):
+                select = inMap & (flag == isFlag)
+                self.flagSectorOccupancy[(mapped, isFlag)].fillArray(sectorFB[select])
+                self.laneAxisOccupancy[(mapped, isFlag)].fillArray(sectorFB[select], laneAxis[select])
+        isRPC = (flag == 1)
+        isScint = (flag == 2)
+        self.hist_RPCTimeLowBitsBySector.fillArray(sectorFB[isRPC], tdc[isRPC] & 3)
+        self.hist_ScintTimeLowBitsBySector.fillArray(sectorFB[isScint], tdc[isScint] & 3)
+
+        # mapped RPC hits
+        select = isMapped & isRPC
+        s = sectorFB[select]
+        tRPC = t[select]
+        tCal = tRPC - t0RPC[s]
+        prompt = (numpy.abs(tCal - t0Cal) < 50)
+        self.hist_mappedRPCTime.fillArray(tRPC)
+        self.hist_mappedRPCTimeCal.fillArray(tCal)
+        self.hist_mappedRPCTimeCal2.fillArray(tCal - dtIndex[select])
+        self.hist_mappedRPCTimeBySector.fillArray(s, tRPC)
+        self.hist_mappedRPCTimeCalBySector.fillArray(s, tCal - dtIndex[select])
+        index = c['index'][select]
+        tdcRange = c['tdcRangeRPC'][select]
+        ctimeRange = c['ctimeRangeRPC'][select]
+        first = (index == 0)
+        self.hist_tdcRangeRPC.fillArray(tdcRange[first])
+        self.hist_ctimeRangeRPC.fillArray(ctimeRange[first])
+        self.hist_tdcRangeVsCtimeRangeRPC.fillArray(tdcRange[first], ctimeRange[first])
+        self.hist_tdcRangeVsTimeRPC.fillArray(tCal, tdcRange)
+        self.hist_ctimeRangeVsTimeRPC.fillArray(tCal, ctimeRange)
+        busy = prompt & (c['nHits'][select] > 20)
+        dCtime = ctimeRaw[select][busy] - c['minRPCCtime'][select][busy]
+        tCalCorr = tCal[busy] - dtIndex[select][busy]
+        self.hist_ctimeRPCtCal.fillArray(tCal[busy], dCtime)
+        self.hist_ctimeRPCtCalCorr.fillArray(tCalCorr, dCtime)
+        self.hist_jRPCtCal.fillArray(tCal[busy], index[busy])
+        self.hist_jRPCtCalCorr.fillArray(tCalCorr, index[busy])
+        layer = lane[select] - 6
+        inLayers = (layer < 15)
+        layer = layer % 15  # negative layers wrap around as the list index of EventInspector does
+        for sector in numpy.unique(s).tolist():
+            inSector = (s == sector)
+            self.hist_mappedRPCTimePerSector[sector].fillArray(tRPC[inSector])
+            for ax in (0, 1):
+                both = inSector & (axis[select] == ax)
+                self.hist_mappedChannelOccupancyPrompt[sector][ax].fillArray(lane[select][both & prompt],
+                                                                             channel[select][both & prompt])
+                self.hist_mappedChannelOccupancyBkgd[sector][ax].fillArray(lane[select][both & ~prompt],
+                                                                           channel[select][both & ~prompt])
+            for l in numpy.unique(layer[inSector & inLayers]).tolist():
+                self.hist_mappedRPCTimePerLayer[sector][l].fillArray(tRPC[inSector & inLayers & (layer == l)])
+
+        # mapped scint hits
+        select = isMapped & isScint
+        s = sectorFB[select]
+        tScint = t[select] & 0x1f
+        ctScint = ct[select]
+        ctCal = ctScint - ct0Scint[s]
+        prompt = (numpy.abs(ctCal - ct0Cal) < 50)
+        self.hist_mappedScintTime.fillArray(tScint)
+        self.hist_mappedScintTimeBySector.fillArray(s, tScint)
+        self.hist_mappedScintTDC.fillArray(tdc[select])
+        self.hist_mappedScintTDCBySector.fillArray(s, tdc[select])
+        self.hist_mappedScintCtime0.fillArray((ctimeRaw[select] << 3) & 0x3ff)
+        self.hist_mappedScintCtime1.fillArray(s, (ctimeRaw[select] << 3) & 0x3ff)
+        self.hist_mappedScintCtime.fillArray(ctScint)
+        self.hist_mappedScintCtimeBySector.fillArray(s, ctScint)
+        self.hist_mappedScintCtimeCal.fillArray(ctCal)
+        self.hist_mappedScintCtimeCalBySector.fillArray(s, ctCal)
+        layer = lane[select] - 1
+        inLayers = (layer < 2)
+        layer = layer % 2
+        for sector in numpy.unique(s).tolist():
+            inSector = (s == sector)
+            self.hist_mappedScintCtimePerSector[sector].fillArray(ctScint[inSector])
+            for ax in (0, 1):
+                both = inSector & (axis[select] == ax)
+                # scint z and phi axes are swapped with respect to the RPCs
+                self.hist_mappedChannelOccupancyPrompt[sector][1 - ax].fillArray(lane[select][both & prompt],
+                                                                                 channel[select][both & prompt])
+                self.hist_mappedChannelOccupancyBkgd[sector][1 - ax].fillArray(lane[select][both & ~prompt],
+                                                                               channel[select][both & ~prompt])
+            for l in numpy.unique(layer[inSector & inLayers]).tolist():
+                self.hist_mappedScintCtimePerLayer[sector][l].fillArray(ctScint[inSector & inLayers & (layer == l)])
+
+        # unmapped RPC and scint hits
+        select = ~isMapped & (isRPC | isScint)
+        s = sectorFB[select]
+        zAxis = numpy.where(flag[select] == 1, axis[select], 1 - axis[select])
+        for sector in numpy.unique(s).tolist():
+            for ax in (0, 1):
+                both = (s == sector) & (zAxis == ax)
+                self.hist_unmappedChannelOccupancy[sector][ax].fillArray(lane[select][both], channel[select][both])
+        select = ~isMapped & isRPC
+        self.hist_unmappedRPCTime.fillArray(t[select])
+        self.hist_unmappedRPCTimeBySector.fillArray(sectorFB[select], t[select])
+        select = ~isMapped & isScint
+        self.hist_unmappedScintTime.fillArray(t[select] & 0x1f)
+        self.hist_unmappedScintTimeBySector.fillArray(sectorFB[select], t[select] & 0x1f)
+        self.hist_unmappedScintCtime.fillArray(ct[select])
+        self.hist_unmappedScintCtimeBySector.fillArray(sectorFB[select], ct[select])
+
+    def normalize(self):
+        """Convert the lane/axis occupancies to percentages of the sector occupancy, as EventInspector.terminate() does"""
+        self.histFiller.flush()
+        for sectorName, laneAxisName in rawKLMHists.OCCUPANCY_PAIRS:
+            rawKLMHists.normalizeLaneAxisOccupancy(getattr(self, 'hist_' + sectorName),
+                                                   getattr(self, 'hist_' + laneAxisName))
+
+
+def parseList(text, default):
+    """Return a comma-separated list of ints as a NumPy array, or default if text is empty
+
+    Arguments:
+        text (str): comma-separated integers
+        default: value returned for an empty text
+    """
+    if text == '':
+        return numpy.asarray(default, dtype=numpy.int64)
+    return numpy.array([int(item) for item in text.split(',')], dtype=numpy.int64)
+
+
+parser = OptionParser()
+parser.add_option('-i', '--inputfile', dest='infilename', default='',
+                  help='Hit-cache file [no default]')
+parser.add_option('-o', '--outputfile', dest='outname', default='',
+                  help='Output ROOT histogram file [cache-file name with .root]')
+parser.add_option('-s', '--singleEntry', dest='singleEntry', default='',
+                  help='Select any (0) or exactly one (1) or more than one (2) entries/channel [from the cache]')
+parser.add_option('--t0Cal', dest='t0Cal', default='',
+                  help='RPC-time calibration adjustment (ns) [from the cache]')
+parser.add_option('--ct0Cal', dest='ct0Cal', default='',
+                  help='Scint-ctime calibration adjustment (ns) [from the cache]')
+parser.add_option('--t0RPC', dest='t0RPC', default='',
+                  help='Comma-separated per-sector RPC-time adjustments (ns) [from the cache]')
+parser.add_option('--ct0Scint', dest='ct0Scint', default='',
+                  help='Comma-separated per-sector scint-ctime adjustments (ns) [from the cache]')
+parser.add_option('--workingdc', dest='workingdc', default='',
+                  help='Comma-separated working data concentrators [from the cache]')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    if options.infilename == '':
+        print("Missing input hit-cache file (required parameter)")
+        sys.exit()
+    metadata = hitCache.readMetadata(options.infilename)
+    t0Cal = int(options.t0Cal) if options.t0Cal != '' else int(metadata['t0Cal'])
+    ct0Cal = int(options.ct0Cal) if options.ct0Cal != '' else int(metadata['ct0Cal'])
+    t0RPC = parseList(options.t0RPC, metadata['t0RPC'])
+    ct0Scint = parseList(options.ct0Scint, metadata['ct0Scint'])
+    workingdc = parseList(options.workingdc, metadata['workingdc'])
+    singleEntry = int(options.singleEntry) if options.singleEntry != '' else int(metadata['singleEntry'])
+    if (len(t0RPC) != 16) or (len(ct0Scint) != 16):
+        print("The per-sector adjustments need 16 values each")
+        sys.exit()
+    outname = options.outname
+    if outname == '':
+        outname = (options.infilename[:-4] if options.infilename.endswith('.npz') else options.infilename) + '.root'
+
+    ROOT.gROOT.SetBatch(True)
+    ROOT.gStyle.SetOptStat(10)
+    expRun = 'e{0:02d}r{1}: '.format(int(metadata['exp']), int(metadata['run']))
+    histogramFile = ROOT.TFile.Open(outname, 'RECREATE')
+    hists = HitHistograms(expRun)
+    for chunk in hitCache.readChunks(options.infilename):
+        hists.fill(chunk, t0Cal, ct0Cal, t0RPC, ct0Scint, workingdc, singleEntry)
+    hists.normalize()
+    histogramFile.Write()
+    histogramFile.Close()
+    print('rehistogram: wrote', outname)
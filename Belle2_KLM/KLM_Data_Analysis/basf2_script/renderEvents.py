@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Draw the BKLM event displays that EventInspector saved in an event-display side file
+#   (see eventDisplay.py). The hits of each sector and colour are drawn as one TGraph of square markers.
+#   One-dimensional-hit displays (view 1) show the side view of every sector with enough z-readout hits
+#   and the end view of all phi-readout hits; two-dimensional-hit displays (view 2) show the end and
+#   side views of all hits. Each page holds two views.
+#
+# Usage:
+#   python3 renderEvents.py -i sidefile [-o outname] [-f pdf|png] [-j #]
+#   Required argument:
+#      -i sidefile   event-display side file written by bklm-dst.py (bklmEvents#D-e#r#.npz)
+#   Optional arguments:
+#      -o outname    output PDF file or PNG directory (default is the side-file name without .npz)
+#      -f format     pdf to write one multi-page PDF file (default), png to write one PNG file per page
+#      -j #          number of parallel processes for PNG output (default is 1)
+#
+# Output:
+#   PDF file outname.pdf whose table of contents lists the events, or
+#   PNG files outname/e#r#-event#-page#.png
+
+import os
+import sys
+import multiprocessing
+from optparse import OptionParser
+import eventDisplay
+
+#: ROOT marker style of the hits (open square)
+MARKER_STYLE = 25
+#: marker size of the hits (close to the 2-cm squares of the original displays)
+MARKER_SIZE = 0.5
+
+
+def makeHitGraphs(ROOT, display, panel, sectors=None):
+    """Return one TGraph of markers per (sector, colour) for the hits of one panel
+
+    Arguments:
+        ROOT: the ROOT module
+        display (dict): one display from eventDisplay.readDisplays()
+        panel (int): eventDisplay.END_VIEW or eventDisplay.SIDE_VIEW
+        sectors (list): sectors to draw [all]
+    """
+    graphs = []
+    select = (display['panel'] == panel)
+    keys = sorted(set(zip(display['sector'][select].tolist(), display['color'][select].tolist())))
+    for sector, color in keys:
+        if (sectors is not None) and (sector not in sectors):
+            continue
+        inGraph = select & (display['sector'] == sector) & (display['color'] == color)
+        u = display['u'][inGraph].astype('float64')
+        v = display['v'][inGraph].astype('float64')
+        graph = ROOT.TGraph(len(u), u, v)
+        graph.SetMarkerStyle(MARKER_STYLE)
+        graph.SetMarkerSize(MARKER_SIZE)
+        graph.SetMarkerColor(color)
+        graphs.append(graph)
+    return graphs
+
+
+def makePages(exp, run, display):
+    """Return the list of pages of one display; each page is a list of up to two (frameName, title, panel, sectors)
+
+    Arguments:
+        exp (int): experiment number
+        run (int): run number
+        display (dict): one display from eventDisplay.readDisplays()
+    """
+    prefix = 'e{0:02d}r{1}: event {2}'.format(exp, run, display['event'])
+    views = []
+    if display['view'] == 1:
+        zSectors = sorted(set(display['sector'][display['panel'] == eventDisplay.SIDE_VIEW].tolist()))
+        for sector in zSectors:
+            views.append(('ZY1D', '{0} z-readout hits in S{1}'.format(prefix, sector), eventDisplay.SIDE_VIEW, [sector]))
+        if (display['panel'] == eventDisplay.END_VIEW).any():
+            views.append(('XY', '{0} phi-readout hits'.format(prefix), eventDisplay.END_VIEW, None))
+    else:
+        views.append(('XY', '{0} hits'.format(prefix), eventDisplay.END_VIEW, None))
+        views.append(('ZY', '{0} hits'.format(prefix), eventDisplay.SIDE_VIEW, None))
+    return [views[i:i + 2] for i in range(0, len(views), 2)]
+
+
+class Renderer:
+    """Draws event-display pages on a two-pad canvas"""
+
+    def __init__(self):
+        """Constructor: set up ROOT in batch mode, the canvas, the frames and the detector outline"""
+        import ROOT
+        import bklmGeometry
+        ROOT.gROOT.SetBatch(True)
+        #: the ROOT module
+        self.ROOT = ROOT
+        #: two-pad canvas for the end and side views
+        self.canvas = ROOT.TCanvas('eventCanvas', 'BKLM event display', 3200, 1600)
+        self.canvas.Divide(2, 1)
+        #: blank scatterplots that define the bounds of the views
+        self.frames = {'XY': ROOT.TH2F('XY', ' ;x;y', 10, -345.0, 345.0, 10, -345.0, 345.0),
+                       'ZY': ROOT.TH2F('ZY', ' ;z;y', 10, -345.0, 345.0, 10, -345.0, 345.0),
+                       'ZY1D': ROOT.TH2F('ZY1D', ' ;z;y', 10, -200.0, 300.0, 10, -150.0, 350.0)}
+        for frame in self.frames.values():
+            frame.SetStats(False)
+        #: detector outline of the end and side views
+        self.outline = dict(zip((eventDisplay.END_VIEW, eventDisplay.SIDE_VIEW), bklmGeometry.outlineGraphs()))
+
+    def drawPage(self, display, page):
+        """Draw one page (up to two views) of a display on the canvas and return the graphs that were drawn
+
+        Arguments:
+            display (dict): one display from eventDisplay.readDisplays()
+            page (list): (frameName, title, panel, sectors) of each view on the page
+        """
+        drawn = []
+        for pad in range(1, 3):
+            self.canvas.cd(pad)
+            self.ROOT.gPad.Clear()
+            if pad > len(page):
+                continue
+            frameName, title, panel, sectors = page[pad - 1]
+            frame = self.frames[frameName]
+            frame.SetTitle(title)
+            frame.DrawCopy()
+            for g in self.outline[panel]:
+                g.Draw("L")
+            graphs = makeHitGraphs(self.ROOT, display, panel, sectors)
+            for g in graphs:
+                g.Draw("P")
+            drawn.extend(graphs)
+        return drawn
+
+
+def renderPDF(exp, run, displays, pdfName):
+    """Draw all displays into one multi-page PDF file with one table-of-contents entry per page
+
+    Arguments:
+        exp (int): experiment number
+        run (int): run number
+        displays (list): displays from eventDisplay.readDisplays()
+        pdfName (str): path name of the output PDF file
+    """
+    renderer = Renderer()
+    renderer.canvas.Print('{0}['.format(pdfName))
+    for display in displays:
+        for page in makePages(exp, run, display):
+            renderer.drawPage(display, page)
+            renderer.canvas.Print(pdfName, 'Title:E{0} (#{1})'.format(display['event'], display['ordinal']))
+    renderer.canvas.Print('{0}]'.format(pdfName))
+
+
+#: renderer of the current PNG worker process (one canvas per process)
+_renderer = None
+
+
+def renderPNG(task):
+    """Draw the pages of one display into PNG files; runs in a worker process
+
+    Arguments:
+        task (tuple): (exp, run, display, directory)
+    """
+    global _renderer
+    exp, run, display, directory = task
+    if _renderer is None:
+        _renderer = Renderer()
+    names = []
+    for i, page in enumerate(makePages(exp, run, display)):
+        _renderer.drawPage(display, page)
+        name = os.path.join(directory, 'e{0:02d}r{1}-event{2}-page{3}.png'.format(exp, run, display['event'], i))
+        _renderer.canvas.SaveAs(name)
+        names.append(name)
+    return names
+
+
+parser = OptionParser()
+parser.add_option('-i', '--inputfile', dest='infilename', default='',
+                  help='Event-display side file [no default]')
+parser.add_option('-o', '--outputname', dest='outname', default='',
+                  help='Output PDF file or PNG directory [side-file name without .npz]')
+parser.add_option('-f', '--format', dest='format', default='pdf',
+                  help='Output format: pdf or png [pdf]')
+parser.add_option('-j', '--jobs', dest='jobs', default='1',
+                  help='Number of parallel processes for PNG output [1]')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    if options.infilename == '':
+        print("Missing input side file (required parameter)")
+        sys.exit()
+    if options.format not in ('pdf', 'png'):
+        print("Output format ({0}) must be pdf or png".format(options.format))
+        sys.exit()
+    exp, run, displays = eventDisplay.readDisplays(options.infilename)
+    outname = options.outname
+    if outname == '':
+        outname = options.infilename[:-4] if options.infilename.endswith('.npz') else options.infilename
+    print('renderEvents: {0} event displays from {1}'.format(len(displays), options.infilename))
+    if options.format == 'pdf':
+        if not outname.endswith('.pdf'):
+            outname = outname + '.pdf'
+        renderPDF(exp, run, displays, outname)
+    else:
+        os.makedirs(outname, exist_ok=True)
+        tasks = [(exp, run, display, outname) for display in displays]
+        jobs = max(1, int(options.jobs))
+        if jobs == 1:
+            for task in tasks:
+                renderPNG(task)
+        else:
+            with multiprocessing.Pool(jobs) as pool:
+                pool.map(renderPNG, tasks)
+    print('renderEvents: wrote', outname)
@@ -4,12 +4,14 @@
 # Prerequisite (on kekcc): type
 # source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
 #
+# Run the hitmap reconstruction of every HLT stream (HITMAP_EVENTS events each), its merge, the hitmap
+# category pages and the PNGs of the RUNAGAIN runs
+# on the local machine with klmPipeline.py.
 #
 
 import sys
-import os
 import subprocess
-import datetime
+import klmPipeline
 from ROOT import Belle2, TH1F, TH2F, TCanvas, THistPainter, TPad
 from optparse import Option, OptionValueError, OptionParser
 
@@ -24,32 +26,6 @@ from optparse import Option, OptionValueError, OptionParser
 RUNAGAIN = ['r01055', 'r01058', 'r01059', 'r01060', 'r01061', 'r01064', 'r01065', 'r01068', 'r01163', 'r01175', 'r01190', 'r01213', 'r01217', 'r01238', 'r01240', 'r01288', 'r01289', 'r01291', 'r01293', 'r01295', 'r01296', 'r01307', 'r01309', 'r01315']
 HLT = ["HLT1","HLT2","HLT3","HLT4","HLT5"]
 
-def submitjobs(Location):
-    RunNameList = os.listdir(Location)
-    infile=open('needtorun.sh','w')
-
-    today = str(datetime.datetime.now())[:10].replace('-','')
-
-    for i in RUNAGAIN:
-        for j in HLT:
-            infile.write("bsub -q lx basf2 -n 200000 scripts/recoGlobalRun_onlyBKLM.py "+Location+i+"/sub00/ /ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/ "+today+" 0 " +j+ "\n")
-
-def makepng(rootLocation):
-    Rundir = os.listdir(rootLocation)
-    infile1 = open("hitmaproot.sh","w")
-    #run = [i[2:] for i in Rundir ]
-    run = [i[2:] for i in RUNAGAIN ]
-    for i in run:
-        infile1.write("python3 recurROOTplot.py -e 8 -r "+i+" \n")
-
-def Hitpngcategory(Location):
-    #Rundir = os.listdir(rootLocation)
-    infile2 = open("Hitpngcategory.sh","w")
-    #run = [i[2:] for i in Rundir ]
-    run = [i[2:] for i in RUNAGAIN ]
-    for i in run:
-        infile2.write("python3 Hitpngcategory.py -e 8 -r "+i+" \n")
-
 #=========================================================================
 #
 #   Main routine
@@ -63,12 +39,16 @@ parser.add_option('-e', '--experiment', dest='eNumber',
 parser.add_option('-r', '--run', dest='rNumber',
                   default='0220',
                   help='Run number [default=0604]')
+parser.add_option('-j', '--jobs', dest='jobs',
+                  default='0',
+                  help='Number of worker processes [default=number of CPUs]')
+parser.add_option('-n', '--dry-run', dest='dryRun', action='store_true',
+                  default=False,
+                  help='Print the pipeline commands without running them')
 (options, args) = parser.parse_args()
 exp = '{0:04d}'.format(int(options.eNumber))
 run = '{0:05d}'.format(int(options.rNumber))
 
-RunLocation = "/ghi/fs01/belle2/bdata/Data/Raw/e{0}/".format(exp)
-hitroots = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/".format(exp)
-submitjobs(RunLocation)
-makepng(hitroots)
-Hitpngcategory(".")
+jobs = int(options.jobs)
+klmPipeline.runAll(int(options.eNumber), [int(i[1:]) for i in RUNAGAIN], kinds=['hitmap', 'mergeHitmap', 'hitmapCategory', 'png'],
+                   workers=(jobs if jobs > 0 else None), dryRun=options.dryRun)
@@ -1,242 +1,9 @@
-import ROOT
-from ROOT import Belle2, TH1, TH2, TCanvas, THistPainter, TPad, gROOT, gStyle, TFile  
-import os
 import sys
-import subprocess
 from optparse import Option, OptionValueError, OptionParser
+import pngCategories
 
-#HitCategory = ["Hitmap", "Planez", "PlanePhi", "LayerRPCTDC", "LayerSciCtime"]
-
-HitCategory = ["Planez", "PlanePhi" ]
-
-#HitSectLay = ["SectLayBB", "SectLayPlaneZBB", "SectLayPlanePhiBB", "SectLayBF", "SectLayPlaneZBF", "SectLayPlanePhiBF"]
-
-Hitz = ['PlaneZStripBB0', 'PlaneZStripBB1', 'PlaneZStripBB2', 'PlaneZStripBB3', 'PlaneZStripBB4', 'PlaneZStripBB5', 'PlaneZStripBB6', 'PlaneZStripBB7', 'PlaneZStripBF0', 'PlaneZStripBF1', 'PlaneZStripBF2', 'PlaneZStripBF3', 'PlaneZStripBF4', 'PlaneZStripBF5', 'PlaneZStripBF6', 'PlaneZStripBF7']
-
-HitPhi = ['PlanePhiStripBB0', 'PlanePhiStripBB1', 'PlanePhiStripBB2', 'PlanePhiStripBB3', 'PlanePhiStripBB4', 'PlanePhiStripBB5', 'PlanePhiStripBB6', 'PlanePhiStripBB7', 'PlanePhiStripBF0', 'PlanePhiStripBF1', 'PlanePhiStripBF2', 'PlanePhiStripBF3', 'PlanePhiStripBF4', 'PlanePhiStripBF5', 'PlanePhiStripBF6', 'PlanePhiStripBF7']
-
-#SciCTimeDiff = ['SciCTimeDiffBB0', 'SciCTimeDiffBB1', 'SciCTimeDiffBB2', 'SciCTimeDiffBB3', 'SciCTimeDiffBB4', 'SciCTimeDiffBB5', 'SciCTimeDiffBB6', 'SciCTimeDiffBB7', 'SciCTimeDiffBF0', 'SciCTimeDiffBF1', 'SciCTimeDiffBF2', 'SciCTimeDiffBF3', 'SciCTimeDiffBF4', 'SciCTimeDiffBF5', 'SciCTimeDiffBF6', 'SciCTimeDiffBF7']
-
-#RPCTdc = ['RPCTdcBB0', 'RPCTdcBB1', 'RPCTdcBB2', 'RPCTdcBB3', 'RPCTdcBB4', 'RPCTdcBB5', 'RPCTdcBB6', 'RPCTdcBB7', 'RPCTdcBF0', 'RPCTdcBF1', 'RPCTdcBF2', 'RPCTdcBF3', 'RPCTdcBF4', 'RPCTdcBF5', 'RPCTdcBF6', 'RPCTdcBF7']
-
-
-def makecategory(RunLocation):
-    os.chdir(RunLocation)
-
-    for i in HitCategory:
-        if not os.path.exists(i):
-            os.mkdir(i)
-
-    #for i in HitSectLay:
-     #   if os.path.exists(i+".png"):
-      #      os.system("mv "+i+".png Hitmap/")
-
-    for i in Hitz:
-        if os.path.exists(i+".png"):
-            os.system("mv "+i+".png Planez/")
-
-    for i in HitPhi:
-        if os.path.exists(i+".png"):
-            os.system("mv "+i+".png PlanePhi/")
-
-    #for i in SciCTimeDiff:
-     #   if os.path.exists(i+".png"):
-      #      os.system("mv "+i+".png LayerSciCtime/")
-
-    #for i in RPCTdc:
-     #   if os.path.exists(i+".png"):
-      #      os.system("mv "+i+".png LayerRPCTDC/")
-
-def writehtml(RunLocation):
-    header = r'''<!DOCTYPE html>
-    <html>
-    <head>
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <style>
-    body {font-family: Arial, Helvetica, sans-serif;}
-
-    #myImg {
-    border-radius: 5px;
-    cursor: pointer;
-    transition: 0.3s;
-    }
-
-    #myImg:hover {opacity: 0.7;}
-
-    /* The Modal (background) */
-    .modal {
-    display: none; /* Hidden by default */
-    position: fixed; /* Stay in place */
-    z-index: 1; /* Sit on top */
-    padding-top: 100px; /* Location of the box */
-    left: 0;
-    top: 0;
-    width: 100%; /* Full width */
-    height: 100%; /* Full height */
-    overflow: auto; /* Enable scroll if needed */
-    background-color: rgb(0,0,0); /* Fallback color */
-    background-color: rgba(0,0,0,0.9); /* Black w/ opacity */
-    }
-
-    /* Modal Content (image) */
-    .modal-content {
-    margin: auto;
-    display: block;
-    width: 80%;
-    max-width: 700px;
-    }
-
-    /* Caption of Modal Image */
-    #caption {
-    margin: auto;
-    display: block;
-    width: 80%;
-    max-width: 700px;
-    text-align: center;
-    color: #ccc;
-    padding: 10px 0;
-    height: 150px;
-    }
-
-    /* Add Animation */
-    .modal-content, #caption {
-    -webkit-animation-name: zoom;
-    -webkit-animation-duration: 0.6s;
-    animation-name: zoom;
-    animation-duration: 0.6s;
-    }
-
-    @-webkit-keyframes zoom {
-    from {-webkit-transform:scale(0)}
-    to {-webkit-transform:scale(1)}
-    }
-
-    @keyframes zoom {
-    from {transform:scale(0)}
-    to {transform:scale(1)}
-    }
-
-    /* The Close Button */
-    .close {
-    position: absolute;
-    top: 15px;
-    right: 35px;
-    color: #f1f1f1;
-    font-size: 40px;
-    font-weight: bold;
-    transition: 0.3s;
-    }
-
-    .close:hover,
-    .close:focus {
-    color: #bbb;
-    text-decoration: none;
-    cursor: pointer;
-    }
-
-    /* 100% Image Width on Smaller Screens */
-    @media only screen and (max-width: 700px){
-    .modal-content {
-    width: 100%;
-    }
-}
-    </style>
-    </head>
-    <body>
-'''
-    footer = r'''<!-- The Modal -->
-    <div id="myModal" class="modal">
-    <span class="close">&times;</span>
-    <img class="modal-content" id="img01">
-    <div id="caption"></div>
-    </div>
-
-    <script>
-    // Get the modal
-    var modal = document.getElementById("myModal");
-
-    // Get the image and insert it inside the modal - use its "alt" text as a caption
-    var img = document.getElementById("myImg");
-    var modalImg = document.getElementById("img01");
-    var captionText = document.getElementById("caption");
-
-    // Get the <span> element that closes the modal
-    var span = document.getElementsByClassName("close")[0];
-
-    // When the user clicks on <span> (x), close the modal
-    span.onclick = function() {
-    modal.style.display = "none";
-    }
-    // add the class 'imageToPopup' to all img elements you want to trigger the popup modal
-    var imgArray = document.getElementsByClassName('imageToPopup');
-
-    // Here we loop through ther array of img elements selected by class name and add an onclick event listener to each.
-    for(var i = 0; i<imgArray.length; i++){
-        imgArray[i].onclick = function(){
-             modal.style.display = "block";
-             modalImg.src = this.src;
-             captionText.innerHTML = this.alt;
-    }
-}
-    </script>
-
-    </body>
-    </html>
-'''
-    return header, footer
-    
-
-def makehtml(RunLocation):
-
-    os.chdir(RunLocation)
-
-    header, footer = writehtml(RunLocation)
-
-    for i in HitCategory:
-        
-        os.chdir(RunLocation+"/"+i)
-        filehtml = open("index.html",'w')
-
-        #if i is 'Hitmap':
-         #   Namehtml = ''
-          #  for j in HitSectLay:
-           #     Namehtml += "<img class='imageToPopup' src='"+j+".png' width='33%'></img>"
-
-            #content = header + Namehtml + footer
-            #filehtml.write(content)
-        
-
-        if i is 'Planez':
-            Namehtml = ''
-            for j in Hitz:
-                Namehtml += "<img class='imageToPopup' src='"+j+".png' width='25%'></img>"
-
-            content = header + Namehtml + footer
-            filehtml.write(content)
-
-        if i is 'PlanePhi':
-            Namehtml = ''
-            for j in HitPhi:
-                Namehtml += "<img class='imageToPopup' src='"+j+".png' width='25%'></img>"
-
-            content = header + Namehtml + footer
-            filehtml.write(content)
-
-        #if i is 'LayerSciCtime':
-         #   Namehtml = ''
-          #  for j in SciCTimeDiff:
-           #     Namehtml += "<img class='imageToPopup' src='"+j+".png' width='25%'></img>"
-
-            #content = header + Namehtml + footer
-            #filehtml.write(content)
-
-        #if i is 'LayerRPCTDC':
-         #   Namehtml = ''
-          #  for j in RPCTdc:
-           #     Namehtml += "<img class='imageToPopup' src='"+j+".png' width='25%'></img>"
-
-            #content = header + Namehtml + footer
-            #filehtml.write(content)
+# The categories (Planez, PlanePhi) and their histograms are in pngCategories.py. This script sorts the
+# hitmap PNGs into their category directories and writes the index pages.
 
 #=========================================================================
 #
@@ -258,5 +25,5 @@ runhit = '{0:04d}'.format(int(options.rNumber))
 
 pngdir = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/hitmap-e{0}r{1}/'.format(exp, run)
 #pngdir = '/home/belle2/atpathak/ppcc2018/work/KLM_24Apr2019/hitmap-e0008r01772/'
-makecategory(pngdir)
-makehtml(pngdir)
+pngCategories.arrange(pngdir, 'hitmap')
+pngCategories.writeIndex(pngdir, 'hitmap')
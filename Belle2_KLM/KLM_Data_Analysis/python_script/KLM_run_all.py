@@ -4,90 +4,26 @@
 # Prerequisite (on kekcc): type
 # source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
 #
+# Find the runs of an experiment taken between the -f and -t dates in the run catalog (runCatalog.py) and run
+# the whole per-run chain (basf2 jobs, merging, combining, PNGs, categories and slides) for them on the local
+# machine with klmPipeline.py, which records the state of every stage in the catalog.
 #
 
 import sys
-import os
-import subprocess
+import klmPipeline
+import runCatalog
 from ROOT import Belle2, TH1F, TH2F, TCanvas, THistPainter, TPad
 from optparse import Option, OptionValueError, OptionParser
 
-def rundirectory(Location):
+def rundirectory(exp, fromDate, toDate, minEvents, catalog):
+    """Return the runs whose first HLT file was written between two dates, from the incrementally updated run catalog"""
+    catalog.update(exp)
+    catalog.updateOutputs(exp)
+    Run = catalog.selectRuns(exp, runCatalog.parseDate(fromDate), runCatalog.parseDate(toDate),
+                             minEvents if minEvents > 0 else None)
+    print(['r{0:05d}'.format(i) for i in Run])
+    return Run
 
-    os.chdir(Location)
-    #NewRunList = subprocess.Popen(['find', '.', '-type', 'd', '-newerct', '5 Jun 2019', '!', '-newerct', '12 Jun 2019'], stdout=subprocess.PIPE)
-    NewRunList = subprocess.Popen(['find', '.', '-type', 'd', '-newermt', ' 21 Jun 2019', '!', '-newermt', ' 28 Jun 2019'], stdout=subprocess.PIPE)
-   # NewRunList = subprocess.Popen(['find', '.', '-type', 'd', '-newerct', {0}, '!', '-newerct', {1}], stdout=subprocess.PIPE).format(fromdate, todate)
-    ls_lines = NewRunList.stdout.readlines()
-    NewRun = [i[2:].decode('ascii') for i in ls_lines]
-    NRun = [i[:6] for i in NewRun]
-    Newlist = list(dict.fromkeys(NRun))
-    #Newlist.remove("e0008\n")
-    Newlist.remove("")
-    Newlist.remove("Regist")
-    #Newlist.remove("b2ccte")
-    Newlist.sort()
-    print (Newlist)
-    Run = [i[2:] for i in Newlist]
-    return Run, Newlist
-    
-
-def submitjobs(Location):
-
-    
-    infile=open('all_new.sh','w')
-    
-    run, mylist = rundirectory(RunLocation)    
-    for i in run:
-        infile.write("bsub -q lx basf2 bklm-dst.py -- -e 8 -r " +i+"\n")
-
-def submitjobsHLT(Location):
-    
-    infile2 = open("needtorun.sh","w")
-    
-   #infile=open('killed.txt','r')
-    #ls_lines = infile.readlines()
-    #Run = [i[-5:-1] for i in ls_lines]
-    #Run.remove("")
-
-    #RUNAGAIN  = ['r00047', 'r00133', 'r00043', 'r00050', 'r00048', 'r00051', 'r00213', 'r00056', 'r00122', 'r00212', 'r00193', 'r00052', 'r00173', 'r00211', 'r00127', 'r00057', 'r00044', 'r00059']
-    
-    HLT = ["HLT1","HLT2","HLT3","HLT4","HLT5"]
-    run, mylist = rundirectory(RunLocation)       
-    for i in run:
-        for j in HLT:
-            infile2.write("bsub -q lx basf2 bklm_HLT.py -- -e 8 -r " +i+" -t "+j+"\n")
-
-def makedirectory(Location):
-    
-    infile4 = open("dic_new.sh","w")
-    run,mylist = rundirectory(RunLocation)
-    for i in mylist:
-        infile4.write("mkdir -vp "+i+"\n")
-
-def makepng(Location):
-    #Rundir = os.listdir(rootLocation)
-    infile1 = open("bklmroot.sh","w")
-    #run = [i[2:] for i in Rundir ]
-    run, mylist = rundirectory(RunLocation)
-    for i in run:
-        infile1.write("python3 recurROOTplot.py -e 8 -r "+i+" \n")
-        
-def makepdf(self):
-    #Rundir = os.listdir(rootLocation)
-    infile3 = open("Slides.sh","w")
-    #run = [i[2:] for i in Rundir ]
-    run, mylist = rundirectory(RunLocation)
-    for i in run:
-        infile3.write("python3 makelatex_v2.py -e 8 -r "+i+" \npython3 makelatex_v2.py -e 8 -r "+i+" \n ")
-
-def pngcategory(self):
-    #Rundir = os.listdir(rootLocation)
-    infile4 = open("pngcategory.sh","w")
-    #run = [i[2:] for i in Rundir ]
-    run, mylist = rundirectory(RunLocation)
-    for i in run:
-        infile4.write("python3 pngcategory.py -e 8 -r "+i+" \n")    
 
 #=========================================================================
 #
@@ -103,24 +39,32 @@ parser.add_option('-r', '--run', dest='rNumber',
                   default='0222',
                   help='Run number [default=0604]')
 parser.add_option('-f', '--fdate', dest='fdate',
-                  default='21 May',
-                  help='From date [default=21 May]')
+                  default='21 May 2019',
+                  help='From date, as "21 May 2019" or 2019-05-21; without a year it is this year [default=21 May 2019]')
 parser.add_option('-t', '--tdate', dest='tdate',
-                  default='25 May',
-                  help='To date [default=25 May]')
+                  default='25 May 2019',
+                  help='To date, as "25 May 2019" or 2019-05-25; without a year it is this year [default=25 May 2019]')
+parser.add_option('-m', '--minEvents', dest='minEvents',
+                  default='0',
+                  help='Minimum number of events of a run [default=0]')
+parser.add_option('-c', '--catalog', dest='catalog',
+                  default=runCatalog.CATALOG,
+                  help='Run-catalog file [default={0}]'.format(runCatalog.CATALOG))
+parser.add_option('-j', '--jobs', dest='jobs',
+                  default='0',
+                  help='Number of worker processes [default=number of CPUs]')
+parser.add_option('-n', '--dry-run', dest='dryRun', action='store_true',
+                  default=False,
+                  help='Print the pipeline commands without running them')
 (options, args) = parser.parse_args()
 exp = '{0:04d}'.format(int(options.eNumber))
 run = '{0:05d}'.format(int(options.rNumber))
-#fromdate = str(options.fdate)
-#todate = str(options.tdate)
-#print(fromdate)
-#print(todate)
 
 RunLocation = "/ghi/fs01/belle2/bdata/Data/Raw/e{0}/".format(exp)
 bklmroots = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/".format(exp)
-#submitjobs(RunLocation)
-#submitjobsHLT(RunLocation)
-#makepng(bklmroots)
-makepdf(bklmroots)
-#makedirectory(RunLocation)
-#pngcategory(RunLocation)
+catalog = runCatalog.RunCatalog(options.catalog)
+run = rundirectory(int(options.eNumber), options.fdate, options.tdate, int(options.minEvents), catalog)
+jobs = int(options.jobs)
+klmPipeline.runAll(int(options.eNumber), run, workers=(jobs if jobs > 0 else None),
+                   dryRun=options.dryRun, catalog=catalog)
+catalog.close()
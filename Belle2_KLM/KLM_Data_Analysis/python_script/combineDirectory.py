@@ -4,6 +4,7 @@ import os
 import sys
 import shutil
 from optparse import Option, OptionValueError, OptionParser
+import outputCache
 
 
 directory = ['RawKLM', 'SectorOccupancy', 'LayerOccupancy', 'RPCTime', 'ScintTime', 'TimeDistribution', 'ZHit','PhiHit','BKLMXYOccupancy', 'EKLMXYOccupancy']
@@ -168,6 +169,11 @@ parser.add_option('-e', '--experiment', dest='eNumber',
 parser.add_option('-r', '--run', dest='rNumber',
                   default='0133',
                   help='Run number [default=0604]')
+parser.add_option('-m', '--merged', dest='merged',
+                  default='0',
+                  help='Read the separate BKLM and EKLM files (0) or the single-pass file of bklm-dst.py -k 1 (1) [0]')
+parser.add_option('-f', '--force', dest='force', action='store_true', default=False,
+                  help='Recombine even if the input files are unchanged')
 (options, args) = parser.parse_args()
 exp = '{0:04d}'.format(int(options.eNumber))
 run = '{0:05d}'.format(int(options.rNumber))
@@ -189,6 +195,9 @@ input3 = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots
 outputName = './klmHistsE-e{0}r{1}.root'.format(exp, run)
 inputName1 = './bklmHists-e{0}r{1}_corrected.root'.format(exp, run)
 inputName2 = './eklmHists-e{0}r{1}.root'.format(exp, run)
+if int(options.merged) == 1:
+    inputName1 = './klmHists-e{0}r{1}_merged.root'.format(exp, run)
+    inputName2 = inputName1
 input1 = './bklmHitmap_run{2}.root'.format(exp, run, runhit1)
 input2 = './bklmHitmap_run{2}.root'.format(exp, run, runhit2)
 input3 = './bklmHitmap_run{2}.root'.format(exp, run, runhit3)
@@ -205,9 +214,21 @@ if os.path.exists(input3):
 
 print(inputName3)
 
+cache = outputCache.OutputCache(outputName, inputs=[inputName1, inputName2, inputName3], scripts=[__file__],
+                                config={'merged': int(options.merged)})
+if cache.fresh() and not options.force:
+    print(outputName, 'is up to date')
+    sys.exit(0)
+
 outfile = TFile.Open(outputName,'recreate')
 infile1 = TFile.Open(inputName1)
-infile2 = TFile.Open(inputName2)
+if int(options.merged) == 1:
+    # the EKLM histograms of the single-pass file are in its EKLM directory
+    infile2 = infile1.GetDirectory('EKLM')
+else:
+    infile2 = TFile.Open(inputName2)
 infile3 = TFile.Open(inputName3)
 
 combDict(outfile,infile1,infile2,infile3)
+outfile.Close()
+cache.record()
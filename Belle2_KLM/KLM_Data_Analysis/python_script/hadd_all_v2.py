@@ -4,12 +4,13 @@
 # Prerequisite (on kekcc): type
 # source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
 #
+# Merge the per-HLT EKLM histogram files of the RUNAGAIN runs in memory, several runs at a time, with mergeHists.py.
 #
 
 import sys
-import os
 import subprocess
 import datetime
+import mergeHists
 from ROOT import Belle2, TH1F, TH2F, TCanvas, THistPainter, TPad
 from optparse import Option, OptionValueError, OptionParser
 
@@ -19,45 +20,6 @@ from optparse import Option, OptionValueError, OptionParser
 RUNAGAIN = ['r02934', 'r02935', 'r02939', 'r02940', 'r02941', 'r02942', 'r02943', 'r02944', 'r02945', 'r02949', 'r02950', 'r02951', 'r02952', 'r02953', 'r02954', 'r02970', 'r02971', 'r02972', 'r02973', 'r02974', 'r03041', 'r03042', 'r03043', 'r03044', 'r03045', 'r03046', 'r03047', 'r03048', 'r03052', 'r03053', 'r03054', 'r03055', 'r03056', 'r03057', 'r03058', 'r03059', 'r03071', 'r03074', 'r03075', 'r03076', 'r03077', 'r03078', 'r03080', 'r03085', 'r03087', 'r03088', 'r03089', 'r03090', 'r03091', 'r03092', 'r03115', 'r03118', 'r03121', 'r03123']
 HLT = ["HLT1","HLT2","HLT3","HLT4","HLT5"]
 
-def submitjobs(Location):
-    #RunNameList = os.listdir(Location)
-    infile2=open("hadd.sh","w")
-    #Run = [i[2:] for i in RUNAGAIN]
-    #run = [i[2:] for i in RUNAGAIN]
-    for i in RUNAGAIN:
-        HLT1Location = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/eklmHists-e0008"+i+"_HLT1.root"
-        HLT2Location = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/eklmHists-e0008"+i+"_HLT2.root"
-        HLT3Location = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/eklmHists-e0008"+i+"_HLT3.root"
-        HLT4Location = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/eklmHists-e0008"+i+"_HLT4.root"
-        HLT5Location = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/eklmHists-e0008"+i+"_HLT5.root"
-
-        if os.path.exists(HLT1Location):
-            L1 = HLT1Location
-        else:
-            L1 =''
-
-        if os.path.exists(HLT2Location):
-            L2 = HLT2Location
-        else:
-            L2 =''
-
-        if os.path.exists(HLT3Location):
-            L3 = HLT3Location
-        else:
-            L3 =''
-
-        if os.path.exists(HLT4Location):
-            L4 = HLT4Location
-        else:
-            L4 =''
-
-        if os.path.exists(HLT5Location):
-            L5 = HLT5Location
-        else:
-            L5 =''
-        
-        infile2.write("hadd /ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/"+i+"/eklmHists-e0008"+i+".root " + L1+ " " +L2+ " " +L3+ " " +L4+ " " +L5+ " \n")
-
 #=========================================================================
 #
 #   Main routine
@@ -71,10 +33,20 @@ parser.add_option('-e', '--experiment', dest='eNumber',
 parser.add_option('-r', '--run', dest='rNumber',
                   default='0133',
                   help='Run number [default=0604]')
+parser.add_option('-j', '--jobs', dest='jobs',
+                  default='0',
+                  help='Number of worker processes [default=number of CPUs]')
+parser.add_option('-n', '--dry-run', dest='dryRun', action='store_true',
+                  default=False,
+                  help='Print the merges without running them')
 (options, args) = parser.parse_args()
 exp = '{0:04d}'.format(int(options.eNumber))
 run = '{0:05d}'.format(int(options.rNumber))
 
-RunLocation = "/ghi/fs01/belle2/bdata/Data/Raw/e{0}/".format(exp)
-RunLocation = "."
-submitjobs(RunLocation)
+jobs = int(options.jobs)
+mergeJobs = [mergeHists.runJob(int(options.eNumber), int(i[1:]), 'eklm') for i in RUNAGAIN]
+if options.dryRun:
+    for outputName, inputNames in mergeJobs:
+        print(outputName, '<-', ' '.join(inputNames))
+else:
+    mergeHists.mergeRuns(mergeJobs, workers=(jobs if jobs > 0 else None))
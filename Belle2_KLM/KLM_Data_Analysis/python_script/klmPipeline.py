@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Run the per-run KLM data-quality chain on the local machine instead of writing bsub/hadd/python3
+#   lines into .sh files and starting each stage by hand. The stages of every run form a dependency graph
+#
+#     bklm_HLTn, eklm_HLTn, hitmap_HLTn  (one job per HLT stream)
+#       -> mergeBKLM, mergeEKLM, mergeHitmap  (mergeHists.py of the HLT partials)
+#       -> combine (combineDirectory.py)
+#     mergeHitmap -> hitmapCategory (Hitpngcategory.py, per-category index.html of hitmap-e#r#)
+#     mergeBKLM -> png (recurROOTplot.py) -> category (pngcategory.py, per-category index.html) -> latex (makelatex.py)
+#
+#   and every stage whose dependencies have finished is started at once on a pool of worker processes,
+#   so the stages of many runs keep all workers busy. A failed stage is reported and its dependent
+#   stages are skipped; the other runs go on. The output of each stage goes to pipeline-logs/<stage>.log
+#   in the run directory.
+#
+# Prerequisite (on kekcc): type
+#   source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
+#
+# Usage:
+#   python3 klmPipeline.py -e # -r #[,#...] [-l runlist] [-j #] [-s stages] [-n]
+#   Arguments:
+#      -e #        experiment number (default is 8)
+#      -r list     comma-separated run numbers
+#      -l file     text file with one run number (or r#####) per line, instead of or in addition to -r
+#      -j #        number of worker processes (default is the number of CPUs)
+#      -s list     comma-separated stage kinds to run (default is all: bklm,eklm,hitmap,mergeBKLM,
+#                  mergeEKLM,mergeHitmap,hitmapCategory,combine,png,category,latex); stages that are not
+#                  selected count as done
+#      -n          print the commands in dependency order without running them
+
+import os
+import sys
+import datetime
+import concurrent.futures
+import subprocess
+from optparse import OptionParser
+import pngCategories
+
+#: directory of the basf2 steering scripts
+BASF2_SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'basf2_script')
+#: directory of the post-processing scripts
+PYTHON_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+#: raw-data directory of an experiment
+RAW_LOCATION = '/ghi/fs01/belle2/bdata/Data/Raw/e{0}/'
+#: output directory of an experiment; each run is processed in its r##### subdirectory
+ROOT_LOCATION = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/'
+#: HLT streams of a run
+HLT = ['HLT1', 'HLT2', 'HLT3', 'HLT4', 'HLT5']
+#: number of events read by a hitmap reconstruction job (basf2 -n)
+HITMAP_EVENTS = 200000
+#: all stage kinds, in pipeline order
+STAGE_KINDS = ['bklm', 'eklm', 'hitmap', 'mergeBKLM', 'mergeEKLM', 'mergeHitmap', 'hitmapCategory', 'combine', 'png',
+               'category', 'latex']
+
+
+class Stage:
+    """One command of the pipeline with the names of the stages it depends on"""
+
+    def __init__(self, name, kind, command, cwd, deps=(), outputs=()):
+        """Constructor
+
+        Arguments:
+            name (str): unique stage name, e.g. 'r03123/bklm_HLT1'
+            kind (str): stage kind (one of STAGE_KINDS)
+            command (list): program and arguments
+            cwd (str): working directory of the command
+            deps (list): names of the stages that must succeed first
+            outputs (list): path names of the files the stage writes
+        """
+        #: unique stage name
+        self.name = name
+        #: stage kind
+        self.kind = kind
+        #: program and arguments
+        self.command = list(command)
+        #: working directory of the command
+        self.cwd = cwd
+        #: names of the stages that must succeed first
+        self.deps = list(deps)
+        #: path names of the files the stage writes
+        self.outputs = list(outputs)
+
+    def logName(self):
+        """Return the path name of the stage's log file"""
+        return os.path.join(self.cwd, 'pipeline-logs', os.path.basename(self.name) + '.log')
+
+
+def runCommand(command, cwd, logName):
+    """Run one stage's command in a worker process and return its exit code
+
+    Arguments:
+        command (list): program and arguments
+        cwd (str): working directory
+        logName (str): path name of the file that receives stdout and stderr
+    """
+    os.makedirs(cwd, exist_ok=True)
+    os.makedirs(os.path.dirname(logName), exist_ok=True)
+    with open(logName, 'w') as log:
+        log.write(' '.join(command) + '\n')
+        log.flush()
+        try:
+            return subprocess.call(command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+        except OSError as error:
+            log.write('{0}\n'.format(error))
+            return 127
+
+
+class Pipeline:
+    """Dependency graph of stages, executed on a local process pool"""
+
+    def __init__(self):
+        """Constructor"""
+        #: stages by name, in insertion order
+        self.stages = {}
+
+    def add(self, stage):
+        """Add a stage; its dependencies may be added later
+
+        Arguments:
+            stage (Stage): the stage
+        """
+        if stage.name in self.stages:
+            raise ValueError('duplicate stage {0}'.format(stage.name))
+        self.stages[stage.name] = stage
+        return stage
+
+    def order(self):
+        """Return the stages in a dependency-respecting order (insertion order among independent stages)"""
+        done = set()
+        ordered = []
+        visiting = set()
+
+        def visit(stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError('dependency cycle at stage {0}'.format(stage.name))
+            visiting.add(stage.name)
+            for dep in stage.deps:
+                if dep in self.stages:
+                    visit(self.stages[dep])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            ordered.append(stage)
+
+        for stage in self.stages.values():
+            visit(stage)
+        return ordered
+
+    def run(self, workers=None, dryRun=False):
+        """Run every stage once its dependencies have succeeded; return a dict of stage name -> state
+
+        The state is 'done', 'failed' (non-zero exit code) or 'skipped' (a dependency did not succeed).
+        Dependencies that are not in the graph count as done.
+
+        Arguments:
+            workers (int): number of worker processes [number of CPUs]
+            dryRun (bool): print the commands in dependency order instead of running them
+        """
+        ordered = self.order()
+        if dryRun:
+            for stage in ordered:
+                print('[{0}] (cd {1} && {2})'.format(stage.name, stage.cwd, ' '.join(stage.command)))
+            return {stage.name: 'done' for stage in ordered}
+        state = {}
+        pending = list(ordered)
+        running = {}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            while pending or running:
+                waiting = []
+                for stage in pending:
+                    depStates = [state.get(dep) for dep in stage.deps if dep in self.stages]
+                    if any(s in ('failed', 'skipped') for s in depStates):
+                        state[stage.name] = 'skipped'
+                        print('klmPipeline: skip', stage.name)
+                    elif all(s == 'done' for s in depStates):
+                        print('klmPipeline: start', stage.name)
+                        running[pool.submit(runCommand, stage.command, stage.cwd, stage.logName())] = stage
+                    else:
+                        waiting.append(stage)
+                pending = waiting
+                if not running:
+                    continue
+                finished, notFinished = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    code = future.result()
+                    state[stage.name] = 'done' if code == 0 else 'failed'
+                    print('klmPipeline: {0} {1}{2}'.format(
+                        'finish' if code == 0 else 'FAILED', stage.name,
+                        '' if code == 0 else ' (exit code {0}, see {1})'.format(code, stage.logName())))
+        return state
+
+
+def addRun(pipeline, exp, run, kinds=None, rawLocation=RAW_LOCATION, rootLocation=ROOT_LOCATION, date=None):
+    """Add the stages of one run to the pipeline and return them
+
+    Arguments:
+        pipeline (Pipeline): the pipeline
+        exp (int): experiment number
+        run (int): run number
+        kinds (list): stage kinds to add [all]; dependencies on stages that are not added count as done
+        rawLocation (str): raw-data directory, formatted with the 4-digit experiment number
+        rootLocation (str): output directory, formatted with the 4-digit experiment number
+        date (str): date tag of the bklmEfficiency_day<date>_HLTn.root output of the hitmap jobs [today]
+    """
+    if kinds is None:
+        kinds = STAGE_KINDS
+    if date is None:
+        date = str(datetime.datetime.now())[:10].replace('-', '')
+    e = '{0:04d}'.format(int(exp))
+    r = '{0:05d}'.format(int(run))
+    runDir = os.path.join(rootLocation.format(e), 'r' + r)
+    rawDir = os.path.join(rawLocation.format(e), 'r' + r, 'sub00') + '/'
+    er = ['-e', str(int(exp)), '-r', str(int(run))]
+    stages = []
+
+    def stage(name, kind, command, deps=(), outputs=()):
+        if kind in kinds:
+            stages.append(pipeline.add(Stage('r{0}/{1}'.format(r, name), kind, command, runDir,
+                                             ['r{0}/{1}'.format(r, dep) for dep in deps],
+                                             [os.path.join(runDir, output) for output in outputs])))
+
+    bklmPartials = ['bklmHists-e{0}r{1}_{2}.root'.format(e, r, hlt) for hlt in HLT]
+    eklmPartials = ['eklmHists-e{0}r{1}_{2}.root'.format(e, r, hlt) for hlt in HLT]
+    # BKLMDigitAnalyzer writes the hitmap histograms to bklmHitmapHLTn_run#.root; the bklmEfficiency_day<date>_HLTn.root
+    # file of BKLMTracking is not merged
+    hitmapPartials = ['bklmHitmap{0}_run{1}.root'.format(hlt, int(run)) for hlt in HLT]
+    for hlt, bklmPartial, eklmPartial, hitmapPartial in zip(HLT, bklmPartials, eklmPartials, hitmapPartials):
+        stage('bklm_' + hlt, 'bklm', ['basf2', os.path.join(BASF2_SCRIPTS, 'bklm_HLT.py'), '--'] + er + ['-t', hlt],
+              outputs=[bklmPartial])
+        stage('eklm_' + hlt, 'eklm', ['basf2', os.path.join(BASF2_SCRIPTS, 'eklm.py'), '--'] + er + ['-t', hlt],
+              outputs=[eklmPartial])
+        stage('hitmap_' + hlt, 'hitmap',
+              ['basf2', '-n', str(HITMAP_EVENTS), os.path.join(BASF2_SCRIPTS, 'scripts_hitmap', 'recoGlobalRun_onlyBKLM.py'),
+               rawDir, runDir + '/', '{0}_{1}'.format(date, hlt), '0', hlt],
+              outputs=[hitmapPartial])
+    bklmName = 'bklmHists-e{0}r{1}_corrected.root'.format(e, r)
+    eklmName = 'eklmHists-e{0}r{1}.root'.format(e, r)
+    hitmapName = 'bklmHitmap_run{0:04d}.root'.format(int(run))
+    merge = ['python3', os.path.join(PYTHON_SCRIPTS, 'mergeHists.py')]
+    stage('mergeBKLM', 'mergeBKLM', merge + ['-o', bklmName] + bklmPartials,
+          ['bklm_' + hlt for hlt in HLT], [bklmName])
+    stage('mergeEKLM', 'mergeEKLM', merge + ['-o', eklmName] + eklmPartials,
+          ['eklm_' + hlt for hlt in HLT], [eklmName])
+    stage('mergeHitmap', 'mergeHitmap', merge + ['-o', hitmapName] + hitmapPartials,
+          ['hitmap_' + hlt for hlt in HLT], [hitmapName])
+    stage('hitmapCategory', 'hitmapCategory', ['python3', os.path.join(PYTHON_SCRIPTS, 'Hitpngcategory.py')] + er,
+          ['mergeHitmap'], [os.path.join('hitmap-e{0}r{1}'.format(e, r), category, 'index.html')
+                            for category in pngCategories.categories('hitmap')])
+    stage('combine', 'combine', ['python3', os.path.join(PYTHON_SCRIPTS, 'combineDirectory.py')] + er,
+          ['mergeBKLM', 'mergeEKLM', 'mergeHitmap'], ['klmHistsE-e{0}r{1}.root'.format(e, r)])
+    pngName = 'png-e{0}r{1}'.format(e, r)
+    stage('png', 'png', ['python3', os.path.join(PYTHON_SCRIPTS, 'recurROOTplot.py')] + er,
+          ['mergeBKLM'], [pngName])
+    stage('category', 'category', ['python3', os.path.join(PYTHON_SCRIPTS, 'pngcategory.py')] + er, ['png'],
+          [os.path.join(pngName, category, 'index.html') for category in pngCategories.categories('png')])
+    stage('latex', 'latex', ['python3', os.path.join(PYTHON_SCRIPTS, 'makelatex.py')] + er, ['category'],
+          [os.path.join('Short-listed', 'Slides_e{0}_r{1}.pdf'.format(e, r))])
+    return stages
+
+
+def readRunList(fileName):
+    """Return the run numbers (ints) listed one per line in a text file; 'r' prefixes and blank lines are ignored
+
+    Arguments:
+        fileName (str): path name of the run-list file
+    """
+    runs = []
+    with open(fileName) as f:
+        for line in f:
+            word = line.strip().lstrip('r')
+            if word.isdecimal():
+                runs.append(int(word))
+    return runs
+
+
+def parseKinds(text):
+    """Return the list of stage kinds in a comma-separated string (all if empty); exit on an unknown kind
+
+    Arguments:
+        text (str): comma-separated stage kinds
+    """
+    if text == '':
+        return STAGE_KINDS
+    kinds = text.split(',')
+    for kind in kinds:
+        if kind not in STAGE_KINDS:
+            print('Unknown stage {0}; the stages are {1}'.format(kind, ','.join(STAGE_KINDS)))
+            sys.exit(1)
+    return kinds
+
+
+def runAll(exp, runs, kinds=None, workers=None, dryRun=False, catalog=None):
+    """Build the pipeline of several runs, run it and print a summary; return the stage states
+
+    Arguments:
+        exp (int): experiment number
+        runs (list): run numbers
+        kinds (list): stage kinds to run [all]
+        workers (int): number of worker processes [number of CPUs]
+        dryRun (bool): print the commands instead of running them
+        catalog (runCatalog.RunCatalog): catalog that records the state of every stage that was run [none]
+    """
+    pipeline = Pipeline()
+    for run in runs:
+        addRun(pipeline, exp, run, kinds)
+    state = pipeline.run(workers, dryRun)
+    if catalog is not None and not dryRun:
+        for name, s in state.items():
+            runName, stageName = name.split('/')
+            catalog.setStage(exp, int(runName[1:]), stageName, s)
+        catalog.commit()
+    failed = sorted(name for name, s in state.items() if s != 'done')
+    print('klmPipeline: {0} stages of {1} runs, {2} not done'.format(len(state), len(runs), len(failed)))
+    for name in failed:
+        print('  {0}: {1}'.format(name, state[name]))
+    return state
+
+
+parser = OptionParser()
+parser.add_option('-e', '--experiment', dest='eNumber', default='8',
+                  help='Experiment number [8]')
+parser.add_option('-r', '--runs', dest='runs', default='',
+                  help='Comma-separated run numbers [no default]')
+parser.add_option('-l', '--runlist', dest='runlist', default='',
+                  help='Text file with one run number per line [no default]')
+parser.add_option('-j', '--jobs', dest='jobs', default='0',
+                  help='Number of worker processes [number of CPUs]')
+parser.add_option('-s', '--stages', dest='stages', default='',
+                  help='Comma-separated stage kinds to run [all]')
+parser.add_option('-n', '--dry-run', dest='dryRun', action='store_true', default=False,
+                  help='Print the commands without running them')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    runs = [int(r.lstrip('r')) for r in options.runs.split(',') if r != '']
+    if options.runlist != '':
+        runs += readRunList(options.runlist)
+    if len(runs) == 0:
+        print("No runs given (use -r and/or -l)")
+        sys.exit(1)
+    jobs = int(options.jobs)
+    runAll(int(options.eNumber), runs, parseKinds(options.stages), jobs if jobs > 0 else None, options.dryRun)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Produce the bklmHists/eklmHists file of one run on a single multi-core node in about the time of its
+#   slowest HLT stream, instead of submitting bklm_HLT.py and eklm.py once per HLT stream and merging the
+#   results with hadd afterwards. The raw files of the run are split into shards (one per HLT stream, or
+#   one per file with -s file) and every shard is analyzed by its own basf2 worker process at the same
+#   time. Each worker hands its histograms back in a private scratch directory; the parent then adds them
+#   in memory (mergeHists.py) and writes the final file of each subsystem once. The scratch directory,
+#   which also holds the worker logs, is removed when all shards have succeeded.
+#
+# Prerequisite (on kekcc): type
+#   source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
+#
+# Usage:
+#   python3 klmShards.py -e # -r # [-k bklm,eklm] [-s hlt|file] [-j #] [-o directory] [-n]
+#   Arguments:
+#      -e #        experiment number (default is 8)
+#      -r #        run number
+#      -k list     comma-separated subsystems to analyze: bklm (bklm_HLT.py), eklm (eklm.py) (default is both)
+#      -s mode     one shard per HLT stream (hlt) or per raw file (file) (default is hlt)
+#      -j #        number of worker processes (default is the number of CPUs)
+#      -o dir      directory of the output files (default is the run directory in bklmroots)
+#      -n          print the worker commands without running them
+#
+# Output:
+#   bklmHists-e#r#_corrected.root and/or eklmHists-e#r#.root in the output directory
+
+import os
+import sys
+import glob
+import shutil
+import tempfile
+from optparse import OptionParser
+import klmPipeline
+import mergeHists
+
+#: basf2 steering script and merged output file of each subsystem
+SUBSYSTEMS = {'bklm': ('bklm_HLT.py', 'bklmHists-e{0}r{1}_corrected.root'),
+              'eklm': ('eklm.py', 'eklmHists-e{0}r{1}.root')}
+
+
+def findShards(exp, run, mode='hlt', rawLocation=klmPipeline.RAW_LOCATION):
+    """Return the shards of a run as (tag, HLT stream, input file pattern) triplets
+
+    Arguments:
+        exp (int): experiment number
+        run (int): run number
+        mode (str): one shard per HLT stream ('hlt') or per raw file ('file')
+        rawLocation (str): raw-data directory, formatted with the 4-digit experiment number
+    """
+    e = '{0:04d}'.format(int(exp))
+    r = '{0:05d}'.format(int(run))
+    subDir = os.path.join(rawLocation.format(e), 'r' + r, 'sub00')
+    shards = []
+    for hlt in klmPipeline.HLT:
+        pattern = os.path.join(subDir, '*.{0}.{1}.{2}.f*.root'.format(e, r, hlt))
+        fileNames = sorted(glob.glob(pattern))
+        if len(fileNames) == 0:
+            continue
+        if mode == 'file':
+            for fileName in fileNames:
+                folio = [part for part in os.path.basename(fileName).split('.') if part.startswith('f')]
+                shards.append(('{0}_{1}'.format(hlt, folio[-1] if folio else len(shards)), hlt, fileName))
+        else:
+            shards.append((hlt, hlt, pattern))
+    return shards
+
+
+def runShards(exp, run, kinds, mode='hlt', workers=None, outputDir=None, dryRun=False):
+    """Analyze all shards of a run in parallel and write the merged file of each subsystem; return True on success
+
+    Arguments:
+        exp (int): experiment number
+        run (int): run number
+        kinds (list): subsystems to analyze ('bklm' and/or 'eklm')
+        mode (str): one shard per HLT stream ('hlt') or per raw file ('file')
+        workers (int): number of worker processes [number of CPUs]
+        outputDir (str): directory of the output files [run directory in bklmroots]
+        dryRun (bool): print the worker commands instead of running them
+    """
+    e = '{0:04d}'.format(int(exp))
+    r = '{0:05d}'.format(int(run))
+    if outputDir is None:
+        outputDir = os.path.join(klmPipeline.ROOT_LOCATION.format(e), 'r' + r)
+    shards = findShards(exp, run, mode)
+    if len(shards) == 0:
+        print('klmShards: no raw files found for experiment {0} run {1}'.format(e, r))
+        return False
+    if not dryRun:
+        os.makedirs(outputDir, exist_ok=True)
+    scratch = os.path.join(outputDir, 'shards-e{0}r{1}'.format(e, r)) if dryRun else \
+        tempfile.mkdtemp(prefix='shards-e{0}r{1}-'.format(e, r), dir=outputDir)
+    pipeline = klmPipeline.Pipeline()
+    merges = []
+    for kind in kinds:
+        script, outputName = SUBSYSTEMS[kind]
+        partials = []
+        for tag, hlt, inputName in shards:
+            partial = os.path.join(scratch, '{0}_{1}.root'.format(kind, tag))
+            partials.append(partial)
+            pipeline.add(klmPipeline.Stage('{0}_{1}'.format(kind, tag), kind,
+                                           ['basf2', os.path.join(klmPipeline.BASF2_SCRIPTS, script), '--',
+                                            '-e', str(int(exp)), '-r', str(int(run)), '-t', hlt,
+                                            '-i', inputName, '-o', partial],
+                                           scratch, outputs=[partial]))
+        merges.append((os.path.join(outputDir, outputName.format(e, r)), partials))
+    state = pipeline.run(workers, dryRun)
+    if dryRun:
+        for outputName, partials in merges:
+            print('merge {0} <- {1}'.format(outputName, ' '.join(partials)))
+        return True
+    failed = sorted(name for name, s in state.items() if s != 'done')
+    if len(failed) > 0:
+        print('klmShards: {0} shards failed, nothing written; see the logs in {1}'.format(len(failed), scratch))
+        return False
+    if mergeHists.mergeRuns(merges, workers, requireAll=True) > 0:
+        return False
+    shutil.rmtree(scratch)
+    return True
+
+
+parser = OptionParser()
+parser.add_option('-e', '--experiment', dest='eNumber', default='8',
+                  help='Experiment number [8]')
+parser.add_option('-r', '--run', dest='rNumber', default='',
+                  help='Run number [no default]')
+parser.add_option('-k', '--kinds', dest='kinds', default='bklm,eklm',
+                  help='Comma-separated subsystems: bklm, eklm [bklm,eklm]')
+parser.add_option('-s', '--shard', dest='shard', default='hlt',
+                  help='One shard per HLT stream (hlt) or per raw file (file) [hlt]')
+parser.add_option('-j', '--jobs', dest='jobs', default='0',
+                  help='Number of worker processes [number of CPUs]')
+parser.add_option('-o', '--outputdir', dest='outputDir', default='',
+                  help='Directory of the output files [run directory in bklmroots]')
+parser.add_option('-n', '--dry-run', dest='dryRun', action='store_true', default=False,
+                  help='Print the worker commands without running them')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    if not options.rNumber.isdecimal():
+        print("Run number ({0}) is not valid".format(options.rNumber))
+        sys.exit(1)
+    kinds = options.kinds.split(',')
+    for kind in kinds:
+        if kind not in SUBSYSTEMS:
+            print("Unknown subsystem {0}; use bklm and/or eklm".format(kind))
+            sys.exit(1)
+    if options.shard not in ('hlt', 'file'):
+        print("Unknown shard mode {0}; use hlt or file".format(options.shard))
+        sys.exit(1)
+    jobs = int(options.jobs)
+    ok = runShards(int(options.eNumber), int(options.rNumber), kinds, options.shard, jobs if jobs > 0 else None,
+                   options.outputDir if options.outputDir != '' else None, options.dryRun)
+    sys.exit(0 if ok else 1)
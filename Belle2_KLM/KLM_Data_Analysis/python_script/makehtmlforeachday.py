@@ -1,8 +1,8 @@
 # write-html.py
-import os
 import sys
 import time
 import subprocess
+import runCatalog
 
 #run = ["1772","1808"]
 Main = ''
@@ -15,9 +15,12 @@ def findrun(Location):
     column1 = [ x[0] for x in lst]
     #Runtxt = [i[:4] for i in column1]
     Runtxt = [str(i).zfill(4) for i in column1]
-    Avbklm = os.listdir("/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e0008/bklmroots/")
-    Avbklmrun = [i[2:] for i in Avbklm]
-    Run = [i for i in Runtxt if i in Avbklmrun]
+    # runs with plots, from the run catalog instead of listing the whole bklmroots directory
+    catalog = runCatalog.RunCatalog()
+    catalog.updateOutputs(8)
+    Avbklmrun = set(catalog.runsWithStage(8, 'png'))
+    catalog.close()
+    Run = [i for i in Runtxt if int(i) in Avbklmrun]
     Run.sort()
     return Run 
 
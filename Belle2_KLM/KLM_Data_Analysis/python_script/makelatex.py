@@ -1,182 +1,242 @@
-# write-latex.py
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Build the short-listed slides (beamer) of one or more runs from the declarative page layout FRAMES: each
+#   frame has a title, a grid (columns, image width and height) and the list of histograms it shows, which
+#   are looked up in the run's png-e#r# and hitmap-e#r# directories (in their category directories, see
+#   pngCategories.py).
+#
+#   Every frame is compiled on its own with pdflatex into a one-page PDF that is kept in the .frames directory
+#   next to the slides, together with an outputCache key over the frame's LaTeX source and the PNGs it
+#   includes. A frame whose key is unchanged is not compiled again; the frame PDFs are then stitched into
+#   Slides_e#_r#.pdf with pdfpages. The frames of all runs are compiled in parallel, each run in its own
+#   temporary directory, so a week of runs takes about as long as the slowest few frames.
+#
+# Prerequisite (on kekcc): pdflatex with the beamer and pdfpages packages
+#
+# Usage:
+#   python3 makelatex.py -e # -r #[,#...] [-l runlist] [-j #] [-f]
+#   Arguments:
+#      -e #        experiment number (default is 8)
+#      -r list     comma-separated run numbers
+#      -l file     text file with one run number (or r#####) per line, instead of or in addition to -r
+#      -j #        number of pdflatex processes (default is the number of CPUs)
+#      -f          compile every frame again, ignoring the cached frame PDFs
+#
+# Output:
+#   Short-listed/Slides_e#_r#.pdf in the run directory
+
 import os
 import sys
-import time
+import shutil
+import tempfile
 import subprocess
-from ROOT import TH1F, TH2F, TCanvas, THistPainter, TPad
-from optparse import Option, OptionValueError, OptionParser
-
-def writelatex(Location):
-    header = r'''\documentclass{beamer}
-    \mode<presentation> {
-    \usetheme{default}
-    \setbeamertemplate{footline}[page number] 
-    \setbeamertemplate{navigation symbols}{} 
-    }
-    \usepackage{graphicx}
-    \usepackage{booktabs}
-    \usepackage{amsmath}
-    \usepackage{slashed}
-    \usepackage{color}
-    \usepackage{rotating}
-    \usepackage{array}
-    \usepackage{varwidth}
-    \usepackage{pdfpages}
-    \usepackage{pgffor}
-    %%----------------------------------------------------------------------------------------
-    %%	TITLE PAGE 
-    %% Caution: If you want to comment out then please use %% (double percentage)
-    %%----------------------------------------------------------------------------------------
-
-    \title{Analysis of KLM Run} %% The short title appears at the bottom of every slide, the full title is only on the title page
-    \author{{\bf Atanu ~Pathak} \\}
-    \institute{\begin{minipage}{0.5\textwidth}\centering
-    \includegraphics[scale=0.1]{/home/belle2/atpathak/png/university-of-louisville-logo.png}
-    \end{minipage}}
-    \begin{document}
-    %%\begin{frame}
-    %%\titlepage
-    %%\end{frame}
-    %%------------------------------------------------
-'''
-    Main = r'''%%---------------
-    \begin{frame}
-    \frametitle{Short list of KLM plots}
-    \vspace*{.05cm}
-    \begin{center}
-    \begin{normalsize}
-    \vspace*{-.2cm}
-    \begin{center}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SectLayPlaneZBF}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SectLayPlanePhiBF}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/png-e%(exp)sr%(run)s/occupancyForwardXYPromptBkgd}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/png-e%(exp)sr%(run)s/NRawKLM}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/png-e%(exp)sr%(run)s/RawKLMnumNodes}\\
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SectLayPlaneZBB}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SectLayPlanePhiBB}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/png-e%(exp)sr%(run)s/occupancyBackwardXYPromptBkgd}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/png-e%(exp)sr%(run)s/RawKLMnodeID}
-    \includegraphics[width=.20\textwidth,height=.25\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/png-e%(exp)sr%(run)s/rawKLMlaneFlag} \\
-    
-    \end{center}
-    \end{normalsize}
-    \end{center}
-    \end{frame}
-    %%----------------------------------
-    \begin{frame}
-    \frametitle{BF TDC (RPCs)}
-    \vspace*{.05cm}
-    \begin{center}
-    \begin{normalsize}
-    \vspace*{-.2cm}
-    \begin{center}
-
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF0}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF1}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF2}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF3} \\
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF4}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF5}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF6}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBF7}
-
-    \end{center}
-    \end{normalsize}
-    \end{center}
-    \end{frame}
-    %%------------------------------------------
-    \begin{frame}
-    \frametitle{BB TDC (RPCs)}
-    \vspace*{.05cm}
-    \begin{center}
-    \begin{normalsize}
-    \vspace*{-.2cm}
-    \begin{center}
-    
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB0}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB1}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB2}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB3} \\
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB4}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB5}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB6}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/RPCTdcBB7}
-
-
-    \end{center}
-    \end{normalsize}
-    \end{center}
-    \end{frame}
-    %%----------------------------------------------
-    \begin{frame}
-    \frametitle{BF TDC (Scintillator)}
-    \vspace*{.05cm}
-    \begin{center}
-    \begin{normalsize}
-    \vspace*{-.2cm}
-    \begin{center}
-    
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF0}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF1}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF2}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF3} \\
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF4}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF5}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF6}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBF7}
-
-    \end{center}
-    \end{normalsize}
-    \end{center}
-    \end{frame}
-    %%----------------------------------------------
-    \begin{frame}
-    \frametitle{BB TDC (Scintillator)}
-    \vspace*{.05cm}
-    \begin{center}
-    \begin{normalsize}
-    \vspace*{-.2cm}
-    \begin{center}
-    
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB0}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB1}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB2}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB3} \\
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB4}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB5}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB6}
-    \includegraphics[width=.25\textwidth,height=.30\textheight,type=png,ext=.png,read=.png]{/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e%(exp)s/bklmroots/r%(run)s/hitmap-e%(exp)sr%(run)s/SciTdcBB7}
-    
-    \end{center}
-    \end{normalsize}
-    \end{center}
-    \end{frame}
-    %%--------------------------------------------------
+import concurrent.futures
+from optparse import OptionParser
+import klmPipeline
+import outputCache
+import pngCategories
+
+#: preamble of the slides (also of every single-frame document)
+HEADER = r'''\documentclass{beamer}
+\mode<presentation> {
+\usetheme{default}
+\setbeamertemplate{footline}[page number]
+\setbeamertemplate{navigation symbols}{}
+}
+\usepackage{graphicx}
+\usepackage{booktabs}
+\usepackage{amsmath}
+\usepackage{slashed}
+\usepackage{color}
+\usepackage{rotating}
+\usepackage{array}
+\usepackage{varwidth}
+\usepackage{pdfpages}
+\usepackage{pgffor}
+\title{Analysis of KLM Run}
+\author{{\bf Atanu ~Pathak} \\}
+\institute{\begin{minipage}{0.5\textwidth}\centering
+\includegraphics[scale=0.1]{/home/belle2/atpathak/png/university-of-louisville-logo.png}
+\end{minipage}}
+\begin{document}
 '''
-    footer = r'''\end{document}'''
-    content = header + Main + footer
-
-    if not os.path.exists(Location):
-        os.makedirs(Location)
-        
-    TexFile = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/Short-listed/Slides_e{0}_r{1}.tex".format(exp, run)
-
-    
-    with open(TexFile,'w') as f:
-        f.write(content % {"run": run , "exp" : exp})
-        
-
-    #os.system("pdflatex Slides.tex")
-    os.chdir(Location)
-    commandLine = subprocess.Popen(['pdflatex', TexFile])
-    commandLine.communicate()
-    os.system("rm -rf Slides_e{0}_r{1}.tex".format(exp, run))
-    os.system("rm -rf Slides_e{0}_r{1}.out".format(exp, run))
-    os.system("rm -rf Slides_e{0}_r{1}.snm".format(exp, run))
-    os.system("rm -rf Slides_e{0}_r{1}.aux".format(exp, run))
-    os.system("rm -rf Slides_e{0}_r{1}.nav".format(exp, run))
-    os.system("rm -rf Slides_e{0}_r{1}.toc".format(exp, run))
-    os.system("rm -rf Slides_e{0}_r{1}.log".format(exp, run))
+
+#: page layout of the slides: title, grid and histograms (PNG directory kind, name) of every frame
+FRAMES = [{'title': 'Short list of KLM plots', 'columns': 5, 'width': .20, 'height': .25,
+           'images': [('hitmap', 'SectLayPlaneZBF'), ('hitmap', 'SectLayPlanePhiBF'),
+                      ('png', 'occupancyForwardXYPromptBkgd'), ('png', 'NRawKLM'), ('png', 'RawKLMnumNodes'),
+                      ('hitmap', 'SectLayPlaneZBB'), ('hitmap', 'SectLayPlanePhiBB'),
+                      ('png', 'occupancyBackwardXYPromptBkgd'), ('png', 'RawKLMnodeID'), ('png', 'rawKLMlaneFlag')]},
+          {'title': 'BF TDC (RPCs)', 'columns': 4, 'width': .25, 'height': .30,
+           'images': [('hitmap', 'RPCTdcBF{0}'.format(i)) for i in range(0, 8)]},
+          {'title': 'BB TDC (RPCs)', 'columns': 4, 'width': .25, 'height': .30,
+           'images': [('hitmap', 'RPCTdcBB{0}'.format(i)) for i in range(0, 8)]},
+          {'title': 'BF TDC (Scintillator)', 'columns': 4, 'width': .25, 'height': .30,
+           'images': [('hitmap', 'SciTdcBF{0}'.format(i)) for i in range(0, 8)]},
+          {'title': 'BB TDC (Scintillator)', 'columns': 4, 'width': .25, 'height': .30,
+           'images': [('hitmap', 'SciTdcBB{0}'.format(i)) for i in range(0, 8)]}]
+
+
+def frameSource(frame, page, runDir, exp, run):
+    """Return (LaTeX source of a frame, path names of the PNGs it includes)
+
+    A missing PNG is replaced by a framed placeholder, so one missing plot does not stop the slides.
+
+    Arguments:
+        frame (dict): entry of FRAMES
+        page (int): page number of the frame in the slides
+        runDir (str): run directory in bklmroots
+        exp (str): formatted experiment number
+        run (str): formatted run number
+    """
+    lines = [r'\setcounter{page}{%d}' % page,
+             r'\begin{frame}',
+             r'\frametitle{%s}' % frame['title'],
+             r'\vspace*{.05cm}',
+             r'\begin{center}',
+             r'\begin{normalsize}',
+             r'\vspace*{-.2cm}',
+             r'\begin{center}']
+    pngs = []
+    for index, (kind, name) in enumerate(frame['images']):
+        pngdir = os.path.join(runDir, '{0}-e{1}r{2}'.format(kind, exp, run))
+        pngName = pngCategories.imageName(pngdir, kind, name) if kind in pngCategories.PAGES else \
+            os.path.join(pngdir, name + '.png')
+        pngs.append(pngName)
+        size = r'width=%.2f\textwidth,height=%.2f\textheight' % (frame['width'], frame['height'])
+        if os.path.exists(pngName):
+            line = r'\includegraphics[%s]{%s}' % (size, pngName)
+        else:
+            line = r'\fbox{\parbox[c][%.2f\textheight][c]{%.2f\textwidth}{\centering\tiny missing\\ \detokenize{%s}}}' % \
+                (frame['height'], frame['width'] - 0.02, name)
+        if (index + 1) % frame['columns'] == 0:
+            line += r' \\'
+        lines.append(line)
+    lines += [r'\end{center}', r'\end{normalsize}', r'\end{center}', r'\end{frame}']
+    return '\n'.join(lines) + '\n', pngs
+
+
+def pdflatex(texName, workDir):
+    """Run pdflatex on a file in a directory; return '' on success or the tail of the log
+
+    Arguments:
+        texName (str): name of the .tex file in workDir
+        workDir (str): directory of the compilation
+    """
+    process = subprocess.run(['pdflatex', '-interaction=batchmode', '-halt-on-error', texName], cwd=workDir,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    pdfName = os.path.join(workDir, texName[:-4] + '.pdf')
+    if process.returncode == 0 and os.path.exists(pdfName):
+        return ''
+    logName = os.path.join(workDir, texName[:-4] + '.log')
+    if os.path.exists(logName):
+        with open(logName, errors='replace') as f:
+            return ''.join(f.readlines()[-20:])
+    return process.stdout.decode(errors='replace')
+
+
+def compileFrame(job):
+    """Compile one frame into its cached PDF in a worker process; return (frame PDF, error message or '')
+
+    Arguments:
+        job (tuple): (workDir, source, pngs, framePdf) = temporary directory of the run, LaTeX source of the
+                     frame, the PNGs it includes, path name of the cached frame PDF
+    """
+    workDir, source, pngs, framePdf = job
+    jobName = os.path.splitext(os.path.basename(framePdf))[0]
+    with open(os.path.join(workDir, jobName + '.tex'), 'w') as f:
+        f.write(HEADER + source + '\\end{document}\n')
+    error = pdflatex(jobName + '.tex', workDir)
+    if error != '':
+        return framePdf, error
+    tmpName = framePdf + '.tmp'
+    shutil.copyfile(os.path.join(workDir, jobName + '.pdf'), tmpName)
+    os.replace(tmpName, framePdf)
+    outputCache.OutputCache(framePdf, inputs=pngs, scripts=[__file__], config=source).record()
+    return framePdf, ''
+
+
+def stitch(job):
+    """Join the frame PDFs of a run into its slides in a worker process; return (slides PDF, error message or '')
+
+    The slides are not joined again if none of the frame PDFs changed ('up to date' is returned).
+
+    Arguments:
+        job (tuple): (workDir, framePdfs, slidesPdf) = temporary directory of the run, frame PDFs in page order,
+                     path name of the slides
+    """
+    workDir, framePdfs, slidesPdf = job
+    cache = outputCache.OutputCache(slidesPdf, inputs=framePdfs, scripts=[__file__])
+    if cache.fresh():
+        return slidesPdf, 'up to date'
+    with open(os.path.join(workDir, 'slides.tex'), 'w') as f:
+        f.write('\\documentclass{article}\n\\usepackage{pdfpages}\n\\begin{document}\n')
+        for framePdf in framePdfs:
+            f.write('\\includepdf[pages=-,fitpaper]{%s}\n' % framePdf)
+        f.write('\\end{document}\n')
+    error = pdflatex('slides.tex', workDir)
+    if error != '':
+        return slidesPdf, error
+    tmpName = slidesPdf + '.tmp'
+    shutil.copyfile(os.path.join(workDir, 'slides.pdf'), tmpName)
+    os.replace(tmpName, slidesPdf)
+    cache.record()
+    return slidesPdf, ''
+
+
+def makeSlides(exp, runs, workers=None, force=False, rootLocation=klmPipeline.ROOT_LOCATION):
+    """Build the slides of several runs, compiling only the frames whose source or PNGs changed
+
+    Return the number of runs whose slides could not be built.
+
+    Arguments:
+        exp (int): experiment number
+        runs (list): run numbers
+        workers (int): number of pdflatex processes [number of CPUs]
+        force (bool): compile every frame, ignoring the cached frame PDFs
+        rootLocation (str): output directory, formatted with the 4-digit experiment number
+    """
+    e = '{0:04d}'.format(int(exp))
+    frameJobs = []
+    stitchJobs = []
+    workDirs = []
+    for run in runs:
+        r = '{0:05d}'.format(int(run))
+        runDir = os.path.join(rootLocation.format(e), 'r' + r)
+        location = os.path.join(runDir, 'Short-listed')
+        os.makedirs(os.path.join(location, '.frames'), exist_ok=True)
+        workDir = tempfile.mkdtemp(prefix='slides-e{0}r{1}-'.format(e, r))
+        workDirs.append(workDir)
+        framePdfs = []
+        for page, frame in enumerate(FRAMES, 1):
+            source, pngs = frameSource(frame, page, runDir, e, r)
+            framePdf = os.path.join(location, '.frames', 'frame{0:02d}.pdf'.format(page))
+            framePdfs.append(framePdf)
+            cache = outputCache.OutputCache(framePdf, inputs=pngs, scripts=[__file__], config=source)
+            if force or not cache.fresh():
+                frameJobs.append((workDir, source, pngs, framePdf))
+        slidesPdf = os.path.join(location, 'Slides_e{0}_r{1}.pdf'.format(e, r))
+        stitchJobs.append((workDir, framePdfs, slidesPdf))
+    failed = set()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for framePdf, error in pool.map(compileFrame, frameJobs):
+            if error != '':
+                failed.add(os.path.dirname(os.path.dirname(framePdf)))
+                print('makelatex: FAILED {0}:\n{1}'.format(framePdf, error))
+        for slidesPdf, error in pool.map(stitch, [job for job in stitchJobs if os.path.dirname(job[2]) not in failed]):
+            if error == 'up to date':
+                print('makelatex: {0} is up to date'.format(slidesPdf))
+            elif error != '':
+                failed.add(os.path.dirname(slidesPdf))
+                print('makelatex: FAILED {0}:\n{1}'.format(slidesPdf, error))
+            else:
+                print('makelatex: wrote {0}'.format(slidesPdf))
+    for workDir in workDirs:
+        shutil.rmtree(workDir, ignore_errors=True)
+    print('makelatex: {0} frames compiled, {1} of {2} runs failed'.format(len(frameJobs), len(failed), len(runs)))
+    return len(failed)
 
 #=========================================================================
 #
@@ -187,14 +247,24 @@ def writelatex(Location):
 parser = OptionParser()
 parser.add_option('-e', '--experiment', dest='eNumber',
                   default='8',
-                  help='Experiment number [default=7]')
+                  help='Experiment number [default=8]')
 parser.add_option('-r', '--run', dest='rNumber',
-                  default='0220',
-                  help='Run number [default=0604]')
-(options, args) = parser.parse_args()
-exp = '{0:04d}'.format(int(options.eNumber))
-run = '{0:05d}'.format(int(options.rNumber))
-
-RunLocation = "/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/Short-listed/".format(exp, run)
+                  default='',
+                  help='Comma-separated run numbers [no default]')
+parser.add_option('-l', '--runlist', dest='runlist', default='',
+                  help='Text file with one run number per line [no default]')
+parser.add_option('-j', '--jobs', dest='jobs', default='0',
+                  help='Number of pdflatex processes [number of CPUs]')
+parser.add_option('-f', '--force', dest='force', action='store_true', default=False,
+                  help='Compile every frame even if its PNGs are unchanged')
 
-writelatex(RunLocation)
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    runs = [int(r.lstrip('r')) for r in options.rNumber.split(',') if r != '']
+    if options.runlist != '':
+        runs += klmPipeline.readRunList(options.runlist)
+    if len(runs) == 0:
+        print("No runs given (use -r and/or -l)")
+        sys.exit(1)
+    jobs = int(options.jobs)
+    sys.exit(1 if makeSlides(int(options.eNumber), runs, jobs if jobs > 0 else None, options.force) > 0 else 0)
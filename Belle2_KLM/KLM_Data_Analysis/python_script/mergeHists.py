@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Merge the per-HLT histogram files of a run in memory instead of running hadd once per run.
+#   mergeFiles() reads every histogram of the first partial file, adds the same-named histogram of the
+#   other partials after checking that the binning matches, keeps the directory structure (e.g. the EKLM
+#   directory of klmHists-e#r#_merged.root) and writes the sum to a temporary file that is then renamed,
+#   so a merged file is never seen half-written. Other objects are merged with their own Merge() like hadd
+#   does (the entries of the TTrees of all partials are concatenated); an object that has no Merge() and is
+#   in more than one partial (e.g. a TNamed) fails the merge. Missing or unreadable partials are reported and
+#   skipped (unless all partials are required). mergeRuns() merges many runs concurrently on a process pool.
+#
+# Prerequisite (on kekcc): type
+#   source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
+#
+# Usage:
+#   python3 mergeHists.py -o merged.root partial1.root partial2.root ...
+#   python3 mergeHists.py -e # -r #[,#...] [-k kind] [-j #] [-a]
+#   Arguments:
+#      -o file     merge the files given as arguments into this file
+#      -e #        experiment number (default is 8)
+#      -r list     comma-separated run numbers whose HLT partials are merged in their bklmroots directory
+#      -k kind     which partials to merge: bklm, eklm or hitmap (bklmHitmapHLTn_run#.root; default is bklm)
+#      -j #        number of worker processes (default is the number of CPUs)
+#      -a          fail if any partial is missing or unreadable (default is to merge the others)
+
+import os
+import sys
+import concurrent.futures
+from optparse import OptionParser
+import klmPipeline
+
+
+class MergeError(Exception):
+    """Raised when the partial files of a merge cannot be combined"""
+
+
+def sameBinning(hist1, hist2):
+    """Return True if two histograms have the same dimension and the same bin edges on every axis
+
+    Arguments:
+        hist1 (ROOT.TH1): first histogram
+        hist2 (ROOT.TH1): second histogram
+    """
+    if hist1.GetDimension() != hist2.GetDimension():
+        return False
+    axes = [(hist1.GetXaxis(), hist2.GetXaxis()), (hist1.GetYaxis(), hist2.GetYaxis()),
+            (hist1.GetZaxis(), hist2.GetZaxis())][0:hist1.GetDimension()]
+    for axis1, axis2 in axes:
+        if axis1.GetNbins() != axis2.GetNbins():
+            return False
+        for edge in range(1, axis1.GetNbins() + 2):
+            low1 = axis1.GetBinLowEdge(edge)
+            low2 = axis2.GetBinLowEdge(edge)
+            if abs(low1 - low2) > 1.0E-6 * max(1.0, abs(low1)):
+                return False
+    return True
+
+
+def _readDirectory(directory, merged, path):
+    """Add the objects of one (sub)directory of a partial file to the merged tree
+
+    Histograms are added after their binnings are checked; other objects (TTree, TGraph, ...) are merged with
+    their Merge() method, and raise MergeError if they have none.
+
+    Arguments:
+        directory (ROOT.TDirectory): directory of the partial file
+        merged (dict): merged tree of name -> histogram, other object or dict (subdirectory), updated in place
+        path (str): path of the directory, for the error messages
+    """
+    import ROOT
+    seen = set()
+    for key in directory.GetListOfKeys():
+        name = key.GetName()
+        if name in seen:
+            continue  # older cycle of an object that was already read
+        seen.add(name)
+        thisObject = key.ReadObj()
+        if thisObject.InheritsFrom('TDirectory'):
+            subtree = merged.setdefault(name, {})
+            if not isinstance(subtree, dict):
+                raise MergeError('{0}{1} is a directory in one partial and a histogram in another'.format(path, name))
+            _readDirectory(thisObject, subtree, path + name + '/')
+        elif thisObject.InheritsFrom('TH1'):
+            thisObject.SetDirectory(0)
+            total = merged.get(name)
+            if total is None:
+                merged[name] = thisObject
+            elif isinstance(total, dict) or not total.InheritsFrom('TH1') or not sameBinning(total, thisObject):
+                raise MergeError('{0}{1} has different binnings in the partial files'.format(path, name))
+            else:
+                total.Add(thisObject)
+        else:
+            total = merged.get(name)
+            if total is None:
+                if thisObject.InheritsFrom('TTree'):
+                    ROOT.gROOT.cd()
+                    thisObject = thisObject.CloneTree(-1)  # in memory, so it outlives the partial file
+                if hasattr(thisObject, 'SetDirectory'):
+                    thisObject.SetDirectory(0)
+                merged[name] = thisObject
+            elif isinstance(total, dict) or total.ClassName() != thisObject.ClassName():
+                raise MergeError('{0}{1} has different classes in the partial files'.format(path, name))
+            elif not hasattr(total, 'Merge'):
+                raise MergeError('{0}{1} ({2}) cannot be merged'.format(path, name, thisObject.ClassName()))
+            else:
+                others = ROOT.TList()
+                others.Add(thisObject)
+                total.Merge(others)
+
+
+def _writeDirectory(directory, merged):
+    """Write the merged tree into a directory of the output file"""
+    for name, thisObject in merged.items():
+        if isinstance(thisObject, dict):
+            subdirectory = directory.mkdir(name)
+            _writeDirectory(subdirectory, thisObject)
+            directory.cd()
+        else:
+            directory.cd()
+            thisObject.Write(name)
+
+
+def mergeFiles(outputName, inputNames, requireAll=False):
+    """Merge the histograms of several ROOT files into one file; return the list of skipped input files
+
+    Arguments:
+        outputName (str): path name of the merged file (written atomically)
+        inputNames (list): path names of the partial files
+        requireAll (bool): raise MergeError if any partial is missing or unreadable instead of skipping it
+    """
+    import ROOT
+    merged = {}
+    skipped = []
+    for inputName in inputNames:
+        inputFile = ROOT.TFile.Open(inputName) if os.path.exists(inputName) else None
+        if not inputFile or inputFile.IsZombie():
+            if requireAll:
+                raise MergeError('cannot read {0}'.format(inputName))
+            skipped.append(inputName)
+            continue
+        try:
+            _readDirectory(inputFile, merged, inputName + ':')
+        finally:
+            inputFile.Close()
+    if len(skipped) == len(inputNames):
+        raise MergeError('none of the partial files of {0} can be read'.format(outputName))
+    tmpName = outputName + '.tmp.root'
+    outputFile = ROOT.TFile(tmpName, 'RECREATE')
+    _writeDirectory(outputFile, merged)
+    outputFile.Close()
+    os.replace(tmpName, outputName)
+    return skipped
+
+
+def _mergeJob(job):
+    """Run one mergeFiles() job in a worker process; return (outputName, skipped files, error message or '')"""
+    outputName, inputNames, requireAll = job
+    try:
+        return outputName, mergeFiles(outputName, inputNames, requireAll), ''
+    except (MergeError, OSError) as error:
+        return outputName, [], str(error)
+    except Exception as error:  # e.g. a ROOT or PyROOT error: fail this merge only, not the whole pool
+        return outputName, [], '{0}: {1}'.format(type(error).__name__, error)
+
+
+def mergeRuns(jobs, workers=None, requireAll=False):
+    """Merge several outputs concurrently on a process pool and print a summary; return the number of failures
+
+    Arguments:
+        jobs (list): (outputName, inputNames) pairs
+        workers (int): number of worker processes [number of CPUs]
+        requireAll (bool): fail a merge if any of its partials is missing or unreadable
+    """
+    failures = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        for outputName, skipped, error in pool.map(_mergeJob, [(o, i, requireAll) for o, i in jobs]):
+            if error != '':
+                failures += 1
+                print('mergeHists: FAILED {0}: {1}'.format(outputName, error))
+                continue
+            print('mergeHists: wrote {0}'.format(outputName))
+            for inputName in skipped:
+                print('  missing or unreadable partial {0}'.format(inputName))
+    return failures
+
+
+def runJob(exp, run, kind, rootLocation=klmPipeline.ROOT_LOCATION):
+    """Return the (outputName, inputNames) pair that merges the HLT partials of one run
+
+    Arguments:
+        exp (int): experiment number
+        run (int): run number
+        kind (str): 'bklm', 'eklm' or 'hitmap'
+        rootLocation (str): output directory, formatted with the 4-digit experiment number
+    """
+    e = '{0:04d}'.format(int(exp))
+    r = '{0:05d}'.format(int(run))
+    runDir = os.path.join(rootLocation.format(e), 'r' + r)
+    if kind == 'bklm':
+        outputName = 'bklmHists-e{0}r{1}_corrected.root'.format(e, r)
+        inputNames = ['bklmHists-e{0}r{1}_{2}.root'.format(e, r, hlt) for hlt in klmPipeline.HLT]
+    elif kind == 'eklm':
+        outputName = 'eklmHists-e{0}r{1}.root'.format(e, r)
+        inputNames = ['eklmHists-e{0}r{1}_{2}.root'.format(e, r, hlt) for hlt in klmPipeline.HLT]
+    elif kind == 'hitmap':
+        outputName = 'bklmHitmap_run{0:04d}.root'.format(int(run))
+        inputNames = ['bklmHitmap{0}_run{1}.root'.format(hlt, int(run)) for hlt in klmPipeline.HLT]
+    else:
+        raise ValueError('unknown kind {0}'.format(kind))
+    return os.path.join(runDir, outputName), [os.path.join(runDir, name) for name in inputNames]
+
+
+parser = OptionParser()
+parser.add_option('-o', '--output', dest='output', default='',
+                  help='Merged file of the input files given as arguments [no default]')
+parser.add_option('-e', '--experiment', dest='eNumber', default='8',
+                  help='Experiment number [8]')
+parser.add_option('-r', '--runs', dest='runs', default='',
+                  help='Comma-separated run numbers [no default]')
+parser.add_option('-k', '--kind', dest='kind', default='bklm',
+                  help='Partials to merge: bklm, eklm or hitmap [bklm]')
+parser.add_option('-j', '--jobs', dest='jobs', default='0',
+                  help='Number of worker processes [number of CPUs]')
+parser.add_option('-a', '--all', dest='requireAll', action='store_true', default=False,
+                  help='Fail if any partial is missing or unreadable')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    if options.output != '':
+        if len(args) == 0:
+            print("No input files given")
+            sys.exit(1)
+        try:
+            for inputName in mergeFiles(options.output, args, options.requireAll):
+                print('mergeHists: missing or unreadable partial {0}'.format(inputName))
+        except MergeError as error:
+            print('mergeHists: {0}'.format(error))
+            sys.exit(1)
+        sys.exit(0)
+    if options.kind not in ('bklm', 'eklm', 'hitmap'):
+        print("Unknown kind {0}; use bklm, eklm or hitmap".format(options.kind))
+        sys.exit(1)
+    runs = [int(r.lstrip('r')) for r in options.runs.split(',') if r != '']
+    if len(runs) == 0:
+        print("No runs given (use -r or -o)")
+        sys.exit(1)
+    jobs = int(options.jobs)
+    failures = mergeRuns([runJob(options.eNumber, run, options.kind) for run in runs],
+                         jobs if jobs > 0 else None, options.requireAll)
+    sys.exit(1 if failures > 0 else 0)
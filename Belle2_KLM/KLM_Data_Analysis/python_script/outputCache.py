@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Content-addressed cache of the stage outputs (PNG directories, combined ROOT files, slides), so that a
+#   stage whose inputs have not changed is skipped and a nightly pass over an experiment only touches new or
+#   changed runs. For every output artifact the stage records a key: the SHA-1 of its input files (e.g. the
+#   ROOT histogram file, whose contents include the calibration constants of the basf2 job), of the stage
+#   scripts (the analysis version), of its configuration (histogram lists, options) and of the recorded keys
+#   of upstream outputs. The key is stored next to the output in the hidden file .<output name>.key.
+#
+#   The key file also remembers the size, mtime and digest of every input file, so an unchanged input is not
+#   read again to compute its digest.
+#
+# Usage (in a stage script):
+#   cache = outputCache.OutputCache(outputName, inputs=[inputName], scripts=[__file__], config={'Box': Box})
+#   if cache.fresh():
+#       print(outputName, 'is up to date'); sys.exit(0)
+#   ... write outputName ...
+#   cache.record()
+
+import os
+import json
+import hashlib
+
+#: bump to invalidate every recorded key (e.g. after a change of the key layout)
+KEY_VERSION = 1
+
+
+def keyName(output):
+    """Return the path name of the key file of an output file or directory
+
+    Arguments:
+        output (str): path name of the output artifact
+    """
+    output = os.path.normpath(output)
+    return os.path.join(os.path.dirname(output), '.' + os.path.basename(output) + '.key')
+
+
+def recordedKey(output):
+    """Return the recorded key of an output (str), or '' if it has none
+
+    Arguments:
+        output (str): path name of the output artifact
+    """
+    try:
+        with open(keyName(output)) as f:
+            return json.load(f).get('key', '')
+    except (OSError, ValueError):
+        return ''
+
+
+def fileDigest(fileName, blockSize=1 << 20):
+    """Return the SHA-1 hex digest of a file's contents
+
+    Arguments:
+        fileName (str): path name of the file
+        blockSize (int): number of bytes read at a time
+    """
+    digest = hashlib.sha1()
+    with open(fileName, 'rb') as f:
+        for block in iter(lambda: f.read(blockSize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """Key of one output artifact computed from its inputs, scripts, configuration and upstream outputs"""
+
+    def __init__(self, output, inputs=(), scripts=(), config=None, upstream=()):
+        """Constructor
+
+        Arguments:
+            output (str): path name of the output file or directory
+            inputs (list): path names of the input files (a missing input is part of the key as 'missing')
+            scripts (list): path names of the scripts whose source is part of the key
+            config: JSON-serializable configuration of the stage (lists, constants, options)
+            upstream (list): path names of upstream outputs whose recorded keys are part of the key
+        """
+        #: path name of the output artifact
+        self.output = os.path.abspath(output)
+        #: path names of the input files (absolute, so the key does not depend on a later os.chdir)
+        self.inputs = [os.path.abspath(fileName) for fileName in inputs]
+        #: path names of the scripts
+        self.scripts = [os.path.abspath(fileName) for fileName in scripts]
+        #: configuration of the stage
+        self.config = config
+        #: path names of upstream outputs
+        self.upstream = [os.path.abspath(output) for output in upstream]
+        #: per-input (size, mtime, digest) of the last recorded key, to avoid re-reading unchanged inputs
+        self.known = {}
+        try:
+            with open(keyName(output)) as f:
+                self.known = json.load(f).get('inputs', {})
+        except (OSError, ValueError):
+            pass
+        #: per-input (size, mtime, digest) of the current inputs
+        self.current = {}
+        #: current key (computed on demand)
+        self._key = None
+
+    def _digest(self, fileName):
+        """Return the digest of an input file, re-using the recorded one if its size and mtime are unchanged"""
+        try:
+            stat = os.stat(fileName)
+        except OSError:
+            return 'missing'
+        known = self.known.get(fileName)
+        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime:
+            digest = known[2]
+        else:
+            digest = fileDigest(fileName)
+        self.current[fileName] = (stat.st_size, stat.st_mtime, digest)
+        return digest
+
+    def key(self):
+        """Return the current key (SHA-1 hex digest) of the output"""
+        if self._key is None:
+            digest = hashlib.sha1('outputCache {0}\n'.format(KEY_VERSION).encode())
+            for fileName in self.inputs:
+                digest.update('input {0} {1}\n'.format(os.path.basename(fileName), self._digest(fileName)).encode())
+            for fileName in self.scripts:
+                digest.update('script {0} {1}\n'.format(os.path.basename(fileName), self._digest(fileName)).encode())
+            digest.update('config {0}\n'.format(json.dumps(self.config, sort_keys=True)).encode())
+            for output in self.upstream:
+                digest.update('upstream {0} {1}\n'.format(os.path.basename(output), recordedKey(output)).encode())
+            self._key = digest.hexdigest()
+        return self._key
+
+    def fresh(self):
+        """Return True if the output exists and was produced from the same inputs as now
+
+        The key file of a fresh output is touched, so its mtime tells when the output was last confirmed
+        (reconcile.py compares it with the mtimes of the inputs).
+        """
+        if not os.path.exists(self.output):
+            return False
+        if recordedKey(self.output) != self.key():
+            return False
+        os.utime(keyName(self.output))
+        return True
+
+    def record(self):
+        """Record the current key after the output has been written"""
+        tmpName = keyName(self.output) + '.tmp'
+        key = self.key()
+        with open(tmpName, 'w') as f:
+            json.dump({'key': key, 'inputs': self.current}, f)
+        os.replace(tmpName, keyName(self.output))
+
+    def forget(self):
+        """Remove the recorded key (the output will be regenerated next time)"""
+        if os.path.exists(keyName(self.output)):
+            os.remove(keyName(self.output))
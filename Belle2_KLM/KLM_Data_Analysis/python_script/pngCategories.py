@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   The one place where the PNGs of a run are sorted into the category directories of the web pages. The
+#   renderer (recurROOTplot.py) reads this manifest and writes each image straight into its category
+#   directory, then writes the per-category index.html in the same pass; pngcategory.py and Hitpngcategory.py
+#   only sort images made by other tools and rewrite the index pages.
+#
+#   PAGES maps a kind of PNG directory to its (category directory, histogram names) pairs:
+#     png      png-e#r#     histograms of bklmHists-e#r#_corrected.root
+#     hitmap   hitmap-e#r#  histograms of bklmHitmap_run#.root
+#   A histogram that is in no category stays at the top of the PNG directory.
+
+import os
+
+klmraw = ["NDigit", "NRawKLM", "RawKLMnodeID"] #["RawKLMnumEvents", "RawKLMnumNodes", "RawKLMnodeID", "rawKLMlaneFlag", "rawKLMtdcExtraRPC", "rawKLMtdcExtraScint"]
+
+#klmrawchannelMultiplicity = ['rawKLM_S00_channelMultiplicity', 'rawKLM_S01_channelMultiplicity', 'rawKLM_S02_channelMultiplicity', 'rawKLM_S03_channelMultiplicity', 'rawKLM_S04_channelMultiplicity', 'rawKLM_S05_channelMultiplicity', 'rawKLM_S06_channelMultiplicity', 'rawKLM_S07_channelMultiplicity', 'rawKLM_S08_channelMultiplicity', 'rawKLM_S09_channelMultiplicity', 'rawKLM_S10_channelMultiplicity', 'rawKLM_S11_channelMultiplicity', 'rawKLM_S12_channelMultiplicity', 'rawKLM_S13_channelMultiplicity', 'rawKLM_S14_channelMultiplicity', 'rawKLM_S15_channelMultiplicity']
+
+mapSectoccu = ["mappedRPCSectorOccupancy","unmappedRPCSectorOccupancy","mappedScintSectorOccupancy","unmappedScintSectorOccupancy"]
+
+#mapChanOccu = ['mappedChannelOccupancy_S00PhiPrompt', 'mappedChannelOccupancy_S00ZPrompt', 'mappedChannelOccupancy_S01PhiPrompt', 'mappedChannelOccupancy_S01ZPrompt', 'mappedChannelOccupancy_S02PhiPrompt', 'mappedChannelOccupancy_S02ZPrompt', 'mappedChannelOccupancy_S03PhiPrompt', 'mappedChannelOccupancy_S03ZPrompt', 'mappedChannelOccupancy_S04PhiPrompt', 'mappedChannelOccupancy_S04ZPrompt', 'mappedChannelOccupancy_S05PhiPrompt', 'mappedChannelOccupancy_S05ZPrompt', 'mappedChannelOccupancy_S06PhiPrompt', 'mappedChannelOccupancy_S06ZPrompt', 'mappedChannelOccupancy_S07PhiPrompt', 'mappedChannelOccupancy_S07ZPrompt', 'mappedChannelOccupancy_S08PhiPrompt', 'mappedChannelOccupancy_S08ZPrompt', 'mappedChannelOccupancy_S09PhiPrompt', 'mappedChannelOccupancy_S09ZPrompt', 'mappedChannelOccupancy_S10PhiPrompt', 'mappedChannelOccupancy_S10ZPrompt', 'mappedChannelOccupancy_S11PhiPrompt', 'mappedChannelOccupancy_S11ZPrompt', 'mappedChannelOccupancy_S12PhiPrompt', 'mappedChannelOccupancy_S12ZPrompt', 'mappedChannelOccupancy_S13PhiPrompt', 'mappedChannelOccupancy_S13ZPrompt', 'mappedChannelOccupancy_S14PhiPrompt', 'mappedChannelOccupancy_S14ZPrompt', 'mappedChannelOccupancy_S15PhiPrompt', 'mappedChannelOccupancy_S15ZPrompt']
+
+RPCTime = ['mappedRPCTime', 'mappedRPCTimeCal', 'mappedRPCTimeBySector'] #['mappedRPCTimeCal2', 'mappedRPCTimeBySector', 'unmappedRPCTime', 'unmappedRPCTimeBySector'] ##'mappedRPCTimeCalBySector', 
+
+#SectorRPCTime = ["mappedRPCTime_S00","mappedRPCTime_S01","mappedRPCTime_S02", "mappedRPCTime_S03", "mappedRPCTime_S04", "mappedRPCTime_S05", "mappedRPCTime_S06", "mappedRPCTime_S07", "mappedRPCTime_S08", "mappedRPCTime_S09", "mappedRPCTime_S10", "mappedRPCTime_S11", "mappedRPCTime_S12", "mappedRPCTime_S13", "mappedRPCTime_S14", "mappedRPCTime_S15"]
+
+ScintCtime = [ 'mappedScintCtime', 'mappedScintCtime0', 'mappedScintCtimeBySector'] #['unmappedScintCtime', 'mappedScintCtimeBySector',  'unmappedScintCtimeBySector'] ##'mappedScintCtime1','mappedScintCtimeCalBySector'
+
+#SectorScintCtime = ["mappedScintCtime_S00","mappedScintCtime_S01","mappedScintCtime_S02", "mappedScintCtime_S03", "mappedScintCtime_S04", "mappedScintCtime_S05", "mappedScintCtime_S06", "mappedScintCtime_S07", "mappedScintCtime_S08", "mappedScintCtime_S09", "mappedScintCtime_S10", "mappedScintCtime_S11", "mappedScintCtime_S12", "mappedScintCtime_S13", "mappedScintCtime_S14", "mappedScintCtime_S15"]
+
+occupancyrpc = ["occupancyBackwardXYPromptBkgd","occupancyForwardXYPromptBkgd"] #[, "occupancyBackwardXYPrompt","occupancyBackwardXYBkgd", "occupancyForwardXYPrompt", "occupancyForwardXYBkgd",]
+
+#HitSectLay = ["SectLayBB", "SectLayPlaneZBB", "SectLayPlanePhiBB", "SectLayBF", "SectLayPlaneZBF", "SectLayPlanePhiBF"]
+
+Hitz = ['PlaneZStripBB0', 'PlaneZStripBB1', 'PlaneZStripBB2', 'PlaneZStripBB3', 'PlaneZStripBB4', 'PlaneZStripBB5', 'PlaneZStripBB6', 'PlaneZStripBB7', 'PlaneZStripBF0', 'PlaneZStripBF1', 'PlaneZStripBF2', 'PlaneZStripBF3', 'PlaneZStripBF4', 'PlaneZStripBF5', 'PlaneZStripBF6', 'PlaneZStripBF7']
+
+HitPhi = ['PlanePhiStripBB0', 'PlanePhiStripBB1', 'PlanePhiStripBB2', 'PlanePhiStripBB3', 'PlanePhiStripBB4', 'PlanePhiStripBB5', 'PlanePhiStripBB6', 'PlanePhiStripBB7', 'PlanePhiStripBF0', 'PlanePhiStripBF1', 'PlanePhiStripBF2', 'PlanePhiStripBF3', 'PlanePhiStripBF4', 'PlanePhiStripBF5', 'PlanePhiStripBF6', 'PlanePhiStripBF7']
+
+#SciCTimeDiff = ['SciCTimeDiffBB0', 'SciCTimeDiffBB1', 'SciCTimeDiffBB2', 'SciCTimeDiffBB3', 'SciCTimeDiffBB4', 'SciCTimeDiffBB5', 'SciCTimeDiffBB6', 'SciCTimeDiffBB7', 'SciCTimeDiffBF0', 'SciCTimeDiffBF1', 'SciCTimeDiffBF2', 'SciCTimeDiffBF3', 'SciCTimeDiffBF4', 'SciCTimeDiffBF5', 'SciCTimeDiffBF6', 'SciCTimeDiffBF7']
+
+#RPCTdc = ['RPCTdcBB0', 'RPCTdcBB1', 'RPCTdcBB2', 'RPCTdcBB3', 'RPCTdcBB4', 'RPCTdcBB5', 'RPCTdcBB6', 'RPCTdcBB7', 'RPCTdcBF0', 'RPCTdcBF1', 'RPCTdcBF2', 'RPCTdcBF3', 'RPCTdcBF4', 'RPCTdcBF5', 'RPCTdcBF6', 'RPCTdcBF7']
+
+#: category directories and their histograms, in page order, for each kind of PNG directory
+PAGES = {'png': [('RawKLMs', klmraw),
+                 ('mappedSectoroccupancy', mapSectoccu),
+                 ('mappedRPCTime', RPCTime),
+                 ('mappedScintCtime', ScintCtime),
+                 ('RPC_occupancy', occupancyrpc)],
+         'hitmap': [('Planez', Hitz),
+                    ('PlanePhi', HitPhi)]}
+
+
+def categories(kind):
+    """Return the category directory names of a kind of PNG directory, in page order
+
+    Arguments:
+        kind (str): 'png' or 'hitmap'
+    """
+    return [category for category, names in PAGES[kind]]
+
+
+def categoryOf(kind, name):
+    """Return the category directory of a histogram ('' if it is in no category)
+
+    Arguments:
+        kind (str): 'png' or 'hitmap'
+        name (str): histogram (key) name
+    """
+    for category, names in PAGES[kind]:
+        if name in names:
+            return category
+    return ''
+
+
+def imageName(pngdir, kind, name):
+    """Return the path name of the PNG of a histogram in a PNG directory
+
+    Arguments:
+        pngdir (str): PNG directory
+        kind (str): 'png' or 'hitmap'
+        name (str): histogram (key) name
+    """
+    return os.path.join(pngdir, categoryOf(kind, name), name + '.png')
+
+
+def arrange(pngdir, kind):
+    """Move the PNGs at the top of a PNG directory into their category directories; return the number moved
+
+    This is only needed for images that were not written by recurROOTplot.py.
+
+    Arguments:
+        pngdir (str): PNG directory
+        kind (str): 'png' or 'hitmap'
+    """
+    moved = 0
+    for category, names in PAGES[kind]:
+        os.makedirs(os.path.join(pngdir, category), exist_ok=True)
+        for name in names:
+            fileName = os.path.join(pngdir, name + '.png')
+            if os.path.exists(fileName):
+                os.replace(fileName, os.path.join(pngdir, category, name + '.png'))
+                moved += 1
+    return moved
+
+
+def writehtml():
+    header = r'''<!DOCTYPE html>
+    <html>
+    <head>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+    body {font-family: Arial, Helvetica, sans-serif;}
+
+    #myImg {
+    border-radius: 5px;
+    cursor: pointer;
+    transition: 0.3s;
+    }
+
+    #myImg:hover {opacity: 0.7;}
+
+    /* The Modal (background) */
+    .modal {
+    display: none; /* Hidden by default */
+    position: fixed; /* Stay in place */
+    z-index: 1; /* Sit on top */
+    padding-top: 100px; /* Location of the box */
+    left: 0;
+    top: 0;
+    width: 100%; /* Full width */
+    height: 100%; /* Full height */
+    overflow: auto; /* Enable scroll if needed */
+    background-color: rgb(0,0,0); /* Fallback color */
+    background-color: rgba(0,0,0,0.9); /* Black w/ opacity */
+    }
+
+    /* Modal Content (image) */
+    .modal-content {
+    margin: auto;
+    display: block;
+    width: 80%;
+    max-width: 700px;
+    }
+
+    /* Caption of Modal Image */
+    #caption {
+    margin: auto;
+    display: block;
+    width: 80%;
+    max-width: 700px;
+    text-align: center;
+    color: #ccc;
+    padding: 10px 0;
+    height: 150px;
+    }
+
+    /* Add Animation */
+    .modal-content, #caption {
+    -webkit-animation-name: zoom;
+    -webkit-animation-duration: 0.6s;
+    animation-name: zoom;
+    animation-duration: 0.6s;
+    }
+
+    @-webkit-keyframes zoom {
+    from {-webkit-transform:scale(0)}
+    to {-webkit-transform:scale(1)}
+    }
+
+    @keyframes zoom {
+    from {transform:scale(0)}
+    to {transform:scale(1)}
+    }
+
+    /* The Close Button */
+    .close {
+    position: absolute;
+    top: 15px;
+    right: 35px;
+    color: #f1f1f1;
+    font-size: 40px;
+    font-weight: bold;
+    transition: 0.3s;
+    }
+
+    .close:hover,
+    .close:focus {
+    color: #bbb;
+    text-decoration: none;
+    cursor: pointer;
+    }
+
+    /* 100% Image Width on Smaller Screens */
+    @media only screen and (max-width: 700px){
+    .modal-content {
+    width: 100%;
+    }
+}
+    </style>
+    </head>
+    <body>
+'''
+    footer = r'''<!-- The Modal -->
+    <div id="myModal" class="modal">
+    <span class="close">&times;</span>
+    <img class="modal-content" id="img01">
+    <div id="caption"></div>
+    </div>
+
+    <script>
+    // Get the modal
+    var modal = document.getElementById("myModal");
+
+    // Get the image and insert it inside the modal - use its "alt" text as a caption
+    var img = document.getElementById("myImg");
+    var modalImg = document.getElementById("img01");
+    var captionText = document.getElementById("caption");
+
+    // Get the <span> element that closes the modal
+    var span = document.getElementsByClassName("close")[0];
+
+    // When the user clicks on <span> (x), close the modal
+    span.onclick = function() {
+    modal.style.display = "none";
+    }
+    // add the class 'imageToPopup' to all img elements you want to trigger the popup modal
+    var imgArray = document.getElementsByClassName('imageToPopup');
+
+    // Here we loop through ther array of img elements selected by class name and add an onclick event listener to each.
+    for(var i = 0; i<imgArray.length; i++){
+        imgArray[i].onclick = function(){
+             modal.style.display = "block";
+             modalImg.src = this.src;
+             captionText.innerHTML = this.alt;
+    }
+}
+    </script>
+
+    </body>
+    </html>
+'''
+    return header, footer
+
+
+def writeIndex(pngdir, kind):
+    """Write the index.html of every category directory of a PNG directory
+
+    Arguments:
+        pngdir (str): PNG directory
+        kind (str): 'png' or 'hitmap'
+    """
+    header, footer = writehtml()
+    for category, names in PAGES[kind]:
+        os.makedirs(os.path.join(pngdir, category), exist_ok=True)
+        Namehtml = ''
+        for j in names:
+            Namehtml += "<img class='imageToPopup' src='"+j+".png' width='25%'></img>"
+        tmpName = os.path.join(pngdir, category, '.index.html')
+        with open(tmpName, 'w') as filehtml:
+            filehtml.write(header + Namehtml + footer)
+        os.replace(tmpName, os.path.join(pngdir, category, 'index.html'))
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Find the runs whose outputs are incomplete and rerun only the stages that are needed, instead of listing
+#   the missing _corrected.root files with notrunning.py and pasting the run numbers into notrunning, hitmap
+#   or RUNAGAIN lists by hand. The expected outputs of every stage of every run come from klmPipeline.addRun();
+#   each stage is classified as
+#
+#     ok        all outputs exist, are readable and are newer than the outputs of the stages they depend on
+#     missing   no output exists
+#     partial   some outputs are missing, a PNG directory is empty, a temporary file (*.tmp.root) of an
+#               interrupted write is left over, or a ROOT file was not closed properly (recovered by ROOT)
+#     corrupt   a ROOT output cannot be opened or holds no objects
+#     stale     an output is older than an output of a stage it depends on
+#
+#   The per-HLT stages (bklm, eklm, hitmap) are only rerun when their merged output has to be rebuilt, as
+#   their partial files are usually removed after the merge. A stage that has to be rerun also reruns the
+#   stages that depend on it. The needed stages are then run on the local scheduler (klmPipeline.Pipeline).
+#
+#   Both the checks (one worker process per run) and the reruns use a bounded number of worker processes,
+#   so the shared filesystem is not flooded with stat() calls and ROOT file opens.
+#
+# Prerequisite (on kekcc): type
+#   source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
+#   (without ROOT the ROOT files are not opened and cannot be classified as corrupt)
+#
+# Usage:
+#   python3 reconcile.py -e # [-r #[,#...]] [-l runlist] [-s stages] [-d date] [-c #] [-j #] [-o runlist] [-n]
+#   Arguments:
+#      -e #        experiment number (default is 8)
+#      -r list     comma-separated run numbers (default is every r##### directory in bklmroots)
+#      -l file     text file with one run number (or r#####) per line, instead of or in addition to -r
+#      -s list     comma-separated stage kinds to reconcile (default is all)
+#      -d date     date tag of the bklmEfficiency_day<date>_HLTn.root output of the hitmap jobs (default is today)
+#      -c #        number of worker processes that check the outputs (default is 4)
+#      -j #        number of worker processes that rerun the stages (default is 4)
+#      -o file     write the run numbers with needed stages to this file, one per line (klmPipeline.py -l)
+#      -n          report and print the commands of the needed stages without running them
+
+import os
+import sys
+import glob
+import concurrent.futures
+from optparse import OptionParser
+import klmPipeline
+import outputCache
+
+#: classifications of a stage, from best to worst
+STATES = ['ok', 'stale', 'partial', 'missing', 'corrupt']
+#: stage kinds whose outputs are intermediate partial files, only rerun for a merge that is rerun
+PARTIAL_KINDS = ['bklm', 'eklm', 'hitmap']
+
+
+def rootState(fileName):
+    """Return 'ok', 'partial' (recovered, i.e. not closed properly) or 'corrupt' for a ROOT file
+
+    Arguments:
+        fileName (str): path name of the ROOT file
+    """
+    try:
+        import ROOT
+    except ImportError:
+        return 'ok'
+    ROOT.gErrorIgnoreLevel = ROOT.kFatal
+    rootFile = ROOT.TFile.Open(fileName)
+    if not rootFile or rootFile.IsZombie():
+        return 'corrupt'
+    if rootFile.TestBit(ROOT.TFile.kRecovered):
+        state = 'partial'
+    elif rootFile.GetNkeys() == 0:
+        state = 'corrupt'
+    else:
+        state = 'ok'
+    rootFile.Close()
+    return state
+
+
+def outputState(fileName, newestInput):
+    """Return (classification, reason) of one output file or directory
+
+    Arguments:
+        fileName (str): path name of the output
+        newestInput (float): newest mtime of the outputs of the stages it depends on (0 if none)
+    """
+    if os.path.exists(fileName + '.tmp.root'):
+        return 'partial', 'interrupted write of {0}'.format(fileName)
+    if not os.path.exists(fileName):
+        return 'missing', '{0} does not exist'.format(fileName)
+    if os.path.isdir(fileName):
+        if len(os.listdir(fileName)) == 0:
+            return 'partial', '{0} is empty'.format(fileName)
+    elif fileName.endswith('.root'):
+        state = rootState(fileName)
+        if state != 'ok':
+            return state, '{0} is {1}'.format(fileName, 'unreadable' if state == 'corrupt' else 'truncated')
+    elif os.path.getsize(fileName) == 0:
+        return 'corrupt', '{0} is empty'.format(fileName)
+    # a PNG directory redrawn in place keeps its mtime; its outputCache key is rewritten instead
+    mtime = os.path.getmtime(fileName)
+    if os.path.exists(outputCache.keyName(fileName)):
+        mtime = max(mtime, os.path.getmtime(outputCache.keyName(fileName)))
+    if mtime < newestInput:
+        return 'stale', '{0} is older than its inputs'.format(fileName)
+    return 'ok', ''
+
+
+def checkRun(stages):
+    """Classify the stages of one run in a worker process; return a list of (stage name, classification, reason)
+
+    Arguments:
+        stages (list): (stage name, outputs, outputs of the stages it depends on) triplets, in dependency order
+    """
+    results = []
+    for name, outputs, inputs in stages:
+        if len(outputs) == 0:
+            results.append((name, 'ok', ''))
+            continue
+        mtimes = [os.path.getmtime(fileName) for fileName in inputs if os.path.exists(fileName)]
+        newestInput = max(mtimes) if mtimes else 0.0
+        states = [outputState(fileName, newestInput) for fileName in outputs]
+        missing = [s for s in states if s[0] == 'missing']
+        if 0 < len(missing) < len(states):
+            results.append((name, 'partial', '{0} of {1} outputs missing'.format(len(missing), len(states))))
+            continue
+        state, reason = max(states, key=lambda s: STATES.index(s[0]))
+        results.append((name, state, reason))
+    return results
+
+
+def findRuns(exp, rootLocation=klmPipeline.ROOT_LOCATION):
+    """Return the run numbers (ints) of the r##### directories of an experiment's output directory
+
+    Arguments:
+        exp (int): experiment number
+        rootLocation (str): output directory, formatted with the 4-digit experiment number
+    """
+    runs = []
+    for runDir in sorted(glob.glob(os.path.join(rootLocation.format('{0:04d}'.format(int(exp))), 'r*'))):
+        name = os.path.basename(runDir)
+        if os.path.isdir(runDir) and name[1:].isdecimal():
+            runs.append(int(name[1:]))
+    return runs
+
+
+def neededStages(pipeline, states):
+    """Return the names of the stages that have to be rerun
+
+    A final stage is needed if it is not ok; a per-HLT stage only if a stage that depends on it is needed.
+    A needed stage makes its dependents needed, and the dependencies that are not ok needed too.
+
+    Arguments:
+        pipeline (klmPipeline.Pipeline): pipeline with the stages of all runs
+        states (dict): stage name -> classification
+    """
+    dependents = {}
+    for stage in pipeline.stages.values():
+        for dep in stage.deps:
+            dependents.setdefault(dep, []).append(stage.name)
+    needed = set(name for name, stage in pipeline.stages.items()
+                 if states[name] != 'ok' and stage.kind not in PARTIAL_KINDS)
+    queue = list(needed)
+    while queue:
+        name = queue.pop()
+        neighbours = dependents.get(name, []) + \
+            [dep for dep in pipeline.stages[name].deps if dep in pipeline.stages and states[dep] != 'ok']
+        for other in neighbours:
+            if other not in needed:
+                needed.add(other)
+                queue.append(other)
+    return needed
+
+
+def reconcile(exp, runs, kinds=None, date=None, checkers=4, workers=4, dryRun=False, runListName='',
+              rootLocation=klmPipeline.ROOT_LOCATION):
+    """Classify the stages of the runs, print a report and rerun the needed stages; return the stage states
+
+    Arguments:
+        exp (int): experiment number
+        runs (list): run numbers
+        kinds (list): stage kinds to reconcile [all]
+        date (str): date tag of the bklmEfficiency_day<date>_HLTn.root output of the hitmap jobs [today]
+        checkers (int): number of worker processes that check the outputs
+        workers (int): number of worker processes that rerun the stages
+        dryRun (bool): print the commands of the needed stages instead of running them
+        runListName (str): file that receives the run numbers with needed stages ['' for none]
+        rootLocation (str): output directory, formatted with the 4-digit experiment number
+    """
+    pipeline = klmPipeline.Pipeline()
+    checks = []
+    for run in runs:
+        stages = klmPipeline.addRun(pipeline, exp, run, kinds, rootLocation=rootLocation, date=date)
+        checks.append([(stage.name, stage.outputs,
+                        [fileName for dep in stage.deps if dep in pipeline.stages
+                         for fileName in pipeline.stages[dep].outputs]) for stage in stages])
+    states = {}
+    reasons = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=checkers) as pool:
+        for results in pool.map(checkRun, checks):
+            for name, state, reason in results:
+                states[name] = state
+                reasons[name] = reason
+    needed = neededStages(pipeline, states)
+    counts = {}
+    for name in sorted(needed):
+        counts[states[name]] = counts.get(states[name], 0) + 1
+        print('reconcile: {0:8s} {1}{2}'.format(states[name], name, ' (' + reasons[name] + ')' if reasons[name] else ''))
+    neededRuns = sorted(set(int(name.split('/')[0][1:]) for name in needed))
+    print('reconcile: {0} of {1} stages of {2} runs needed ({3}) in {4} runs'.format(
+        len(needed), len(states), len(runs),
+        ', '.join('{0} {1}'.format(counts[s], s) for s in STATES if s in counts) or 'none', len(neededRuns)))
+    if runListName != '':
+        with open(runListName, 'w') as f:
+            for run in neededRuns:
+                f.write('{0}\n'.format(run))
+    rerun = klmPipeline.Pipeline()
+    for name, stage in pipeline.stages.items():
+        if name in needed:
+            rerun.add(stage)
+    return rerun.run(workers, dryRun)
+
+
+parser = OptionParser()
+parser.add_option('-e', '--experiment', dest='eNumber', default='8',
+                  help='Experiment number [8]')
+parser.add_option('-r', '--runs', dest='runs', default='',
+                  help='Comma-separated run numbers [every run directory in bklmroots]')
+parser.add_option('-l', '--runlist', dest='runlist', default='',
+                  help='Text file with one run number per line [no default]')
+parser.add_option('-s', '--stages', dest='stages', default='',
+                  help='Comma-separated stage kinds to reconcile [all]')
+parser.add_option('-d', '--date', dest='date', default='',
+                  help='Date tag of the bklmEfficiency output of the hitmap jobs [today]')
+parser.add_option('-c', '--checkers', dest='checkers', default='4',
+                  help='Number of worker processes that check the outputs [4]')
+parser.add_option('-j', '--jobs', dest='jobs', default='4',
+                  help='Number of worker processes that rerun the stages [4]')
+parser.add_option('-o', '--output', dest='output', default='',
+                  help='File that receives the run numbers with needed stages [none]')
+parser.add_option('-n', '--dry-run', dest='dryRun', action='store_true', default=False,
+                  help='Print the commands of the needed stages without running them')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    exp = int(options.eNumber)
+    runs = [int(r.lstrip('r')) for r in options.runs.split(',') if r != '']
+    if options.runlist != '':
+        runs += klmPipeline.readRunList(options.runlist)
+    if len(runs) == 0:
+        runs = findRuns(exp)
+    if len(runs) == 0:
+        print("No runs found for experiment {0}".format(exp))
+        sys.exit(1)
+    state = reconcile(exp, runs, klmPipeline.parseKinds(options.stages), options.date if options.date != '' else None,
+                      max(1, int(options.checkers)), max(1, int(options.jobs)), options.dryRun, options.output)
+    sys.exit(0 if all(s == 'done' for s in state.values()) else 1)
@@ -2,30 +2,202 @@ import ROOT
 from ROOT import Belle2, TH1, TH2, TCanvas, THistPainter, TPad, gROOT, gStyle, TFile  
 import os
 import sys
-import shutil
+import glob
+import json
+import hashlib
+import numpy
+import concurrent.futures
 from optparse import Option, OptionValueError, OptionParser
+import outputCache
+import pngCategories
 
 Box = ["RawKLMnodeID","rawKLMlaneFlag","rawKLMtdcExtraRPC","rawKLMadcExtraRPC","rawKLMtdcExtraScint","rawKLMadcExtraScint","rawKLMsizeMultihit","rawKLM_S00_channelMultiplicity","rawKLM_S00_channelMultiplicityFine","rawKLM_S01_channelMultiplicity","rawKLM_S01_channelMultiplicityFine","rawKLM_S02_channelMultiplicity","rawKLM_S02_channelMultiplicityFine","rawKLM_S03_channelMultiplicity","rawKLM_S03_channelMultiplicityFine","rawKLM_S04_channelMultiplicity","rawKLM_S04_channelMultiplicityFine","rawKLM_S05_channelMultiplicity","rawKLM_S05_channelMultiplicityFine","rawKLM_S06_channelMultiplicity","rawKLM_S06_channelMultiplicityFine","rawKLM_S07_channelMultiplicity","rawKLM_S07_channelMultiplicityFine","rawKLM_S08_channelMultiplicity","rawKLM_S08_channelMultiplicityFine","rawKLM_S09_channelMultiplicity","rawKLM_S09_channelMultiplicityFine","rawKLM_S10_channelMultiplicity","rawKLM_S10_channelMultiplicityFine","rawKLM_S11_channelMultiplicity","rawKLM_S11_channelMultiplicityFine","rawKLM_S12_channelMultiplicity","rawKLM_S12_channelMultiplicityFine","rawKLM_S13_channelMultiplicity","rawKLM_S13_channelMultiplicityFine","rawKLM_S14_channelMultiplicity","rawKLM_S14_channelMultiplicityFine","rawKLM_S15_channelMultiplicity","rawKLM_S15_channelMultiplicityFine","mappedRPCCtimeRangeBySector","mappedScintCtimeRangeBySector"]
 
 #Colz = ["",]
 
-def recurPlot(tree):
-    pathname=os.path.join(*path)
-    #if not os.path.exists(pathname):
-    shutil.rmtree(pathname)
-    os.mkdir(pathname)
-    for key in tree.GetListOfKeys():
-        thisObject=tree.Get(key.GetName())
+#: batch-mode canvas of a worker process (one per process, created by _initWorker)
+canvas = None
+#: manifest of the PNG directory: content hash of the histogram behind every PNG
+MANIFEST = '.manifest.json'
+#: element type of the bin-content array of a histogram, by the TArray class it inherits from
+CELL_TYPES = [('TArrayD', numpy.float64), ('TArrayF', numpy.float32), ('TArrayI', numpy.int32),
+              ('TArrayS', numpy.int16), ('TArrayC', numpy.int8)]
+
+
+def drawOption(thisObject, name):
+    """Return the draw option of a histogram: box for the 2D histograms in Box, colz for the other 2D ones
+
+    Arguments:
+        thisObject (ROOT.TH1): the histogram
+        name (str): its key name
+    """
+    if isinstance(thisObject, TH2):
+        return "box" if name in Box else "colz"
+    return ""
+
+
+def _initWorker():
+    """Set up batch mode, the style and the canvas of a rendering process"""
+    global canvas
+    gROOT.SetBatch()
+    gStyle.SetOptStat(10)
+    canvas = TCanvas()
+
+
+def histHash(thisObject, option):
+    """Return the content hash of a histogram as drawn: bin contents and errors, axes, titles and draw option
+
+    Arguments:
+        thisObject (ROOT.TH1): the histogram
+        option (str): its draw option
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((thisObject.ClassName(), thisObject.GetTitle(), option, thisObject.GetEntries(),
+                        thisObject.GetMinimumStored(), thisObject.GetMaximumStored())).encode())
+    for axis in (thisObject.GetXaxis(), thisObject.GetYaxis(), thisObject.GetZaxis()):
+        digest.update(repr((axis.GetTitle(), axis.GetNbins(), axis.GetXmin(), axis.GetXmax(),
+                            [axis.GetBinLowEdge(i) for i in range(1, axis.GetNbins() + 1)] if axis.IsVariableBinSize() else [],
+                            [axis.GetBinLabel(i) for i in range(1, axis.GetNbins() + 1)] if axis.GetLabels() else [],
+                            axis.GetFirst(), axis.GetLast())).encode())
+    # hash the bin-content and sum-of-weights-squared arrays as a whole instead of calling ROOT once per cell
+    cellType = next((dtype for arrayClass, dtype in CELL_TYPES if thisObject.InheritsFrom(arrayClass)), None)
+    if cellType is None:
+        for cell in range(0, thisObject.GetNcells()):
+            digest.update(repr((thisObject.GetBinContent(cell), thisObject.GetBinError(cell))).encode())
+    else:
+        digest.update(numpy.frombuffer(thisObject.GetArray(), dtype=cellType, count=thisObject.GetNcells()).tobytes())
+        if thisObject.GetSumw2N() > 0:
+            digest.update(numpy.frombuffer(thisObject.GetSumw2().GetArray(), dtype=numpy.float64,
+                                           count=thisObject.GetSumw2N()).tobytes())
+        if thisObject.InheritsFrom('TProfile'):  # fArray holds the sums, the drawn means also need the entries
+            digest.update(repr([thisObject.GetBinEntries(cell) for cell in range(0, thisObject.GetNcells())]).encode())
+    return digest.hexdigest()
+
+
+def findImage(pathname, name):
+    """Return the path names of the PNG of a histogram in the PNG directory or in its category directories
+
+    Arguments:
+        pathname (str): PNG directory
+        name (str): key name of the histogram
+    """
+    return glob.glob(os.path.join(pathname, name + ".png")) + glob.glob(os.path.join(pathname, "*", name + ".png"))
+
+
+def readManifest(pathname):
+    """Return the manifest of a PNG directory: {'renderer': digest, 'hists': {key name: content hash}}
+
+    Arguments:
+        pathname (str): PNG directory
+    """
+    try:
+        with open(os.path.join(pathname, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'renderer': '', 'hists': {}}
+
+
+def writeManifest(pathname, manifest):
+    """Write the manifest of a PNG directory (via a temporary file)
+
+    Arguments:
+        pathname (str): PNG directory
+        manifest (dict): {'renderer': digest, 'hists': {key name: content hash}}
+    """
+    tmpName = os.path.join(pathname, MANIFEST + '.tmp')
+    with open(tmpName, 'w') as f:
+        json.dump(manifest, f, indent=0, sort_keys=True)
+    os.replace(tmpName, os.path.join(pathname, MANIFEST))
+
+
+def renderKeys(job):
+    """Draw the changed histograms of a file into PNGs in a worker process; return (# written, {name: hash})
+
+    A histogram is only drawn if its content hash differs from the one in the manifest or its PNG is gone.
+    Each PNG is saved under a hidden temporary name and renamed, so the web pages never show half-written
+    images.
+
+    Arguments:
+        job (tuple): (inputName, pathname, kind, names, known) = ROOT file, PNG directory, its kind in
+                     pngCategories.PAGES, key names to draw, {name: content hash} of the PNGs that exist
+    """
+    inputName, pathname, kind, names, known = job
+    if canvas is None:
+        _initWorker()
+    infile = TFile.Open(inputName)
+    written = 0
+    hashes = {}
+    for name in names:
+        thisObject = infile.Get(name)
+        if not thisObject or not isinstance(thisObject, TH1):
+            continue
+        option = drawOption(thisObject, name)
+        hashes[name] = histHash(thisObject, option)
+        imageName = pngCategories.imageName(pathname, kind, name)
+        if known.get(name) == hashes[name] and os.path.exists(imageName):
+            continue
         thisObject.GetYaxis().SetTitleOffset(1)
-        if isinstance(thisObject,TH2):
-            if key.GetName() in Box:
-                thisObject.Draw("box")
-            else:
-                thisObject.Draw("colz")
-        elif isinstance(thisObject, TH1):
-            thisObject.Draw()
-        c.SaveAs(os.path.join(pathname,key.GetName()+".png"))
-    
+        canvas.cd()
+        thisObject.Draw(option)
+        tmpName = os.path.join(os.path.dirname(imageName), "." + name + ".png")
+        canvas.SaveAs(tmpName)
+        for oldName in findImage(pathname, name):
+            if oldName != imageName:
+                os.remove(oldName)
+        os.replace(tmpName, imageName)
+        written += 1
+    infile.Close()
+    return written, hashes
+
+
+def recurPlot(inputName, pathname, workers=None, force=False, kind='png'):
+    """Draw the changed histograms of a ROOT file into their category directories on a pool of worker processes
+
+    Every PNG is written straight into the category directory given by pngCategories.py (or at the top of the
+    PNG directory if the histogram is in no category), and the index.html of every category is written at
+    the end of the pass.
+
+    The manifest of the PNG directory keeps the content hash of every drawn histogram, so only new or changed
+    histograms are drawn again; the PNGs of histograms that are no longer in the file are removed. The keys
+    are dealt round-robin into several batches per worker, so a worker that got the slow 2D histograms does
+    not hold up the others; each worker opens the file once per batch. Return the number of PNGs drawn.
+
+    Arguments:
+        inputName (str): path name of the ROOT file
+        pathname (str): PNG directory (created if needed)
+        workers (int): number of worker processes [number of CPUs]
+        force (bool): draw every histogram, ignoring the manifest
+        kind (str): kind of the PNG directory in pngCategories.PAGES ['png']
+    """
+    for category in [''] + pngCategories.categories(kind):
+        os.makedirs(os.path.join(pathname, category), exist_ok=True)
+    manifest = readManifest(pathname)
+    # the manifest is void if the drawing code or the categories changed
+    renderer = outputCache.fileDigest(os.path.abspath(__file__)) + outputCache.fileDigest(pngCategories.__file__)
+    known = manifest['hists'] if manifest['renderer'] == renderer and not force else {}
+    infile = TFile.Open(inputName)
+    names = []
+    for key in infile.GetListOfKeys():
+        if key.GetName() not in names:
+            names.append(key.GetName())
+    infile.Close()
+    nBatches = max(1, min(len(names), 4 * (workers or os.cpu_count() or 1)))
+    jobs = [(inputName, pathname, kind, names[i::nBatches],
+             {name: known[name] for name in names[i::nBatches] if name in known}) for i in range(0, nBatches)]
+    written = 0
+    hashes = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_initWorker) as pool:
+        for batchWritten, batchHashes in pool.map(renderKeys, jobs):
+            written += batchWritten
+            hashes.update(batchHashes)
+    for name in manifest['hists']:
+        if name not in hashes:
+            for oldName in findImage(pathname, name):
+                os.remove(oldName)
+    writeManifest(pathname, {'renderer': renderer, 'hists': hashes})
+    pngCategories.writeIndex(pathname, kind)
+    return written
+
 def makehtml(pngdir,indexfile):
     ListOfPng = os.listdir(pngdir)
     Namehtml = open(indexfile,'w')
@@ -46,25 +218,30 @@ parser.add_option('-e', '--experiment', dest='eNumber',
 parser.add_option('-r', '--run', dest='rNumber',
                   default='0133',
                   help='Run number [default=0604]')
-(options, args) = parser.parse_args()
-exp = '{0:04d}'.format(int(options.eNumber))
-run = '{0:05d}'.format(int(options.rNumber))
-runhit = '{0:04d}'.format(int(options.rNumber))
-
-inputName = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/bklmHists-e{0}r{1}_corrected.root'.format(exp, run)
-#inputName = 'bklmHists-e{0}r{1}_corrected.root'.format(exp, run)
-#outputpng = './png-e{0}r{1}'.format(exp, run)
-outputpng = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/png-e{0}r{1}'.format(exp, run)
-#htmlindex = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/png-e{0}r{1}/index.html'.format(exp, run)
-
-
-gROOT.SetBatch()
-gStyle.SetOptStat(10)
-infile1 = TFile(inputName)
-#infile2 = TFile(inputhitName)
-c=TCanvas()
-path=[outputpng]
-recurPlot(infile1)
-###recurPlot(infile2)
-##makehtml(outputpng,htmlindex)
+parser.add_option('-f', '--force', dest='force', action='store_true', default=False,
+                  help='Redraw the PNGs even if the histogram file is unchanged')
+parser.add_option('-j', '--jobs', dest='jobs', default='0',
+                  help='Number of rendering processes [number of CPUs]')
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    exp = '{0:04d}'.format(int(options.eNumber))
+    run = '{0:05d}'.format(int(options.rNumber))
+    runhit = '{0:04d}'.format(int(options.rNumber))
+
+    inputName = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/bklmHists-e{0}r{1}_corrected.root'.format(exp, run)
+    #inputName = 'bklmHists-e{0}r{1}_corrected.root'.format(exp, run)
+    #outputpng = './png-e{0}r{1}'.format(exp, run)
+    outputpng = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/png-e{0}r{1}'.format(exp, run)
+    #htmlindex = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/e{0}/bklmroots/r{1}/png-e{0}r{1}/index.html'.format(exp, run)
+
+    cache = outputCache.OutputCache(outputpng, inputs=[inputName], scripts=[__file__, pngCategories.__file__],
+                                    config={'Box': Box, 'pages': pngCategories.PAGES['png']})
+    if cache.fresh() and not options.force:
+        print(outputpng, 'is up to date')
+        sys.exit(0)
 
+    jobs = int(options.jobs)
+    print(recurPlot(inputName, outputpng, jobs if jobs > 0 else None, options.force), 'PNGs written to', outputpng)
+    cache.record()
+    ##makehtml(outputpng,htmlindex)
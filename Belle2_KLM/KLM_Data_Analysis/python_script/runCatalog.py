@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Purpose:
+#   Persistent catalog (SQLite) of the runs of each experiment: the HLT files of every run with their sizes,
+#   mtimes and event counts, and the processing state of every pipeline stage. Selecting runs by date range,
+#   by minimum number of events or by a stage whose output is missing is an indexed query on the catalog
+#   instead of a find/os.listdir walk over the shared filesystem.
+#
+#   The catalog is updated incrementally from the directory mtimes: the experiment directory is only listed
+#   when its mtime has changed (i.e. runs were added), a run's sub00 directory is only rescanned when its
+#   mtime has changed, and only new or modified HLT files are opened to count their events. A run whose
+#   newest file is less than SETTLE seconds old is rescanned at the next update, as its files may still grow.
+#   updateOutputs() does the same for the run directories of bklmroots and records which stage outputs
+#   exist; klmPipeline.runAll() records the state of every stage it runs.
+#
+# Prerequisite (on kekcc): type
+#   source /cvmfs/belle.cern.ch/tools/b2setup release-02-01-00
+#   (ROOT is only needed to count the events of new files; without it the event counts stay unknown)
+#
+# Usage:
+#   python3 runCatalog.py -e # [-f from] [-t to] [-m #] [-x stage] [-q] [-c catalog]
+#   Arguments:
+#      -e #        experiment number (default is 8)
+#      -f date     select runs whose first HLT file is not older than this date, e.g. '21 Jun 2019' or 2019-06-21
+#      -t date     select runs whose first HLT file is older than this date
+#      -m #        select runs with at least this many events (default is 0)
+#      -x stage    select runs without a successful stage of this name, e.g. png or mergeBKLM
+#      -q          query only, do not update the catalog from the filesystem first
+#      -c file     catalog file (default is CATALOG)
+#   The selected run numbers are printed one per line.
+
+import os
+import time
+import datetime
+import sqlite3
+from optparse import OptionParser
+import klmPipeline
+
+#: default catalog file
+CATALOG = '/ghi/fs01/belle2/bdata/group/detector/BKLM/Run_Analysis/klmRunCatalog.sqlite'
+#: age (seconds) below which a file may still be written, so that its directory is rescanned at the next update
+SETTLE = 3600
+#: stage kinds whose outputs updateOutputs() looks for in the run directories
+OUTPUT_KINDS = ['mergeBKLM', 'mergeEKLM', 'mergeHitmap', 'combine', 'png']
+
+#: tables and indexes of the catalog
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, mtime REAL);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, exp INTEGER, run INTEGER, hlt TEXT,
+                                  size INTEGER, mtime REAL, nEvents INTEGER);
+CREATE INDEX IF NOT EXISTS filesByRun ON files (exp, run);
+CREATE TABLE IF NOT EXISTS runs (exp INTEGER, run INTEGER, nFiles INTEGER, size INTEGER,
+                                 startTime REAL, endTime REAL, nEvents INTEGER, PRIMARY KEY (exp, run));
+CREATE INDEX IF NOT EXISTS runsByTime ON runs (exp, startTime);
+CREATE INDEX IF NOT EXISTS runsByEvents ON runs (exp, nEvents);
+CREATE TABLE IF NOT EXISTS stages (exp INTEGER, run INTEGER, stage TEXT, state TEXT, updated REAL,
+                                   PRIMARY KEY (exp, run, stage));
+CREATE INDEX IF NOT EXISTS stagesByState ON stages (exp, stage, state);
+'''
+
+
+def countEntries(fileName, treeName='tree'):
+    """Return the number of entries of the event tree in a ROOT file, or None if ROOT or the tree is unavailable
+
+    Arguments:
+        fileName (str): path name of the ROOT file
+        treeName (str): name of the event tree
+    """
+    try:
+        import ROOT
+    except ImportError:
+        return None
+    rootFile = ROOT.TFile.Open(fileName)
+    if not rootFile or rootFile.IsZombie():
+        return None
+    tree = rootFile.Get(treeName)
+    count = int(tree.GetEntries()) if tree else None
+    rootFile.Close()
+    return count
+
+
+def parseDate(text):
+    """Return the POSIX time of a date such as '21 Jun 2019', '21 Jun' (this year) or '2019-06-21'
+
+    Arguments:
+        text (str): the date
+    """
+    text = text.strip()
+    for fmt in ('%d %b %Y', '%Y-%m-%d', '%d %B %Y', '%d %b', '%d %B'):
+        try:
+            date = datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if '%Y' not in fmt:
+            date = date.replace(year=datetime.date.today().year)
+        return time.mktime(date.timetuple())
+    raise ValueError('unknown date format: {0}'.format(text))
+
+
+class RunCatalog:
+    """SQLite catalog of the runs, their HLT files and the state of their processing stages"""
+
+    def __init__(self, fileName=CATALOG):
+        """Constructor: open (and if needed create) the catalog
+
+        Arguments:
+            fileName (str): path name of the catalog file
+        """
+        #: path name of the catalog file
+        self.fileName = fileName
+        #: database connection
+        self.db = sqlite3.connect(fileName, timeout=60)
+        self.db.executescript(SCHEMA)
+
+    def commit(self):
+        """Write the pending changes to the catalog file"""
+        self.db.commit()
+
+    def close(self):
+        """Commit and close the catalog"""
+        self.db.commit()
+        self.db.close()
+
+    def _changed(self, path):
+        """Return the mtime of a directory if it differs from the recorded one, else None (also if it is missing)"""
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        row = self.db.execute('SELECT mtime FROM directories WHERE path = ?', (path,)).fetchone()
+        return None if (row is not None and row[0] == mtime) else mtime
+
+    def _stamp(self, path, mtime):
+        """Record the mtime of a directory whose contents are now in the catalog"""
+        self.db.execute('INSERT OR REPLACE INTO directories (path, mtime) VALUES (?, ?)', (path, mtime))
+
+    def update(self, exp, rawLocation=klmPipeline.RAW_LOCATION, countEvents=True):
+        """Bring the runs of one experiment up to date with the raw-data directory; return the updated run numbers
+
+        Arguments:
+            exp (int): experiment number
+            rawLocation (str): raw-data directory, formatted with the 4-digit experiment number
+            countEvents (bool): open new or modified HLT files to count their events
+        """
+        exp = int(exp)
+        expDir = rawLocation.format('{0:04d}'.format(exp))
+        runs = set(run for (run,) in self.db.execute('SELECT run FROM runs WHERE exp = ?', (exp,)))
+        expMtime = self._changed(expDir)
+        if expMtime is not None:
+            for name in os.listdir(expDir):
+                if name.startswith('r') and name[1:].isdecimal():
+                    runs.add(int(name[1:]))
+                    # an empty row keeps a run whose sub00 does not exist yet in the loop of later updates
+                    self.db.execute('INSERT OR IGNORE INTO runs (exp, run, nFiles, size) VALUES (?, ?, 0, 0)',
+                                    (exp, int(name[1:])))
+        updated = []
+        for run in sorted(runs):
+            if self._updateRun(exp, run, os.path.join(expDir, 'r{0:05d}'.format(run), 'sub00'), countEvents):
+                updated.append(run)
+        if expMtime is not None:
+            self._stamp(expDir, expMtime)
+        self.db.commit()
+        return updated
+
+    def _updateRun(self, exp, run, subDir, countEvents):
+        """Rescan the HLT files of one run if its directory has changed; return True if it was rescanned"""
+        dirMtime = self._changed(subDir)
+        if dirMtime is None:
+            return False
+        old = {}
+        for path, size, mtime, nEvents in self.db.execute(
+                'SELECT path, size, mtime, nEvents FROM files WHERE exp = ? AND run = ?', (exp, run)):
+            old[path] = (size, mtime, nEvents)
+        settled = True
+        for entry in os.scandir(subDir):
+            if not entry.name.endswith('.root') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            settled = settled and (time.time() - stat.st_mtime > SETTLE)
+            previous = old.pop(entry.path, None)
+            if (previous is not None and previous[0] == stat.st_size and previous[1] == stat.st_mtime and
+                    (previous[2] is not None or not countEvents)):
+                continue
+            hlt = [part for part in entry.name.split('.') if part.startswith('HLT')]
+            nEvents = countEntries(entry.path) if countEvents else None
+            self.db.execute('INSERT OR REPLACE INTO files (path, exp, run, hlt, size, mtime, nEvents) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (entry.path, exp, run, hlt[0] if hlt else '', stat.st_size, stat.st_mtime, nEvents))
+        for path in old:
+            self.db.execute('DELETE FROM files WHERE path = ?', (path,))
+        self.db.execute('DELETE FROM runs WHERE exp = ? AND run = ?', (exp, run))
+        self.db.execute('INSERT INTO runs (exp, run, nFiles, size, startTime, endTime, nEvents) '
+                        'SELECT ?, ?, COUNT(path), COALESCE(SUM(size), 0), COALESCE(MIN(mtime), ?), '
+                        'COALESCE(MAX(mtime), ?), CASE WHEN COUNT(nEvents) = COUNT(path) THEN SUM(nEvents) END '
+                        'FROM files WHERE exp = ? AND run = ?', (exp, run, dirMtime, dirMtime, exp, run))
+        if settled:
+            self._stamp(subDir, dirMtime)
+        return True
+
+    def updateOutputs(self, exp, rootLocation=klmPipeline.ROOT_LOCATION):
+        """Record which stage outputs exist in the run directories of one experiment; return the updated run numbers
+
+        A stage is recorded as 'done' when all its outputs exist, and as 'missing' when they do not unless
+        the pipeline has recorded another state (e.g. 'failed') for it.
+
+        Arguments:
+            exp (int): experiment number
+            rootLocation (str): output directory, formatted with the 4-digit experiment number
+        """
+        exp = int(exp)
+        baseDir = rootLocation.format('{0:04d}'.format(exp))
+        runs = set(run for (run,) in self.db.execute('SELECT DISTINCT run FROM stages WHERE exp = ?', (exp,)))
+        baseMtime = self._changed(baseDir)
+        if baseMtime is not None:
+            for name in os.listdir(baseDir):
+                if name.startswith('r') and name[1:].isdecimal():
+                    runs.add(int(name[1:]))
+        updated = []
+        for run in sorted(runs):
+            runDir = os.path.join(baseDir, 'r{0:05d}'.format(run))
+            runMtime = self._changed(runDir)
+            if runMtime is None:
+                continue
+            for stage in klmPipeline.addRun(klmPipeline.Pipeline(), exp, run, OUTPUT_KINDS, rootLocation=rootLocation):
+                name = os.path.basename(stage.name)
+                state = 'done' if all(os.path.exists(output) for output in stage.outputs) else 'missing'
+                current = self.stageState(exp, run, name)
+                if state == 'done' or current is None or current == 'done':
+                    self.setStage(exp, run, name, state)
+            self._stamp(runDir, runMtime)
+            updated.append(run)
+        if baseMtime is not None:
+            self._stamp(baseDir, baseMtime)
+        self.db.commit()
+        return updated
+
+    def setStage(self, exp, run, stage, state):
+        """Record the state of one processing stage of a run
+
+        Arguments:
+            exp (int): experiment number
+            run (int): run number
+            stage (str): stage name, e.g. 'mergeBKLM' or 'bklm_HLT1'
+            state (str): 'done', 'failed', 'skipped' or 'missing'
+        """
+        self.db.execute('INSERT OR REPLACE INTO stages (exp, run, stage, state, updated) VALUES (?, ?, ?, ?, ?)',
+                        (int(exp), int(run), stage, state, time.time()))
+
+    def stageState(self, exp, run, stage):
+        """Return the recorded state of one processing stage of a run, or None"""
+        row = self.db.execute('SELECT state FROM stages WHERE exp = ? AND run = ? AND stage = ?',
+                              (int(exp), int(run), stage)).fetchone()
+        return None if row is None else row[0]
+
+    def selectRuns(self, exp, start=None, end=None, minEvents=None, missing=None):
+        """Return the sorted run numbers of one experiment that pass all the given selections
+
+        Arguments:
+            exp (int): experiment number
+            start (float): earliest POSIX time of the run's first HLT file
+            end (float): POSIX time before which the run's first HLT file was written
+            minEvents (int): minimum number of events (runs with unknown counts fail this selection)
+            missing (str): stage name that has not been recorded as 'done'
+        """
+        query = 'SELECT run FROM runs WHERE exp = ?'
+        values = [int(exp)]
+        if start is not None:
+            query += ' AND startTime >= ?'
+            values.append(start)
+        if end is not None:
+            query += ' AND startTime < ?'
+            values.append(end)
+        if minEvents is not None:
+            query += ' AND nEvents >= ?'
+            values.append(int(minEvents))
+        if missing is not None:
+            query += (' AND NOT EXISTS (SELECT 1 FROM stages WHERE stages.exp = runs.exp AND stages.run = runs.run'
+                      ' AND stages.stage = ? AND stages.state = \'done\')')
+            values.append(missing)
+        return [run for (run,) in self.db.execute(query + ' ORDER BY run', values)]
+
+    def runsWithStage(self, exp, stage, state='done'):
+        """Return the sorted run numbers of one experiment whose stage has the given state
+
+        Arguments:
+            exp (int): experiment number
+            stage (str): stage name, e.g. 'png'
+            state (str): recorded state
+        """
+        return [run for (run,) in self.db.execute(
+            'SELECT run FROM stages WHERE exp = ? AND stage = ? AND state = ? ORDER BY run', (int(exp), stage, state))]
+
+
+parser = OptionParser()
+parser.add_option('-e', '--experiment', dest='eNumber', default='8',
+                  help='Experiment number [8]')
+parser.add_option('-f', '--fdate', dest='fdate', default='',
+                  help='From date [no default]')
+parser.add_option('-t', '--tdate', dest='tdate', default='',
+                  help='To date [no default]')
+parser.add_option('-m', '--minEvents', dest='minEvents', default='0',
+                  help='Minimum number of events [0]')
+parser.add_option('-x', '--missing', dest='missing', default='',
+                  help='Select runs without a successful stage of this name [no default]')
+parser.add_option('-q', '--query', dest='queryOnly', action='store_true', default=False,
+                  help='Do not update the catalog from the filesystem first')
+parser.add_option('-c', '--catalog', dest='catalog', default=CATALOG,
+                  help='Catalog file [{0}]'.format(CATALOG))
+
+if __name__ == '__main__':
+    (options, args) = parser.parse_args()
+    exp = int(options.eNumber)
+    catalog = RunCatalog(options.catalog)
+    if not options.queryOnly:
+        catalog.update(exp)
+        catalog.updateOutputs(exp)
+    minEvents = int(options.minEvents)
+    runs = catalog.selectRuns(exp, parseDate(options.fdate) if options.fdate != '' else None,
+                              parseDate(options.tdate) if options.tdate != '' else None,
+                              minEvents if minEvents > 0 else None,
+                              options.missing if options.missing != '' else None)
+    catalog.close()
+    for run in runs:
+        print(run)
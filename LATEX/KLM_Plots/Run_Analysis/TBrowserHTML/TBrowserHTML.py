@@ -1,7 +1,8 @@
-from flask import Flask, render_template, request, json, redirect
+from flask import Flask, render_template, request, json, redirect, abort, Response
 from ROOT import *
-import string
-import random
+from collections import OrderedDict
+import threading
+import tempfile
 import os
 import base64
 
@@ -10,49 +11,160 @@ app = Flask(__name__)
 app.template_folder='template'
 app.static_folder='static'
 
-file=None
+# run files are looked up below ROOT_DIR; the file of a request is given by its 'file' argument
+# (DEFAULT_FILE if absent). The page template (template/main.html and its static scripts, which are not
+# kept in this directory) neither passes 'file' nor uses /json: both are API-only, e.g.
+#   /?file=run1234.root, /showplot?file=run1234.root&path=dir/hist, /json?file=run1234.root&path=dir/hist
+# and a page that should browse another file has to send 'file' with its /browse and /showplot requests.
+ROOT_DIR=os.environ.get('TBROWSER_ROOT_DIR','.')
+DEFAULT_FILE="MyPhysVal_pion_pt1.root"
+MAX_FILES=32      # open ROOT files kept in the pool
+MAX_PLOTS=2000    # rendered plots (and JSON histograms) kept in memory
 
-@app.route("/")
-def index():
+# ROOT is not thread-safe: every ROOT call is made under this lock, cached answers are served without it
+rootLock=threading.RLock()
+
+
+class LRUCache:
+    """Dictionary that keeps the most recently used entries, up to a maximum number"""
+
+    def __init__(self, size, onEvict=None):
+        self.size=size
+        self.onEvict=onEvict
+        self.entries=OrderedDict()
+        self.lock=threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key]=value
+            self.entries.move_to_end(key)
+            while len(self.entries)>self.size:
+                oldKey,oldValue=self.entries.popitem(last=False)
+                if self.onEvict:
+                    self.onEvict(oldKey,oldValue)
+
+
+def closeFile(name, entry):
+    with rootLock:
+        entry[1].Close()
+
+# path name -> (mtime, TFile); a file that changed on disk is opened again
+files=LRUCache(MAX_FILES,closeFile)
+# (file, path, mtime) -> base64 PNG or JSROOT JSON
+plots=LRUCache(MAX_PLOTS)
+
+
+def fileName(name):
+    """Return the path name of a run file below ROOT_DIR (404 for anything else)"""
+    path=os.path.realpath(os.path.join(ROOT_DIR,name or DEFAULT_FILE))
+    if not path.startswith(os.path.realpath(ROOT_DIR)+os.sep) or not os.path.isfile(path):
+        abort(404)
+    return path
+
+
+def openFile(path, mtime):
+    """Return the TFile of a run file from the pool, opening it if needed
+
+    The caller holds rootLock from this call until it is done with the file, so no other request can
+    close it (when it is evicted from the pool or changed on disk) in the meantime.
+    """
+    entry=files.get(path)
+    if entry is None or entry[0]!=mtime:
+        if entry is not None:
+            entry[1].Close()
+        rootFile=TFile.Open(path)
+        if not rootFile or rootFile.IsZombie():
+            abort(404)
+        entry=(mtime,rootFile)
+        files.put(path,entry)
+    return entry[1]
+
+
+def listKeys(path, thispath):
+    """Return the directories and plots of a directory, from the classes recorded in the keys"""
     dirs=[]
     plots=[]
-    global file
-    file=TFile("MyPhysVal_pion_pt1.root")
-    for key in file.GetListOfKeys():
-        thisObject=file.Get(key.GetName())
-        if isinstance(thisObject,TDirectory):
-            dirs.append({'text':key.GetName(),'path':key.GetName()})
-        if isinstance(thisObject,TH1) or isinstance(thisObject,TEfficiency):
-            plots.append({'text':key.GetName()})
+    with rootLock:
+        rootFile=openFile(path,os.path.getmtime(path))
+        tree=rootFile.GetDirectory(thispath) if thispath else rootFile
+        if not tree:
+            abort(404)
+        for key in tree.GetListOfKeys():
+            cls=TClass.GetClass(key.GetClassName())
+            if not cls:
+                continue
+            keyPath=thispath+"/"+key.GetName() if thispath else key.GetName()
+            if cls.InheritsFrom(TDirectory.Class()):
+                dirs.append({'text':key.GetName(),'path':keyPath})
+            if cls.InheritsFrom(TH1.Class()) or cls.InheritsFrom(TEfficiency.Class()):
+                plots.append({'text':key.GetName(),'path':keyPath})
+    return dirs,plots
+
+
+def getPlot(rootFile, thispath):
+    plot=rootFile.Get(thispath)
+    if not plot or not (isinstance(plot,TH1) or isinstance(plot,TEfficiency)):
+        abort(404)
+    return plot
+
+
+@app.route("/")
+def index():
+    dirs,plots=listKeys(fileName(request.args.get('file','')),'')
     return render_template('main.html',dirs=dirs,plots=plots)
 
 @app.route("/browse",methods=['POST'])
 def browse():
-    dirs=[]
-    plots=[]
     thispath=str(request.form['path'])
-    tree=file.Get(thispath)
-    for key in tree.GetListOfKeys():
-        thisObject=tree.Get(key.GetName())
-        if isinstance(thisObject,TDirectory):
-            dirs.append({'text':key.GetName(),'path':thispath+"/"+key.GetName()})
-        if isinstance(thisObject,TH1) or isinstance(thisObject,TEfficiency):
-            plots.append({'text':key.GetName(),'path':thispath+"/"+key.GetName()})    
+    dirs,plots=listKeys(fileName(request.form.get('file','')),thispath)
     return json.dumps({"dirs":dirs,"plots":plots})
 
 @app.route("/showplot")
 def showplot():
     thispath=str(request.args['path'])
-    print(thispath)
-    plot=file.Get(thispath)
-    c=TCanvas()
-    plot.Draw()
-    randomname="static/tmp/"+''.join(random.choice(string.ascii_uppercase) for _ in range(8))+".png"
-    c.SaveAs(randomname)
-    f=open(randomname,'rb')
-    data=f.read()
-    f.close()
-    os.remove(randomname)
-    return base64.b64encode(data)
-
-app.run()
+    path=fileName(request.args.get('file',''))
+    mtime=os.path.getmtime(path)
+    key=(path,thispath,mtime,'png')
+    data=plots.get(key)
+    if data is None:
+        with rootLock:
+            plot=getPlot(openFile(path,mtime),thispath)
+            c=TCanvas("showplot","showplot",700,500)
+            plot.Draw()
+            handle,pngName=tempfile.mkstemp(suffix=".png")
+            os.close(handle)
+            try:
+                c.SaveAs(pngName)
+                with open(pngName,'rb') as f:
+                    data=base64.b64encode(f.read())
+            finally:
+                os.remove(pngName)
+                c.Close()
+        plots.put(key,data)
+    return data
+
+@app.route("/json")
+def showjson():
+    # the histogram itself in JSROOT format (TBufferJSON), to be drawn in the browser with JSROOT.draw()
+    thispath=str(request.args['path'])
+    path=fileName(request.args.get('file',''))
+    mtime=os.path.getmtime(path)
+    key=(path,thispath,mtime,'json')
+    data=plots.get(key)
+    if data is None:
+        with rootLock:
+            data=str(TBufferJSON.ConvertToJSON(getPlot(openFile(path,mtime),thispath)).Data())
+        plots.put(key,data)
+    response=Response(data,mimetype='application/json')
+    response.headers['Cache-Control']='max-age=60'
+    return response
+
+if __name__=="__main__":
+    app.run(threaded=True)
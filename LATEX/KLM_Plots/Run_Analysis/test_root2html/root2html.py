@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 """
 NAME
     root2html.py - generates html and images for displaying TCanvases
@@ -14,16 +14,19 @@ DESCRIPTION
     the root file and walks its directories.  Then, for each canvas, it
     inspects  all objects that have been drawn to the canvas, and gets
     statistics depending on the object's type.  These stats are displayed in
-    the caption when you click on a figure.  Then, root2html creates eps and
-    gif/png images for each of the plots, and generates an html page
-    containing and linking all the information.
+    the caption when you click on a figure.  Then, root2html renders a png
+    image and a thumbnail of each of the plots directly from the canvas (and
+    an eps file if asked for), and generates an html page containing and
+    linking all the information.  The directories of the root file are
+    drawn in parallel by a pool of worker processes.
 
     When viewing the output html, note that you can click-up more than one
     figure at a time, and drag them around the screen.  That javascript magic
     is done with the help of this library: http://highslide.com/.
 
 INSTALLATION
-    Assuming you have a working ROOT installation with PyROOT, the only other
+    Assuming you have a working ROOT installation with PyROOT for Python 3
+    (ROOT 6.22 or newer), the only other
     requirement is that you download the highslide javascript library at
     http://highslide.com/, unzip it, and set the highslide_path variable to
     point to the path: highslide-<version>/highslide (see below).
@@ -39,6 +42,21 @@ OPTIONS
     -j PATH, --highslide=PATH
         Overrides the default path to highslide.
 
+    -n N, --processes=N
+        Number of worker processes that draw the directories of the root
+        file.  Defaults to the number of CPUs.
+
+    -e, --eps
+        Also saves every plot as eps (slow; by default only the png image and
+        its thumbnail are written).
+
+    -f, --force
+        Redraws every plot.  By default a plot is only redrawn if the content
+        hash of what is drawn on its canvas (bin contents, axes, titles and
+        draw options) differs from the one recorded in the .manifest.json
+        file of the output directory; images of plots that are no longer in
+        the root file are removed.
+
 AUTHORS
     Ryan Reece  <ryan.reece@cern.ch>
     Tae Min Hong  <tmhong@cern.ch>
@@ -59,13 +77,18 @@ import os, sys, getopt
 import time
 import re
 import math
+import json
+import ctypes
+import hashlib
+import concurrent.futures
+import numpy
 
 import ROOT
 ROOT.gROOT.SetBatch(True)
 try:
     import rootlogon # your custom ROOT options, comment-out this if you don't have one
-except:
-    print 'Could not import rootlogon'
+except ImportError:
+    print('Could not import rootlogon')
 ROOT.gErrorIgnoreLevel = 1001
 
 #------------------------------------------------------------------------------
@@ -74,67 +97,95 @@ ROOT.gErrorIgnoreLevel = 1001
 #highslide_path = '../../highslide-4.1.9/highslide'
 #highslide_path = '/afs/cern.ch/user/r/rmadar/highslide/highslide'
 highslide_path = '/afs/cern.ch/user/a/atpathak/afswork/public/Pixel/KLM_Plots/Run_Analysis/test_root2html/highslide-5/highslide'
-img_format = 'gif'
+img_format = 'png'
 img_height = 450*2 # pixels
 thumb_height = 120*2 # pixels
 quiet = True
+force = False
+save_eps = False
+n_processes = None # number of CPUs
+manifest_name = '.manifest.json'
+## element type of the bin-content array of a histogram, by the TArray class it inherits from
+cell_types = [('TArrayD', numpy.float64), ('TArrayF', numpy.float32), ('TArrayI', numpy.int32),
+              ('TArrayS', numpy.int16), ('TArrayC', numpy.int8)]
 
 #______________________________________________________________________________
 def main(argv):
     ## option defaults
     pattern = ''
     global highslide_path
+    global force
+    global save_eps
+    global n_processes
 
     ## parse options
-    _short_options = 'hp:j:'
-    _long_options = ['help', 'pattern=', 'highslide=']
+    _short_options = 'hp:j:fn:e'
+    _long_options = ['help', 'pattern=', 'highslide=', 'force', 'processes=', 'eps']
     try:
         opts, args = getopt.gnu_getopt(argv, _short_options, _long_options)
     except getopt.GetoptError:
-        print 'getopt.GetoptError\n'
-        print __doc__
+        print('getopt.GetoptError\n')
+        print(__doc__)
         sys.exit(2)
     for opt, val in opts:
         if opt in ('-h', '--help'):
-            print __doc__
+            print(__doc__)
             sys.exit()
         if opt in ('-p', '--pattern'):
             pattern = val
         if opt in ('-j', '--highslide'):
             highslide_path = val
+        if opt in ('-f', '--force'):
+            force = True
+        if opt in ('-n', '--processes'):
+            n_processes = int(val)
+        if opt in ('-e', '--eps'):
+            save_eps = True
 
     assert len(args) > 0
 
     t_start = time.time()
     n_plots = 0
 
-    ## make indexes
-    for path in args:
-        path_wo_ext = strip_root_ext(path)
-        name = os.path.join(path_wo_ext, 'index.html')
-        index = HighSlideRootFileIndex(name)
-        index.write_head(os.path.basename(path))
-        n_plots += index.write_root_file(path, pattern)
-        index.write_foot()
-        index.close()
-        print '  %s written.' % name
+    ## make indexes; the worker processes are shared by all the files
+    with concurrent.futures.ProcessPoolExecutor(max_workers=n_processes, initializer=init_worker,
+                                                initargs=(img_format, save_eps, quiet)) as pool:
+        for path in args:
+            path_wo_ext = strip_root_ext(path)
+            name = os.path.join(path_wo_ext, 'index.html')
+            index = HighSlideRootFileIndex(name)
+            index.write_head(os.path.basename(path))
+            n_plots += index.write_root_file(path, pattern, pool)
+            index.write_foot()
+            index.close()
+            print('  %s written.' % name)
 
     t_stop = time.time()
-    print '  # plots    = %i' % n_plots
-    print '  time spent = %i s' % round(t_stop-t_start)
-    print '  avg rate   = %.2f Hz' % (float(n_plots)/(t_stop-t_start))
-    print '  Done.'
+    print('  # plots    = %i' % n_plots)
+    print('  time spent = %i s' % round(t_stop-t_start))
+    print('  avg rate   = %.2f Hz' % (float(n_plots)/(t_stop-t_start)))
+    print('  Done.')
 
 #------------------------------------------------------------------------------
-class HighSlideRootFileIndex(file):
+class HighSlideRootFileIndex(object):
     #__________________________________________________________________________
     def __init__(self, name='index.html'):
         make_dir_if_needed(name)
-        super(HighSlideRootFileIndex, self).__init__(name, 'w')
+        self.file = open(name, 'w')
         self.dirname = os.path.dirname(name)
         self.highslide_path = highslide_path # '/home/reece/projects/highslide_dev/highslide-4.1.9/highslide'
         self.previous_level = 0
         self.pwd = None
+        self.n_drawn = 0
+        ## content hashes of the plots drawn by the previous pass, and of this pass
+        self.old_hashes = {} if force else read_manifest(self.dirname)
+        self.hashes = {}
+    #__________________________________________________________________________
+    def write(self, text):
+        self.file.write(text)
+    #__________________________________________________________________________
+    def close(self):
+        self.file.close()
     #__________________________________________________________________________
     def write_head(self, title):
         head_template = r"""<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN"
@@ -280,34 +331,46 @@ class HighSlideRootFileIndex(file):
                 'user' : os.environ['USER'],
                 'date' : time.ctime() })
     #__________________________________________________________________________
-    def write_root_file(self, path, pattern=''):
+    def write_root_file(self, path, pattern='', pool=None):
         n_plots = 0
-        rootfile = ROOT.TFile(path)
+        ## one job per directory; the workers draw the canvases and return
+        ## their xhtml, which is written here in the order of the walk
+        jobs = []
+        rootfile = ROOT.TFile.Open(path)
         for dirpath, dirnames, filenames, tdirectory in walk(rootfile):
-            for key in filenames:
-                obj = tdirectory.Get(key)
-
-                # Hack for when we find TH1, TH2 instead of TCanvas
-                new_obj = None
-                if issubclass(obj.__class__, ROOT.TH1) or issubclass(obj.__class__, ROOT.TH1):
-                    new_obj = ROOT.TCanvas(obj.GetName(), obj.GetTitle(), 500, 500)
-                    new_obj.cd()
-                    obj.Draw()
-                    obj = new_obj
-
-                # Put TCanvas on html
-                if isinstance(obj, ROOT.TCanvas):
-                    root_dir_path = dirpath.split(':/')[1]
-                    root_key_path = os.path.join(root_dir_path, key)
-                    if pattern and not re.match(pattern, root_key_path):
-                        continue
-                    print os.path.join(dirpath, key)
-                    self.write_dir_header(dirpath)
-                    full_path = os.path.join(self.dirname, root_key_path)
-                    self.write_canvas(obj, full_path)
-                    n_plots += 1
-
+            root_dir_path = dirpath.split(':/')[1]
+            keys = [key for key in filenames
+                    if not pattern or re.match(pattern, os.path.join(root_dir_path, key))]
+            if keys:
+                old_hashes = dict((k, v) for k, v in self.old_hashes.items()
+                                  if os.path.dirname(k) == root_dir_path.rstrip('/'))
+                jobs.append((path, dirpath, keys, self.dirname, old_hashes))
         rootfile.Close()
+        if pool is None:
+            init_worker(img_format, save_eps, quiet)
+            results = map(write_directory, jobs)
+        else:
+            results = pool.map(write_directory, jobs)
+        for dirpath, figures, n_drawn in results:
+            for key, canvas_hash, xhtml in figures:
+                self.write_dir_header(dirpath)
+                self.write(xhtml)
+                self.hashes[key] = canvas_hash
+                n_plots += 1
+            self.n_drawn += n_drawn
+
+        if pattern:
+            ## plots outside the pattern were not looked at; keep their hashes
+            for key, old_hash in self.old_hashes.items():
+                self.hashes.setdefault(key, old_hash)
+        else:
+            ## remove the images of plots that are no longer in the file
+            for key in self.old_hashes:
+                if key not in self.hashes:
+                    remove_images(os.path.join(self.dirname, key))
+        write_manifest(self.dirname, self.hashes)
+        if not quiet:
+            print('  %i of %i plots redrawn' % (self.n_drawn, n_plots))
         return n_plots
     #__________________________________________________________________________
     def write_dir_header(self, path):
@@ -322,85 +385,228 @@ class HighSlideRootFileIndex(file):
 
         if dirpath != self.pwd:
             ## pop
-            rel_path = relpath(dirpath, self.pwd)
+            rel_path = os.path.relpath(dirpath, self.pwd)
             while rel_path.startswith('../'):
                 self.write("</div> <!-- %s -->\n" % self.pwd)
                 self.pwd = os.path.join(*(self.pwd.split('/')[:-1])) if self.pwd.count('/') else ''
-                rel_path = relpath(dirpath, self.pwd)
+                rel_path = os.path.relpath(dirpath, self.pwd)
 
             ## push
-            rel_path = relpath(dirpath, self.pwd)
+            rel_path = os.path.relpath(dirpath, self.pwd)
             while rel_path.count('/'):
                 path_down_one_dir = '%s:/%s' % (rootfile, os.path.join(self.pwd, rel_path.split('/')[0]))
                 self.write_dir_header(path_down_one_dir)
-                rel_path = relpath(dirpath, self.pwd)
+                rel_path = os.path.relpath(dirpath, self.pwd)
 
             id_name = dirpath.replace('/', '_')
             dir_name = dirpath.split('/')[-1]
             self.write("""\n<div class="dir_header"><a id="link:%s" class="closed" onclick="toggle_more('%s')">%s</a></div>\n""" % (id_name, id_name, dir_name))
             self.write("""<div id="%s" class="more">\n""" % id_name)
             self.pwd = dirpath
-    #__________________________________________________________________________
-    def write_canvas(self, canvas, basepath):
-        name = canvas.GetName()
-        make_dir_if_needed(basepath)
-        ## save eps
-        eps = basepath + '.eps'
-        canvas.SaveAs(eps)
-        ## save img
-        if img_format == 'gif':
-            img = convert_eps_to_gif(eps)
-        elif img_format == 'png':
-            img = convert_eps_to_png(eps)
-        ## save thumb
-        if img_format == 'gif':
-            thumb = convert_eps_to_thumb_gif(eps)
-        elif img_format == 'png':
-            thumb = convert_eps_to_thumb_png(eps)
+
+#------------------------------------------------------------------------------
+# free functions
+#------------------------------------------------------------------------------
+
+#__________________________________________________________________________
+def init_worker(format, eps, be_quiet):
+    """Sets the image options in a worker process."""
+    global img_format, save_eps, quiet
+    img_format = format
+    save_eps = eps
+    quiet = be_quiet
+    ROOT.gROOT.SetBatch(True)
+    ROOT.gErrorIgnoreLevel = 1001
+
+#__________________________________________________________________________
+def write_directory(job):
+    """Draws the canvases (and histograms) of one TDirectory of a root file
+    in a worker process.  Returns (dirpath, figures, n_drawn), where figures
+    is a list of (manifest key, content hash, xhtml) of its plots."""
+    path, dirpath, keys, dirname, old_hashes = job
+    rootfile = ROOT.TFile.Open(path)
+    root_dir_path = dirpath.split(':/')[1]
+    tdirectory = rootfile.GetDirectory(root_dir_path) if root_dir_path else rootfile
+    figures = []
+    n_drawn = 0
+    for key in keys:
+        obj = tdirectory.Get(key)
+
+        # Hack for when we find TH1, TH2 instead of TCanvas
+        new_obj = None
+        if isinstance(obj, ROOT.TH1):
+            new_obj = ROOT.TCanvas(obj.GetName(), obj.GetTitle(), 500, 500)
+            new_obj.cd()
+            obj.Draw()
+            obj = new_obj
+
+        # Put TCanvas on html
+        if isinstance(obj, ROOT.TCanvas):
+            root_key_path = os.path.join(root_dir_path, key)
+            print(os.path.join(dirpath, key))
+            full_path = os.path.join(dirname, root_key_path)
+            figure_key = os.path.relpath(full_path, dirname)
+            figure_hash, drawn, xhtml = write_canvas(obj, full_path, dirname, old_hashes.get(figure_key))
+            figures.append((figure_key, figure_hash, xhtml))
+            n_drawn += drawn
+    rootfile.Close()
+    return dirpath, figures, n_drawn
+
+#__________________________________________________________________________
+def write_canvas(canvas, basepath, dirname, old_hash=None):
+    """Saves the images of a canvas unless its content hash is old_hash and
+    its images exist.  Returns (content hash, 1 if drawn else 0, xhtml)."""
+    name = canvas.GetName()
+    make_dir_if_needed(basepath)
+    eps = basepath + '.eps'
+    img = basepath + '.' + img_format
+    thumb = basepath + '.thumb.' + img_format
+    ## redraw only if the contents changed or an image is missing
+    new_hash = canvas_hash(canvas)
+    drawn = 0
+    if old_hash != new_hash or not (os.path.exists(img) and os.path.exists(thumb)) or \
+            (save_eps and not os.path.exists(eps)):
+        ## save eps, on request only
+        if save_eps:
+            canvas.SaveAs(eps)
+        ## save img and thumb from the canvas, without going through eps
+        save_images(canvas, img, thumb)
         ## additional formats
-        formats = [] # ['.png', '.pdf', '.C']
+        formats = [] # ['.pdf', '.C']
         for format in formats:
             canvas.SaveAs(basepath + format)
-        ## convert to relpaths
-        ## use locally defined relpath because os.path.relpath does not
-        ## exist in Python 2.5.
-        eps = relpath(eps, self.dirname)
-        img = relpath(img, self.dirname)
-        thumb = relpath(thumb, self.dirname)
-        ## write xhtml
-        fig_template = r"""
+        drawn = 1
+    ## convert to relpaths
+    has_eps = os.path.exists(eps)
+    eps = os.path.relpath(eps, dirname)
+    img = os.path.relpath(img, dirname)
+    thumb = os.path.relpath(thumb, dirname)
+    ## write xhtml
+    fig_template = r"""
 <a href="%(img)s" class="highslide" rel="highslide">
     <img src="%(thumb)s" alt="%(name)s" title="%(name)s"/></a>
 """
-        heading_template = r"""<div class="highslide-heading">
-    <a title="%(path)s">%(name)s</a>&nbsp;[&nbsp;<a href="%(eps)s">eps</a>&nbsp;|&nbsp;<a href="%(img)s">%(format)s</a>&nbsp;]
+    heading_template = r"""<div class="highslide-heading">
+    <a title="%(path)s">%(name)s</a>&nbsp;[&nbsp;%(eps)s<a href="%(img)s">%(format)s</a>&nbsp;]
 </div>
 """
-        caption_template = r"""<div class="highslide-caption">
+    caption_template = r"""<div class="highslide-caption">
 %s</div>
 """
-        self.write(fig_template % {
-                'name'  : name,
-                'img'   : img,
-                'thumb' : thumb })
-        self.write(heading_template % {
-                'path'  : basepath,
-                'name'  : name,
-                'eps'   : eps,
-                'img'   : img,
-                'format': img_format})
-        ## get stats
-        stats = get_canvas_stats(canvas)
-        if stats:
-            clean_stats_names(stats)
-            tab = convert_stats_to_table(stats)
-            html_tab = convert_table_to_html(tab)
-            self.write(caption_template % html_tab)
+    xhtml = fig_template % {
+            'name'  : name,
+            'img'   : img,
+            'thumb' : thumb }
+    xhtml += heading_template % {
+            'path'  : basepath,
+            'name'  : name,
+            'eps'   : ('<a href="%s">eps</a>&nbsp;|&nbsp;' % eps) if has_eps else '',
+            'img'   : img,
+            'format': img_format}
+    ## get stats
+    stats = get_canvas_stats(canvas)
+    if stats:
+        clean_stats_names(stats)
+        tab = convert_stats_to_table(stats)
+        html_tab = convert_table_to_html(tab)
+        xhtml += caption_template % html_tab
+    return new_hash, drawn, xhtml
 
+#__________________________________________________________________________
+def save_images(canvas, img, thumb):
+    """Renders the image (img_height pixels high) and the thumbnail
+    (thumb_height pixels high) of a canvas in-process with TImage."""
+    ww, wh = canvas.GetWw(), canvas.GetWh()
+    ## render the pad at the final image size instead of scaling up
+    canvas.SetCanvasSize(int(round(ww*float(img_height)/wh)), img_height)
+    canvas.Modified()
+    canvas.Update()
+    image = ROOT.TImage.Create()
+    image.FromPad(canvas)
+    image.WriteImage(img)
+    if not quiet:
+        print('  Created %s' % img)
+    image.Scale(max(1, int(round(image.GetWidth()*float(thumb_height)/image.GetHeight()))), thumb_height)
+    image.WriteImage(thumb)
+    if not quiet:
+        print('  Created %s' % thumb)
+    canvas.SetCanvasSize(ww, wh)
 
-#------------------------------------------------------------------------------
-# free functions
-#------------------------------------------------------------------------------
+#__________________________________________________________________________
+def hist_hash(h, option, digest):
+    """Adds the contents of a histogram as drawn to a hashlib digest."""
+    digest.update(repr((h.ClassName(), h.GetName(), h.GetTitle(), option, h.GetEntries(),
+                        h.GetMinimumStored(), h.GetMaximumStored())).encode())
+    for axis in (h.GetXaxis(), h.GetYaxis(), h.GetZaxis()):
+        nbins = axis.GetNbins()
+        digest.update(repr((axis.GetTitle(), nbins, axis.GetXmin(), axis.GetXmax(),
+                            [axis.GetBinLowEdge(i) for i in range(1, nbins+1)] if axis.IsVariableBinSize() else [],
+                            [axis.GetBinLabel(i) for i in range(1, nbins+1)] if axis.GetLabels() else [],
+                            axis.GetFirst(), axis.GetLast())).encode())
+    ## the bin-content and sum-of-weights-squared arrays as a whole, not one ROOT call per cell
+    cell_type = next((dtype for array_class, dtype in cell_types if h.InheritsFrom(array_class)), None)
+    if cell_type is None:
+        for cell in range(h.GetNcells()):
+            digest.update(repr((h.GetBinContent(cell), h.GetBinError(cell))).encode())
+        return
+    digest.update(numpy.frombuffer(h.GetArray(), dtype=cell_type, count=h.GetNcells()).tobytes())
+    if h.GetSumw2N() > 0:
+        digest.update(numpy.frombuffer(h.GetSumw2().GetArray(), dtype=numpy.float64, count=h.GetSumw2N()).tobytes())
+    if h.InheritsFrom('TProfile'): # fArray holds the sums, the drawn means also need the entries
+        digest.update(repr([h.GetBinEntries(cell) for cell in range(h.GetNcells())]).encode())
+
+#__________________________________________________________________________
+def canvas_hash(canvas, digest=None):
+    """Returns the content hash of everything drawn on a canvas: histograms
+    with their draw options, other primitives by class, name and title."""
+    top = digest is None
+    if top:
+        digest = hashlib.sha1()
+    link = canvas.GetListOfPrimitives().FirstLink()
+    while link:
+        obj = link.GetObject()
+        option = link.GetOption()
+        if isinstance(obj, ROOT.TPad):
+            canvas_hash(obj, digest)
+        elif isinstance(obj, ROOT.TH1):
+            hist_hash(obj, option, digest)
+        elif isinstance(obj, ROOT.THStack):
+            for h in obj.GetHists():
+                hist_hash(h, option, digest)
+        else:
+            digest.update(repr((obj.ClassName(), obj.GetName(), obj.GetTitle(), option)).encode())
+        link = link.Next()
+    if top:
+        return digest.hexdigest()
+
+#__________________________________________________________________________
+def read_manifest(dirname):
+    """Returns the content hashes recorded in the manifest of an output directory."""
+    try:
+        f = open(os.path.join(dirname, manifest_name))
+        hashes = json.load(f)
+        f.close()
+        return hashes
+    except (IOError, OSError, ValueError):
+        return {}
+
+#__________________________________________________________________________
+def write_manifest(dirname, hashes):
+    """Writes the manifest of an output directory via a temporary file."""
+    name = os.path.join(dirname, manifest_name)
+    f = open(name + '.tmp', 'w')
+    json.dump(hashes, f, indent=0, sort_keys=True)
+    f.close()
+    os.rename(name + '.tmp', name)
+
+#__________________________________________________________________________
+def remove_images(basepath):
+    """Removes the eps, image and thumbnail of a plot."""
+    for ext in ('.eps', '.' + img_format, '.thumb.' + img_format):
+        if os.path.exists(basepath + ext):
+            os.remove(basepath + ext)
+            if not quiet:
+                print('  Removed %s' % (basepath + ext))
 
 #__________________________________________________________________________
 def get_canvas_stats(canvas):
@@ -425,7 +631,7 @@ def get_object_stats(h):
     if isinstance(h, ROOT.TH1) and not isinstance(h, ROOT.TH2):
         nbins       = h.GetNbinsX()
         entries     = h.GetEntries()
-        err = ROOT.Double(0)
+        err = ctypes.c_double(0)
         integral    = h.IntegralAndError(0, nbins+1, err)
 #        integral    = h.Integral(0, nbins+1)
 #        err         = math.sqrt(float(entries))*integral/entries if entries else 0
@@ -435,7 +641,7 @@ def get_object_stats(h):
         over        = h.GetBinContent(nbins+1)
         stats['entries'] = '%i'   % round(entries)
         stats['int']     = ('%i' % round(integral)) if integral > 10 else ('%.2g' % integral)
-        stats['err']     = '%.2g' % err
+        stats['err']     = '%.2g' % err.value
         stats['mean']    = '%.3g' % mean
         stats['rms']     = '%.3g' % rms
         stats['under']   = '%.3g' % under
@@ -445,7 +651,7 @@ def get_object_stats(h):
         nbins_x     = h.GetNbinsX()
         nbins_y     = h.GetNbinsY()
         entries     = h.GetEntries()
-        err = ROOT.Double(0)
+        err = ctypes.c_double(0)
         integral    = h.IntegralAndError(0, nbins_x+1, 0, nbins_y+1, err)
 #        integral    = h.Integral(0, nbins_x+1, 0, nbins_y+1)
 #        err         = math.sqrt(float(entries))*integral/entries if entries else 0
@@ -455,7 +661,7 @@ def get_object_stats(h):
         rms_y       = h.GetRMS(2)
         stats['entries'] = '%i'   % round(entries)
         stats['int']     = ('%i' % round(integral)) if integral > 10 else ('%.2g' % integral)
-        stats['err']     = '%.2g' % err
+        stats['err']     = '%.2g' % err.value
         stats['mean_x']  = '%.3g' % mean_x
         stats['rms_x']   = '%.3g' % rms_x
         stats['mean_y']  = '%.3g' % mean_y
@@ -465,7 +671,7 @@ def get_object_stats(h):
             or isinstance(h, ROOT.TGraphErrors) \
             or isinstance(h, ROOT.TGraphAsymmErrors):
         if not quiet:
-            print 'WARNING: HighSlideRootFileIndex.get_object_stats( %s ) not implemented.' % type(h)
+            print('WARNING: HighSlideRootFileIndex.get_object_stats( %s ) not implemented.' % type(h))
     elif isinstance(h, ROOT.THStack):
         stack_stats = get_object_stats( h.GetStack().Last() )
         assert len(stack_stats) == 1, type(h.GetStack().Last())
@@ -478,7 +684,7 @@ def get_object_stats(h):
         names_stats.extend(stack_hists_stats)
     else:
         if not quiet:
-            print 'WARNING: HighSlideRootFileIndex.get_object_stats( %s ) not implemented.' % type(h)
+            print('WARNING: HighSlideRootFileIndex.get_object_stats( %s ) not implemented.' % type(h))
     return names_stats
 
 #__________________________________________________________________________
@@ -490,7 +696,7 @@ def clean_stats_names(names_stats):
     if name.count(sep):
         postfix = name.split(sep)[-1]
     if postfix:
-        for i in xrange(len(names_stats)):
+        for i in range(len(names_stats)):
             name, stats = names_stats[i]
             if name.endswith(sep+postfix):
                 name = '__'.join(name.split(sep)[0:-1])
@@ -500,7 +706,7 @@ def clean_stats_names(names_stats):
 def convert_stats_to_table(names_stats):
     ## hack, need to come up with a way to determine which stats to expect,
     ## and how to organize the table(s)
-    if names_stats[0][1].has_key('rms_x'): # TH2
+    if 'rms_x' in names_stats[0][1]: # TH2
         top_row = ['name', 'entries', 'int', 'err', 'mean_x', 'rms_x', 'mean_y', 'rms_y']
     else:
         top_row = ['name', 'entries', 'int', 'err', 'mean', 'rms', 'under', 'over']
@@ -553,17 +759,17 @@ def walk(top, topdown=True):
     """
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     assert isinstance(top, ROOT.TDirectory)
-    names = [k.GetName() for k in top.GetListOfKeys()]
     dirpath = top.GetPath()
     dirnames = []
     filenames = []
-    ## filter names for directories
-    for k in names:
-        d = top.Get(k)
-        if isinstance(d, ROOT.TDirectory):
-            dirnames.append(k)
+    ## filter names for directories by the class recorded in the key, so the
+    ## objects are not read here (the worker processes read them)
+    for k in top.GetListOfKeys():
+        cls = ROOT.TClass.GetClass(k.GetClassName())
+        if cls and cls.InheritsFrom(ROOT.TDirectory.Class()):
+            dirnames.append(k.GetName())
         else:
-            filenames.append(k)
+            filenames.append(k.GetName())
     ## sort
     dirnames.sort()
     filenames.sort()
@@ -577,47 +783,9 @@ def walk(top, topdown=True):
     if not topdown:
         yield dirpath, dirnames, filenames, top
 
-#______________________________________________________________________________
-def convert_eps_to_gif(eps):
-    assert eps.endswith('.eps')
-    name = eps[:-3] + 'gif'
-#    os.system('convert -resize x%i -antialias -colors 64 -format gif %s %s' % (img_height, eps, name) )
-#    os.system('convert -size x%i -format gif %s %s' % (img_height, eps, name) )
-    os.system('convert -format gif %s[x%i] %s' % (eps, img_height, name) )
-    if not quiet:
-        print '  Created %s' % name
-    return name
-
-#______________________________________________________________________________
-def convert_eps_to_thumb_gif(eps):
-    assert eps.endswith('.eps')
-    name = eps[:-3] + 'thumb.gif'
-    os.system('convert -resize x%i -antialias -colors 64 -format gif %s %s' % (thumb_height, eps, name) )
-    if not quiet:
-        print '  Created %s' % name
-    return name
-
-#______________________________________________________________________________
-def convert_eps_to_png(eps):
-    assert eps.endswith('.eps')
-    name = eps[:-3] + 'png'
-    os.system('convert -resize x%i -antialias -colors 64 -format png %s %s' % (img_height, eps, name) )
-    if not quiet:
-        print '  Created %s' % name
-    return name
-
-#______________________________________________________________________________
-def convert_eps_to_thumb_png(eps):
-    assert eps.endswith('.eps')
-    name = eps[:-3] + 'thumb.png'
-    os.system('convert -resize x%i -antialias -colors 64 -format png %s %s' % (thumb_height, eps, name) )
-    if not quiet:
-        print '  Created %s' % name
-    return name
-
 #______________________________________________________________________________
 def strip_root_ext(path):
-    reo = re.match('(\S*?)(\.canv)?(\.root)(\.\d*)?', path)
+    reo = re.match(r'(\S*?)(\.canv)?(\.root)(\.\d*)?', path)
     assert reo
     return reo.group(1)
 
@@ -625,40 +793,7 @@ def strip_root_ext(path):
 def make_dir_if_needed(path):
     if path.count('/'):
         dirname = os.path.split(path)[0]
-        if not os.path.isdir(dirname):
-            os.makedirs(dirname)
-
-#______________________________________________________________________________
-def relpath(path, start='.'):
-    """
-    Return a relative version of a path
-    Stolen implementation from Python 2.6.5 so I can use it in 2.5
-    http://svn.python.org/view/python/tags/r265/Lib/posixpath.py?revision=79064&view=markup
-    """
-    # strings representing various path-related bits and pieces
-    curdir = '.'
-    pardir = '..'
-    extsep = '.'
-    sep = '/'
-    pathsep = ':'
-    defpath = ':/bin:/usr/bin'
-    altsep = None
-    devnull = '/dev/null'
-
-    if not path:
-        raise ValueError("no path specified")
-
-    start_list = os.path.abspath(start).split(sep)
-    path_list = os.path.abspath(path).split(sep)
-
-    # Work out how much of the filepath is shared by start and path.
-    i = len(os.path.commonprefix([start_list, path_list]))
-
-    rel_list = [pardir] * (len(start_list)-i) + path_list[i:]
-    if not rel_list:
-        return '.'
-    return os.path.join(*rel_list)
-
+        os.makedirs(dirname, exist_ok=True)  # the pool workers may create the same directory at once
 
 #______________________________________________________________________________
 if __name__ == '__main__': main(sys.argv[1:])